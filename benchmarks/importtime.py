@@ -0,0 +1,59 @@
+import subprocess
+import sys
+import time
+import typing
+
+import click
+
+
+def _import_times(module: str) -> typing.List[typing.Tuple[int, int, str]]:
+    """Return (self, cumulative, name) import times in microseconds of importing module"""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import " + module],
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    ).stderr
+    times = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_time, cumulative, name = line[len("import time:") :].split("|")
+        if self_time.strip().isdigit():
+            times.append((int(self_time), int(cumulative), name.strip()))
+    return times
+
+
+def _startup_time(args: typing.Sequence[str]) -> float:
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-c", "from scottypy.app import main; main()"] + list(args),
+        stdout=subprocess.DEVNULL,
+        check=False,
+    )
+    return time.perf_counter() - start
+
+
+@click.command()
+@click.option("--module", default="scottypy.app", help="Module to import")
+@click.option("--top", default=15, help="Number of slowest imports to show")
+@click.option("--repeat", default=10, help="Number of `scotty --help` runs to time")
+def main(module: str, top: int, repeat: int) -> None:
+    """Show the slowest imports of the command line tool and time its startup"""
+    times = _import_times(module)
+    click.echo("{:>10} {:>12}  {}".format("self (ms)", "cumul. (ms)", "module"))
+    for self_time, cumulative, name in sorted(times, key=lambda t: -t[1])[:top]:
+        click.echo(
+            "{:>10.1f} {:>12.1f}  {}".format(self_time / 1000, cumulative / 1000, name)
+        )
+
+    runs = sorted(_startup_time(["--help"]) for _ in range(repeat))
+    click.echo(
+        "scotty --help: best {:.1f}ms, median {:.1f}ms".format(
+            runs[0] * 1000, runs[len(runs) // 2] * 1000
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()  # pylint: disable=no-value-for-parameter
@@ -0,0 +1,58 @@
+import statistics
+import time
+import typing
+
+import click
+
+from scottypy import jsonlib
+
+from .server import SyntheticData
+
+_BASE_URL = "http://scotty.example.com/"
+
+
+def file_listing(files: int) -> bytes:
+    """A ``/files`` response body listing files, as served by Scotty"""
+    data = SyntheticData(beams=1, files=files, file_size=1024**2)
+    listing = {"files": [data.file(file_id, _BASE_URL) for file_id in range(files)]}
+    return jsonlib.get_backend("json").dumps(listing)
+
+
+def time_backend(
+    backend: jsonlib.Backend, payload: bytes, repeat: int
+) -> typing.List[float]:
+    """Return the sorted durations of decoding payload repeat times"""
+    backend.loads(payload)
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        backend.loads(payload)
+        durations.append(time.perf_counter() - start)
+    return sorted(durations)
+
+
+@click.command()
+@click.option("--files", default=100000, help="Number of files in the listing")
+@click.option("--repeat", default=10, help="Number of measured decodes per backend")
+def main(files: int, repeat: int) -> None:
+    """Time decoding a large file listing with every installed JSON backend"""
+    payload = file_listing(files)
+    click.echo("Decoding {} files ({:.1f} MB)".format(files, len(payload) / 1024**2))
+    click.echo(
+        "{:<10} {:>10} {:>10} {:>12}".format("backend", "p50 (ms)", "best (ms)", "MB/s")
+    )
+    for name in jsonlib.available_backends():
+        durations = time_backend(jsonlib.get_backend(name), payload, repeat)
+        median = statistics.median(durations)
+        click.echo(
+            "{:<10} {:>10.1f} {:>10.1f} {:>12.1f}".format(
+                name,
+                median * 1000,
+                durations[0] * 1000,
+                len(payload) / 1024**2 / median if median else 0.0,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()  # pylint: disable=no-value-for-parameter
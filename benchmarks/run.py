@@ -0,0 +1,235 @@
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import typing
+
+import click
+
+from scottypy import Scotty
+
+from .server import SyntheticData, serve
+
+Case = typing.Callable[[Scotty, SyntheticData, str], int]
+_PERCENTILES = (50, 90, 99)
+
+
+def _get_files(scotty: Scotty, data: SyntheticData, workdir: str) -> int:
+    return len(scotty.get_files(0))
+
+
+def _get_beams_by_tag(scotty: Scotty, data: SyntheticData, workdir: str) -> int:
+    return len(scotty.get_beams_by_tag(data.tag))
+
+
+def _get_beams_by_issue(scotty: Scotty, data: SyntheticData, workdir: str) -> int:
+    return len(scotty.get_beams_by_issue(data.issue))
+
+
+def _iter_files(scotty: Scotty, data: SyntheticData, workdir: str) -> int:
+    return sum(1 for _ in scotty.get_beam(0).iter_files())
+
+
+def _download(scotty: Scotty, data: SyntheticData, workdir: str) -> int:
+    file_ = scotty.get_file(0)
+    file_.download(workdir, overwrite=True, segments=1)
+    return file_.size
+
+
+def _download_segmented(scotty: Scotty, data: SyntheticData, workdir: str) -> int:
+    file_ = scotty.get_file(0)
+    file_.download(workdir, overwrite=True, segment_threshold=0)
+    return file_.size
+
+
+def _read_tail(scotty: Scotty, data: SyntheticData, workdir: str) -> int:
+    return len(scotty.get_file(0).read_range(-64 * 1024))
+
+
+def _readinto(scotty: Scotty, data: SyntheticData, workdir: str) -> int:
+    return scotty.get_file(0).readinto(bytearray(data.file_size))
+
+
+# name -> (function, unit of its return value)
+CASES = {
+    "get_files": (_get_files, "files"),
+    "get_beams_by_tag": (_get_beams_by_tag, "beams"),
+    "get_beams_by_issue": (_get_beams_by_issue, "beams"),
+    "iter_files": (_iter_files, "files"),
+    "download": (_download, "bytes"),
+    "download_segmented": (_download_segmented, "bytes"),
+    "read_tail": (_read_tail, "bytes"),
+    "readinto": (_readinto, "bytes"),
+}  # type: typing.Dict[str, typing.Tuple[Case, str]]
+
+
+def _percentile(sorted_values: typing.List[float], percentile: int) -> float:
+    index = (len(sorted_values) - 1) * percentile / 100
+    lower = int(index)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (
+        index - lower
+    )
+
+
+def run_case(
+    scotty: Scotty, data: SyntheticData, name: str, repeat: int, warmup: int = 1
+) -> typing.Dict[str, typing.Any]:
+    """Run a single benchmark case `repeat` times and summarize its latencies and throughput"""
+    function, unit = CASES[name]
+    workdir = tempfile.mkdtemp(prefix="scotty_bench")
+    try:
+        for _ in range(warmup):
+            function(scotty, data, workdir)
+        latencies = []
+        amount = 0
+        for _ in range(repeat):
+            start = time.perf_counter()
+            amount += function(scotty, data, workdir)
+            latencies.append(time.perf_counter() - start)
+    finally:
+        shutil.rmtree(workdir)
+    latencies.sort()
+    total = sum(latencies)
+    result = {
+        "repeat": repeat,
+        "mean": statistics.mean(latencies),
+        "throughput": amount / total if total else 0.0,
+        "unit": "{}/s".format(unit),
+    }  # type: typing.Dict[str, typing.Any]
+    for percentile in _PERCENTILES:
+        result["p{}".format(percentile)] = _percentile(latencies, percentile)
+    return result
+
+
+def run_suite(
+    data: SyntheticData,
+    cases: typing.Sequence[str],
+    repeat: int,
+    transport: str = "loopback",
+) -> typing.Dict[str, typing.Any]:
+    with serve(data, transport) as url:
+        scotty = Scotty(url)
+        results = {name: run_case(scotty, data, name, repeat) for name in cases}
+    return {
+        "parameters": {
+            "beams": data.beam_count,
+            "files": data.files_per_beam,
+            "file_size": data.file_size,
+            "repeat": repeat,
+            "transport": transport,
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+
+
+def compare(
+    baseline: typing.Dict[str, typing.Any],
+    current: typing.Dict[str, typing.Any],
+    tolerance: float,
+) -> typing.List[str]:
+    """Return a description of every case whose p50 latency regressed by more than tolerance"""
+    regressions = []
+    for name, result in current["results"].items():
+        previous = baseline["results"].get(name)
+        if previous is None:
+            continue
+        ratio = result["p50"] / previous["p50"] if previous["p50"] else 1.0
+        if ratio > 1 + tolerance:
+            regressions.append(
+                "{}: p50 {:.2f}ms -> {:.2f}ms ({:+.0%})".format(
+                    name, previous["p50"] * 1000, result["p50"] * 1000, ratio - 1
+                )
+            )
+    return regressions
+
+
+def _format_results(suite: typing.Dict[str, typing.Any]) -> str:
+    lines = [
+        "{:<20} {:>10} {:>10} {:>10} {:>18}".format(
+            "case", "p50 (ms)", "p90 (ms)", "p99 (ms)", "throughput"
+        )
+    ]
+    for name, result in suite["results"].items():
+        lines.append(
+            "{:<20} {:>10.2f} {:>10.2f} {:>10.2f} {:>12.1f} {}".format(
+                name,
+                result["p50"] * 1000,
+                result["p90"] * 1000,
+                result["p99"] * 1000,
+                result["throughput"],
+                result["unit"],
+            )
+        )
+    return "\n".join(lines)
+
+
+@click.command()
+@click.option("--beams", default=20, help="Number of synthetic beams")
+@click.option("--files", default=200, help="Number of files in every beam")
+@click.option("--file-size", default=1024**2, help="Size of every file in bytes")
+@click.option("--repeat", default=20, help="Number of measured runs of every case")
+@click.option(
+    "--transport", type=click.Choice(["loopback", "http"]), default="loopback"
+)
+@click.option(
+    "-c",
+    "--case",
+    "cases",
+    multiple=True,
+    type=click.Choice(sorted(CASES)),
+    help="Case to run. Can be specified multiple times. Defaults to all cases",
+)
+@click.option("-o", "--output", default=None, help="Save the results as JSON")
+@click.option(
+    "--compare",
+    "baseline_path",
+    default=None,
+    type=click.Path(exists=True, dir_okay=False),
+    help="Fail if the p50 latency of a case regressed compared to these saved results",
+)
+@click.option(
+    "--tolerance", default=0.2, help="Allowed p50 regression ratio when comparing"
+)
+def main(
+    beams: int,
+    files: int,
+    file_size: int,
+    repeat: int,
+    transport: str,
+    cases: typing.Sequence[str],
+    output: typing.Optional[str],
+    baseline_path: typing.Optional[str],
+    tolerance: float,
+) -> None:
+    """Benchmark the client against a local stand-in Scotty server"""
+    data = SyntheticData(beams=beams, files=files, file_size=file_size)
+    suite = run_suite(data, cases or list(CASES), repeat, transport)
+    click.echo(_format_results(suite))
+
+    if output:
+        directory = os.path.dirname(output)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        with open(output, "w") as f:
+            json.dump(suite, f, indent=2, sort_keys=True)
+
+    if baseline_path:
+        with open(baseline_path) as f:
+            regressions = compare(json.load(f), suite, tolerance)
+        for regression in regressions:
+            click.echo("Regression: {}".format(regression), err=True)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()  # pylint: disable=no-value-for-parameter
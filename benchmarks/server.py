@@ -0,0 +1,184 @@
+import contextlib
+import datetime
+import threading
+import typing
+
+import flask
+from flask import Flask, jsonify, request
+from flask_loopback import FlaskLoopback
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+_CHUNK = bytes(range(256)) * 4096
+_START = datetime.datetime(year=2020, month=2, day=27).isoformat() + "Z"
+_MTIME = datetime.datetime(year=2020, month=2, day=27, hour=12).isoformat() + "Z"
+LOOPBACK_HOST = "scotty-bench"
+
+
+class SyntheticData(object):
+    """N beams of M files each, all of them tagged `tag` and associated with `issue`
+
+    :param int beams: Number of beams.
+    :param int files: Number of files in every beam.
+    :param int file_size: Size in bytes of every file."""
+
+    tag = "bench"
+    issue = "BENCH-1"
+
+    def __init__(self, beams: int, files: int, file_size: int):
+        self.beam_count = beams
+        self.files_per_beam = files
+        self.file_size = file_size
+
+    def beam(self, beam_id: int) -> typing.Dict[str, typing.Any]:
+        first_file = beam_id * self.files_per_beam
+        return {
+            "id": beam_id,
+            "start": _START,
+            "size": self.files_per_beam * self.file_size,
+            "host": "bench-host",
+            "comment": None,
+            "directory": "/var/log/bench/{}".format(beam_id),
+            "initiator": 1,
+            "error": None,
+            "combadge_contacted": True,
+            "pending_deletion": False,
+            "completed": True,
+            "deleted": False,
+            "pins": [],
+            "tags": [self.tag],
+            "associated_issues": [1],
+            "purge_time": 30,
+            "files": list(range(first_file, first_file + self.files_per_beam)),
+        }
+
+    def file(self, file_id: int, base_url: str) -> typing.Dict[str, typing.Any]:
+        beam_id = file_id // self.files_per_beam
+        file_name = "logs/session_{}/debug_{}.log".format(beam_id, file_id)
+        return {
+            "id": file_id,
+            "beam_id": beam_id,
+            "file_name": file_name,
+            "status": "uploaded",
+            "storage_name": "{}/{}".format(beam_id, file_name),
+            "size": self.file_size,
+            "url": "{}file_contents/{}".format(base_url, file_id),
+            "mtime": _MTIME,
+        }
+
+    def content(self, size: int, start: int = 0) -> typing.Iterator[bytes]:
+        """Yield size bytes of the content of a file from the offset start"""
+        offset = start % len(_CHUNK)
+        while size > 0:
+            chunk = _CHUNK[offset : offset + size]
+            offset = 0
+            size -= len(chunk)
+            yield chunk
+
+
+class _QuietRequestHandler(WSGIRequestHandler):
+    def log_request(self, *args: typing.Any, **kwargs: typing.Any) -> None:
+        pass
+
+
+def make_app(data: SyntheticData) -> Flask:
+    app = Flask(__name__)
+
+    @app.route("/info")
+    def info() -> typing.Any:
+        return jsonify({"transporter": "bench-transporter", "version": "0.0.0"})
+
+    @app.route("/beams")
+    def beams_index() -> typing.Any:
+        page = int(request.values.get("page", 1))
+        per_page = int(request.values.get("per_page", data.beam_count or 1))
+        beam_ids = list(range(data.beam_count))
+        if "tag" in request.values:
+            if request.values["tag"] != data.tag:
+                beam_ids = []
+        elif "issue" in request.values:
+            if request.values["issue"] != data.issue:
+                beam_ids = []
+        total_pages = max(1, -(-len(beam_ids) // per_page))
+        page_ids = beam_ids[(page - 1) * per_page : page * per_page]
+        return jsonify(
+            {
+                "beams": [data.beam(beam_id) for beam_id in page_ids],
+                "meta": {"total_pages": total_pages},
+            }
+        )
+
+    @app.route("/beams/<int:beam_id>")
+    def single_beam(beam_id: int) -> typing.Any:
+        if beam_id >= data.beam_count:
+            flask.abort(404)
+        return jsonify({"beam": data.beam(beam_id)})
+
+    @app.route("/files")
+    def files_index() -> typing.Any:
+        beam_id = int(request.values["beam_id"])
+        filter_ = request.values.get("filter")
+        first_file = beam_id * data.files_per_beam
+        files = (
+            data.file(file_id, request.host_url)
+            for file_id in range(first_file, first_file + data.files_per_beam)
+        )
+        if filter_:
+            files = (f for f in files if filter_.lower() in f["file_name"].lower())
+        return jsonify({"files": list(files)})
+
+    @app.route("/files/<int:file_id>")
+    def single_file(file_id: int) -> typing.Any:
+        return jsonify({"file": data.file(file_id, request.host_url)})
+
+    @app.route("/file_contents/<int:file_id>")
+    def file_contents(file_id: int) -> typing.Any:
+        if request.range is None:
+            return flask.Response(
+                data.content(data.file_size),
+                mimetype="application/octet-stream",
+                headers={"Content-Length": str(data.file_size)},
+            )
+        byte_range = request.range.range_for_length(data.file_size)
+        if byte_range is None:
+            return flask.Response(
+                status=416,
+                headers={"Content-Range": "bytes */{}".format(data.file_size)},
+            )
+        start, stop = byte_range
+        return flask.Response(
+            data.content(stop - start, start),
+            status=206,
+            mimetype="application/octet-stream",
+            headers={
+                "Content-Length": str(stop - start),
+                "Content-Range": request.range.to_content_range_header(data.file_size),
+            },
+        )
+
+    return app
+
+
+@contextlib.contextmanager
+def serve(data: SyntheticData, transport: str = "loopback") -> typing.Iterator[str]:
+    """Serve `data` and yield the base URL of the stand-in server.
+
+    With the ``loopback`` transport requests are dispatched in-process through flask_loopback,
+    measuring the client alone. The ``http`` transport runs a threaded HTTP server on localhost,
+    which includes the socket and HTTP parsing overhead."""
+    app = make_app(data)
+    if transport == "loopback":
+        with FlaskLoopback(app).on((LOOPBACK_HOST, 80)):
+            yield "http://{}".format(LOOPBACK_HOST)
+    elif transport == "http":
+        server = make_server(
+            "127.0.0.1", 0, app, threaded=True, request_handler=_QuietRequestHandler
+        )
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            yield "http://127.0.0.1:{}".format(server.server_port)
+        finally:
+            server.shutdown()
+            thread.join()
+    else:
+        raise ValueError("Unknown transport {}".format(transport))
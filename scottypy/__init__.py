@@ -1,4 +1,35 @@
-from .beam import Beam
-from .exc import NotOverwriting
-from .file import File
-from .scotty import Scotty
+import importlib
+import sys
+import typing
+
+# The public classes are imported on first access (PEP 562), so that importing a
+# submodule, e.g. by the scotty command line tool, doesn't drag in requests and friends
+_LAZY_ATTRIBUTES = {
+    "Beam": ".beam",
+    "File": ".file",
+    "NotOverwriting": ".exc",
+    "Scotty": ".scotty",
+    "Tracer": ".tracing",
+}
+
+if typing.TYPE_CHECKING or sys.version_info < (3, 7):
+    from .beam import Beam
+    from .exc import NotOverwriting
+    from .file import File
+    from .scotty import Scotty
+    from .tracing import Tracer
+else:
+
+    def __getattr__(name: str) -> typing.Any:
+        try:
+            module_name = _LAZY_ATTRIBUTES[name]
+        except KeyError:
+            raise AttributeError(
+                "module {!r} has no attribute {!r}".format(__name__, name)
+            ) from None
+        value = getattr(importlib.import_module(module_name, __name__), name)
+        globals()[name] = value
+        return value
+
+    def __dir__() -> typing.List[str]:
+        return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
@@ -2,23 +2,33 @@ import json
 import logging
 import os
 import re
+import sys
+import time
 import typing
-import webbrowser
-from getpass import getpass
+from concurrent.futures import ThreadPoolExecutor
 
-import capacity
 import click
 
-from .exc import NotOverwriting
-from .scotty import Scotty
+from . import checksum, metrics
+from .download import download_beam, write_beam_info
+from .exc import BulkOperationError, CombadgeError
+from .filters import BeamSelector, FileFilter, parse_size, parse_time
+from .progress_bar import DownloadProgress, echo_upload_progress
+from .tracing import Tracer
 from .types import JSON
 
 if typing.TYPE_CHECKING:
+    from concurrent.futures import Future
+    from datetime import datetime
+
     from .beam import Beam
+    from .file import File
+    from .scotty import Scotty
 
 
 _CONFIG_PATH = os.path.expanduser("~/.scotty.conf")
 _BEAM_PATH = re.compile(r"^([^@:]+)@([^@:]+):(.*)$")
+_TAIL_BLOCK = 64 * 1024
 
 
 def _get_config() -> JSON:
@@ -37,8 +47,46 @@ def _save_config(config: JSON) -> None:
 
 @click.group()
 @click.version_option()
-def main() -> None:
-    pass
+@click.option(
+    "--metrics-textfile",
+    envvar="SCOTTY_METRICS_TEXTFILE",
+    default=None,
+    help="Write client metrics to this Prometheus textfile when done",
+)
+@click.option(
+    "--metrics-interval",
+    envvar="SCOTTY_METRICS_INTERVAL",
+    type=float,
+    default=None,
+    help="Also rewrite the metrics textfile every this many seconds",
+)
+def main(
+    metrics_textfile: typing.Optional[str], metrics_interval: typing.Optional[float]
+) -> None:
+    if metrics_textfile:
+        metrics.enable_textfile_export(metrics_textfile, interval=metrics_interval)
+
+
+def _size_option(
+    ctx: click.Context, param: click.Parameter, value: typing.Optional[str]
+) -> typing.Optional[int]:
+    if value is None:
+        return None
+    try:
+        return parse_size(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+
+
+def _time_option(
+    ctx: click.Context, param: click.Parameter, value: typing.Optional[str]
+) -> typing.Optional["datetime"]:
+    if value is None:
+        return None
+    try:
+        return parse_time(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
 
 
 def _get_url() -> str:
@@ -52,20 +100,12 @@ You can set the URL either by using the --url flag or by running \"scotty set_ur
     return url
 
 
-def _write_beam_info(beam: "Beam", directory: str) -> None:
-    with open(os.path.join(directory, "beam.txt"), "w") as f:
-        f.write(
-            """Start: {start}
-Host: {host}
-Directory: {directory}
-Comment: {comment}
-""".format(
-                start=beam.start,
-                host=beam.host,
-                directory=beam.directory,
-                comment=beam.comment,
-            )
-        )
+def _connect(url: str) -> "Scotty":
+    # Imported here so that commands which don't talk to Scotty, such as --help,
+    # don't pay for importing requests
+    from .scotty import Scotty
+
+    return Scotty(url)
 
 
 def _link_beam(storage_base: str, beam: "Beam", dest: str) -> None:
@@ -75,7 +115,7 @@ def _link_beam(storage_base: str, beam: "Beam", dest: str) -> None:
     for file_ in beam.get_files():
         file_.link(storage_base, dest)
 
-    _write_beam_info(beam, dest)
+    write_beam_info(beam, dest)
 
     click.echo("Created a view of beam {} in {}".format(beam.id, dest))
 
@@ -91,7 +131,7 @@ def link(beam_id_or_tag: str, url: str, storage_base: str, dest: str) -> None:
     """Create symbolic links representing a single beam or a set of beams by their tag ID.
     To link a specific beam just use write its id as an argument.
     To link an entire tag specify t:[tag_name] as an argument, replacing [tag_name] with the name of the tag"""
-    scotty = Scotty(url)
+    scotty = _connect(url)
 
     if beam_id_or_tag.startswith("t:"):
         tag = beam_id_or_tag[2:]
@@ -108,48 +148,67 @@ def link(beam_id_or_tag: str, url: str, storage_base: str, dest: str) -> None:
         _link_beam(storage_base, beam, dest)
 
 
+def _fetch_with_files(
+    beams: typing.Iterator["Beam"], executor: ThreadPoolExecutor
+) -> typing.Optional[typing.Tuple["Beam", "Future[typing.List[File]]"]]:
+    beam = next(beams, None)
+    if beam is None:
+        return None
+    return beam, executor.submit(beam.get_files)
+
+
+def _prefetch_files(
+    beams: typing.Iterator["Beam"], executor: ThreadPoolExecutor
+) -> typing.Iterator[typing.Tuple["Beam", "Future[typing.List[File]]"]]:
+    """Yield every beam along with a future of its files as soon as the beam details arrive.
+    The next beam and its files are fetched while the caller handles the current one."""
+    fetching = executor.submit(_fetch_with_files, beams, executor)
+    while True:
+        fetched = fetching.result()
+        if fetched is None:
+            return
+        fetching = executor.submit(_fetch_with_files, beams, executor)
+        yield fetched
+
+
 @main.command()
 @click.argument("beam_id_or_tag")
 @click.option("--url", default=_get_url, help="Base URL of Scotty")
 def show(beam_id_or_tag: str, url: str) -> None:
     """List the files of the given beam or tag"""
-    scotty = Scotty(url)
-
-    def _list(beam: "Beam") -> None:
-        print("Beam #{}".format(beam.id))
-        print("    Host: {}".format(beam.host))
-        print("    Directory: {}".format(beam.directory))
-        print("    Size: {}".format(beam.size * capacity.byte))
-        print("    Files:")
-        for file_ in beam.get_files():
-            print("        {} ({})".format(file_.file_name, file_.size * capacity.byte))
+    import capacity
 
-        print("")
+    scotty = _connect(url)
+    out = sys.stdout
 
+    beams = None  # type: typing.Optional[typing.Iterator[Beam]]
     if beam_id_or_tag.startswith("t:"):
-        tag = beam_id_or_tag[2:]
-        for beam in scotty.get_beams_by_tag(tag):
-            _list(beam)
+        beams = scotty.iter_beams_by_tag(beam_id_or_tag[2:])
     else:
-        _list(scotty.get_beam(beam_id_or_tag))
-
-
-def _download_beam(beam: "Beam", dest: str, overwrite: bool, filter: str) -> None:
-    if not os.path.isdir(dest):
-        os.makedirs(dest)
-
-    click.echo("Downloading beam {} to directory {}".format(beam.id, dest))
-
-    for file_ in beam.get_files(filter_=filter):
-        click.echo("Downloading {}".format(file_.file_name))
-        try:
-            file_.download(dest, overwrite=overwrite)
-        except NotOverwriting as e:
-            click.echo("{} already exists. Use --overwrite to overwrite".format(e.file))
-
-    _write_beam_info(beam, dest)
-
-    click.echo("Downloaded beam {} to directory {}".format(beam.id, dest))
+        beams = iter([scotty.get_beam(beam_id_or_tag)])
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        for beam, files in _prefetch_files(beams, executor):
+            out.write(
+                "Beam #{}\n"
+                "    Host: {}\n"
+                "    Directory: {}\n"
+                "    Size: {}\n"
+                "    Files:\n".format(
+                    beam.id, beam.host, beam.directory, beam.size * capacity.byte
+                )
+            )
+            out.flush()
+            out.write(
+                "".join(
+                    "        {} ({})\n".format(
+                        file_.file_name, file_.size * capacity.byte
+                    )
+                    for file_ in files.result()
+                )
+            )
+            out.write("\n")
+            out.flush()
 
 
 @main.command()
@@ -162,31 +221,380 @@ def _download_beam(beam: "Beam", dest: str, overwrite: bool, filter: str) -> Non
     default=None,
     help="Download only files that contain the given string in their name (case insensetive)",
 )
+@click.option(
+    "--glob",
+    "globs",
+    multiple=True,
+    help="Download only files whose path matches the glob pattern. Can be specified multiple times",
+)
+@click.option(
+    "--regex", default=None, help="Download only files whose path matches the regex"
+)
+@click.option(
+    "--min-size",
+    callback=_size_option,
+    default=None,
+    help="Download only files of at least this size, e.g. 1M",
+)
+@click.option(
+    "--max-size",
+    callback=_size_option,
+    default=None,
+    help="Download only files of at most this size, e.g. 1G",
+)
+@click.option(
+    "--since",
+    callback=_time_option,
+    default=None,
+    help="Download only files modified since, either an age (e.g. 2h, 7d) or a date",
+)
+@click.option(
+    "--until",
+    callback=_time_option,
+    default=None,
+    help="Download only files modified until, either an age (e.g. 2h, 7d) or a date",
+)
 @click.option(
     "--overwrite/--no-overwrite",
     default=False,
     help="Overwrite existing files on the disk",
 )
+@click.option(
+    "--sync",
+    is_flag=True,
+    default=False,
+    help="Download only files which are missing or changed since the last download",
+)
+@click.option(
+    "--checksum",
+    "algorithm",
+    type=click.Choice(checksum.available_algorithms()),
+    default=checksum.DEFAULT_ALGORITHM,
+    help="Digest algorithm of the download manifest",
+)
 def down(
-    beam_id_or_tag: str, dest: str, url: str, overwrite: bool, filter: str
+    beam_id_or_tag: str,
+    dest: str,
+    url: str,
+    overwrite: bool,
+    filter: str,
+    globs: typing.List[str],
+    regex: typing.Optional[str],
+    min_size: typing.Optional[int],
+    max_size: typing.Optional[int],
+    since: typing.Optional["datetime"],
+    until: typing.Optional["datetime"],
+    sync: bool,
+    algorithm: str,
 ) -> None:  # pylint: disable=W0622
     """Download a single beam or a set of beams by their tag ID.
     To download a specific beam just use write its id as an argument.
     To download an entire tag specify t:[tag_name] as an argument, replacing [tag_name] with the name of the tag"""
-    scotty = Scotty(url)
+    scotty = _connect(url)
+
+    file_filter = filter  # type: typing.Union[str, FileFilter, None]
+    if globs or regex or any(x is not None for x in (min_size, max_size, since, until)):
+        file_filter = FileFilter(
+            substring=filter,
+            globs=globs,
+            regex=regex,
+            min_size=min_size,
+            max_size=max_size,
+            since=since,
+            until=until,
+        )
 
+    def _download(beam: "Beam", directory: str) -> int:
+        return len(
+            download_beam(
+                beam,
+                directory,
+                overwrite,
+                file_filter,
+                sync,
+                algorithm,
+                DownloadProgress(sys.stdout.isatty()),
+            )
+        )
+
+    failures = 0
     if beam_id_or_tag.startswith("t:"):
         tag = beam_id_or_tag[2:]
         if dest is None:
             dest = tag
 
         for beam in scotty.get_beams_by_tag(tag):
-            _download_beam(beam, os.path.join(dest, str(beam.id)), overwrite, filter)
+            failures += _download(beam, os.path.join(dest, str(beam.id)))
     else:
         beam = scotty.get_beam(beam_id_or_tag)
         if dest is None:
             dest = beam_id_or_tag
-        _download_beam(beam, dest, overwrite, filter)
+        failures += _download(beam, dest)
+
+    if failures:
+        raise click.ClickException(
+            "{} files failed checksum verification".format(failures)
+        )
+
+
+@main.command()
+@click.argument("pattern")
+@click.argument("beam_id_or_tag")
+@click.option("--url", default=_get_url, help="Base URL of Scotty")
+@click.option(
+    "--glob",
+    "globs",
+    multiple=True,
+    help="Search only files whose path matches the glob pattern. Can be specified multiple times",
+)
+@click.option(
+    "-i", "--ignore-case", is_flag=True, default=False, help="Ignore case distinctions"
+)
+@click.option(
+    "-m",
+    "--max-count",
+    type=int,
+    default=None,
+    help="Stop after this many matching lines",
+)
+@click.option(
+    "--workers", type=int, default=4, help="Number of files to search at once"
+)
+def grep(
+    pattern: str,
+    beam_id_or_tag: str,
+    url: str,
+    globs: typing.List[str],
+    ignore_case: bool,
+    max_count: typing.Optional[int],
+    workers: int,
+) -> None:
+    """Print the lines of the files of a beam or a tag which match a regular expression.
+    Files are streamed from Scotty and searched without writing them to the disk"""
+    from .grep import Match, search_files
+
+    try:
+        compiled = re.compile(
+            pattern.encode("utf-8"),
+            re.MULTILINE | (re.IGNORECASE if ignore_case else 0),
+        )
+    except re.error as e:
+        raise click.BadParameter(str(e), param_hint="PATTERN")
+
+    scotty = _connect(url)
+    if beam_id_or_tag.startswith("t:"):
+        beams = scotty.iter_beams_by_tag(beam_id_or_tag[2:])
+    else:
+        beams = iter([scotty.get_beam(beam_id_or_tag)])
+    file_filter = FileFilter(globs=globs) if globs else None
+    beam_ids = {}  # type: typing.Dict[int, int]
+
+    def _files() -> typing.Iterator["File"]:
+        for beam in beams:
+            for file_ in beam.get_files(filter_=file_filter):
+                beam_ids[file_.id] = beam.id
+                yield file_
+
+    matched = [False]
+
+    def _print_match(match: Match) -> None:
+        matched[0] = True
+        click.echo(
+            "{}/{}:{}:{}".format(
+                beam_ids[match.file.id],
+                match.file.file_name,
+                match.line_number,
+                match.text,
+            )
+        )
+
+    failures = search_files(
+        _files(), compiled, _print_match, max_count=max_count, max_workers=workers
+    )
+    for file_, error in failures:
+        click.echo("{}: {}".format(file_.file_name, error), err=True)
+    if failures:
+        raise click.ClickException(
+            "{} files could not be searched".format(len(failures))
+        )
+    if not matched[0]:
+        sys.exit(1)
+
+
+def _find_file(beam: "Beam", file_name: str) -> "File":
+    files = [
+        file_
+        for file_ in beam.get_files(filter_=file_name)
+        if file_name.lower() in file_.file_name.lower()
+    ]
+    exact = [file_ for file_ in files if file_.file_name == file_name]
+    if exact:
+        return exact[0]
+    if len(files) == 1:
+        return files[0]
+    if not files:
+        raise click.ClickException(
+            "Beam {} has no file named {}".format(beam.id, file_name)
+        )
+    raise click.ClickException(
+        "{} matches several files: {}".format(
+            file_name, ", ".join(file_.file_name for file_ in files)
+        )
+    )
+
+
+def _last_lines(file_: "File", lines: int, end: int) -> bytes:
+    """Return the last lines of the first end bytes of a file, fetching blocks from its end
+    until there are enough"""
+    start = end
+    block = _TAIL_BLOCK
+    data = b""
+    while start > 0 and data.count(b"\n") <= lines:
+        block_end, start = start, max(0, start - block)
+        data = file_.read_range(start, block_end) + data
+        block *= 2
+
+    terminated = data.endswith(b"\n")
+    parts = data.split(b"\n")
+    if terminated:
+        parts.pop()
+    kept = parts[-lines:] if lines else []
+    return b"\n".join(kept) + (b"\n" if kept and terminated else b"")
+
+
+@main.command()
+@click.argument("beam_id")
+@click.argument("file_name")
+@click.option("-n", "--lines", type=int, default=10, help="Number of lines to print")
+@click.option(
+    "-f",
+    "--follow",
+    is_flag=True,
+    default=False,
+    help="Keep printing what is appended to the file until the beam is completed",
+)
+@click.option(
+    "--interval",
+    type=float,
+    default=2,
+    help="Seconds between checks for new content when following",
+)
+@click.option("--url", default=_get_url, help="Base URL of Scotty")
+def tail(
+    beam_id: str,
+    file_name: str,
+    lines: int,
+    follow: bool,
+    interval: float,
+    url: str,
+) -> None:
+    """Print the last lines of a file of a beam, fetching only the end of the file"""
+    scotty = _connect(url)
+    beam = scotty.get_beam(beam_id)
+    file_ = _find_file(beam, file_name)
+
+    offset = file_.size
+    click.echo(_last_lines(file_, lines, offset), nl=False)
+    if not follow:
+        return
+
+    while True:
+        completed = beam.completed
+        data = file_.read_range(offset)
+        if data:
+            click.echo(data, nl=False)
+            offset += len(data)
+        if completed:
+            return
+        time.sleep(interval)
+        beam.update()
+
+
+@main.command()
+@click.argument("tag")
+@click.option("--dest", default=None, help="Destination directory")
+@click.option("--url", default=_get_url, help="Base URL of Scotty")
+@click.option(
+    "--workers", type=int, default=4, help="Number of beams to download at once"
+)
+@click.option(
+    "--min-interval",
+    type=float,
+    default=30,
+    help="Seconds between polls while beams are coming in",
+)
+@click.option(
+    "--max-interval",
+    type=float,
+    default=600,
+    help="Maximal seconds between polls while nothing happens",
+)
+@click.option(
+    "--once", is_flag=True, default=False, help="Poll once instead of running forever"
+)
+@click.option(
+    "--checksum",
+    "algorithm",
+    type=click.Choice(checksum.available_algorithms()),
+    default=checksum.DEFAULT_ALGORITHM,
+    help="Digest algorithm of the download manifests",
+)
+def mirror(
+    tag: str,
+    dest: typing.Optional[str],
+    url: str,
+    workers: int,
+    min_interval: float,
+    max_interval: float,
+    once: bool,
+    algorithm: str,
+) -> None:
+    """Keep downloading the completed beams of a tag, given as t:[tag_name], into a directory"""
+    from .mirror import Mirror
+
+    if not tag.startswith("t:"):
+        raise click.BadParameter("Give the tag as t:[tag_name]", param_hint="TAG")
+    tag = tag[2:]
+
+    failed = []  # type: typing.List[int]
+
+    def _download(beam: "Beam", directory: str) -> None:
+        try:
+            # Beams are downloaded in parallel, so rather than bars which would overwrite
+            # each other, every file is reported on its own line
+            failures = download_beam(
+                beam,
+                directory,
+                sync=True,
+                algorithm=algorithm,
+                progress=DownloadProgress(interactive=False),
+            )
+        except Exception:
+            failed.append(beam.id)
+            raise
+        if failures:
+            failed.append(beam.id)
+            raise click.ClickException(
+                "{} files failed checksum verification".format(len(failures))
+            )
+
+    mirror_ = Mirror(
+        _connect(url),
+        tag,
+        dest or tag,
+        _download,
+        max_workers=workers,
+        min_interval=min_interval,
+        max_interval=max_interval,
+    )
+    if once:
+        mirror_.poll()
+        if failed:
+            raise click.ClickException(
+                "Failed mirroring beams {}".format(", ".join(map(str, failed)))
+            )
+    else:
+        mirror_.run()
 
 
 @main.group()
@@ -206,20 +614,73 @@ def up() -> None:
     multiple=True,
     help="Tag to be associated with the beam. Can be specified multiple times",
 )
+@click.option(
+    "--trace",
+    is_flag=True,
+    default=False,
+    help="Print the duration of each phase of the beam when done",
+)
+@click.option(
+    "-x",
+    "--exclude",
+    multiple=True,
+    help="Glob pattern of files or directories not to beam, such as *.core. Can be specified multiple times",
+)
+@click.option(
+    "--progress",
+    is_flag=True,
+    default=False,
+    help="Scan the directory first and print the progress of the beam",
+)
+@click.option(
+    "--incremental",
+    is_flag=True,
+    default=False,
+    help="Only beam the files which are new or modified since the last incremental beam of the directory",
+)
+@click.option(
+    "--timeout",
+    type=float,
+    default=None,
+    help="Give up on the combadge if it runs for longer than this many seconds",
+)
 def local(
-    directory: str, url: str, tags: typing.List[str], issue: str, tracker: str
+    directory: str,
+    url: str,
+    tags: typing.List[str],
+    issue: str,
+    tracker: str,
+    trace: bool,
+    exclude: typing.List[str],
+    progress: bool,
+    incremental: bool,
+    timeout: typing.Optional[float],
 ) -> None:
     logging.basicConfig(
         format="%(name)s:%(levelname)s:%(message)s", level=logging.DEBUG
     )
 
-    scotty = Scotty(url)
+    scotty = _connect(url)
 
     click.echo("Beaming up {}".format(directory))
-    beam_id = scotty.beam_up(
-        directory, tags=tags, associated_issue=issue, tracker_name=tracker
-    )
+    tracer = Tracer("beam_up") if trace else None
+    try:
+        beam_id = scotty.beam_up(
+            directory,
+            tags=tags,
+            associated_issue=issue,
+            tracker_name=tracker,
+            tracer=tracer,
+            exclude=exclude,
+            progress_callback=echo_upload_progress if progress else None,
+            incremental=incremental,
+            combadge_timeout=timeout,
+        )
+    except CombadgeError as e:
+        raise click.ClickException(str(e))
     click.echo("Successfully beamed beam #{}".format(beam_id))
+    if tracer is not None:
+        click.echo(tracer.format_report())
 
 
 @up.command()
@@ -247,7 +708,10 @@ def remote(
     stored_key: str,
     tags: typing.List[str],
 ) -> None:
-    scotty = Scotty(url)
+    import webbrowser
+    from getpass import getpass
+
+    scotty = _connect(url)
 
     m = _BEAM_PATH.search(path)
     if not m:
@@ -293,13 +757,121 @@ def remote(
 )
 @click.option("--url", default=_get_url, help="Base URL of Scotty")
 @click.argument("tag")
-@click.argument("beam")
-def tag_beam(tag: str, beam: int, delete: bool, url: str) -> None:
-    scotty = Scotty(url)
-    if delete:
-        scotty.remove_tag(beam, tag)
-    else:
-        scotty.add_tag(beam, tag)
+@click.argument("beams", nargs=-1)
+def tag_beam(tag: str, beams: typing.Tuple[str, ...], delete: bool, url: str) -> None:
+    """Add a tag to beams, or remove it with -d.
+    The beam IDs are read from the standard input when none or - are given"""
+    if not beams or beams == ("-",):
+        beams = tuple(sys.stdin.read().split())
+    try:
+        beam_ids = [int(beam) for beam in beams]
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="BEAMS")
+
+    scotty = _connect(url)
+    try:
+        if delete:
+            scotty.remove_tags(beam_ids, [tag])
+        else:
+            scotty.add_tags(beam_ids, [tag])
+    except BulkOperationError as e:
+        raise click.ClickException(str(e))
+
+
+@main.command()
+@click.option("-t", "--tag", default=None, help="Select the beams with this tag")
+@click.option(
+    "--issue", default=None, help="Select the beams associated with this issue"
+)
+@click.option(
+    "--older-than",
+    callback=_time_option,
+    help="Only beams started before this time, either an age such as 30d or a date",
+)
+@click.option(
+    "--min-size", callback=_size_option, help="Only beams of at least this size"
+)
+@click.option(
+    "--max-size", callback=_size_option, help="Only beams of at most this size"
+)
+@click.option(
+    "--include-pinned",
+    is_flag=True,
+    default=False,
+    help="Delete pinned beams too",
+)
+@click.option(
+    "--dry-run",
+    is_flag=True,
+    default=False,
+    help="Only show which beams would be deleted and how much space that would reclaim",
+)
+@click.option("-y", "--yes", is_flag=True, default=False, help="Delete without asking")
+@click.option(
+    "--workers", type=int, default=8, help="Number of beams to delete at once"
+)
+@click.option(
+    "--rate", type=float, default=None, help="Maximal number of deletions per second"
+)
+@click.option("--url", default=_get_url, help="Base URL of Scotty")
+def purge(
+    tag: typing.Optional[str],
+    issue: typing.Optional[str],
+    older_than: typing.Optional["datetime"],
+    min_size: typing.Optional[int],
+    max_size: typing.Optional[int],
+    include_pinned: bool,
+    dry_run: bool,
+    yes: bool,
+    workers: int,
+    rate: typing.Optional[float],
+    url: str,
+) -> None:
+    """Delete the beams with a tag or an issue, optionally only old or big ones"""
+    import capacity
+
+    try:
+        selector = BeamSelector(
+            tag=tag,
+            issue=issue,
+            older_than=older_than,
+            min_size=min_size,
+            max_size=max_size,
+            include_pinned=include_pinned,
+        )
+    except ValueError as e:
+        raise click.UsageError(str(e))
+
+    scotty = _connect(url)
+    report = scotty.delete_beams(selector, dry_run=True)
+    for beam in report.beams:
+        click.echo(
+            "Beam #{} of {} from {} ({})".format(
+                beam.id, beam.host, beam.start, beam.size * capacity.byte
+            )
+        )
+    click.echo(
+        "{} beams, {} reclaimable".format(
+            len(report.beams), report.reclaimable_size * capacity.byte
+        )
+    )
+    if dry_run or not report.beams:
+        return
+    if not yes:
+        click.confirm("Delete them?", abort=True)
+
+    report = scotty.delete_beams(report.beams, max_workers=workers, rate=rate)
+    click.echo(
+        "Deleted {} beams, reclaiming {}".format(
+            len(report.deleted), report.reclaimed_size * capacity.byte
+        )
+    )
+    if report.failures:
+        for beam, error in report.failures:
+            click.echo("Failed deleting beam #{}: {}".format(beam.id, error), err=True)
+        raise click.ClickException(
+            "{} beams could not be deleted".format(len(report.failures))
+        )
 
 
 @main.command()
@@ -307,7 +879,7 @@ def tag_beam(tag: str, beam: int, delete: bool, url: str) -> None:
 def set_url(url: str) -> None:
     config = _get_config()
 
-    scotty = Scotty(url)
+    scotty = _connect(url)
     scotty.sanity_check()
 
     config["url"] = url
@@ -320,7 +892,7 @@ def set_url(url: str) -> None:
 @click.option("--url", default=_get_url, help="Base URL of Scotty")
 def set_comment(beam_id: int, url: str, comment: str) -> None:
     """Set a comment for the specified beam"""
-    scotty = Scotty(url)
+    scotty = _connect(url)
 
     beam = scotty.get_beam(beam_id)
     beam.set_comment(comment)
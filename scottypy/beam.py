@@ -1,17 +1,17 @@
-import json
 import typing
 
-import dateutil.parser
-from pact import Pact
-
 from scottypy.utils import raise_for_status
 
+from . import jsonlib
 from .types import JSON
 
 if typing.TYPE_CHECKING:
     from datetime import datetime
 
+    from pact import Pact
+
     from .file import File
+    from .filters import FileFilter
     from .scotty import Scotty
 
 
@@ -75,7 +75,7 @@ class Beam(object):
             "{0}/beams/{1}".format(self._scotty.url, self.id)
         )
         raise_for_status(response)
-        beam_obj = response.json()["beam"]
+        beam_obj = jsonlib.response_json(response)["beam"]
 
         self._file_ids = beam_obj["files"]
         self.deleted = beam_obj["deleted"]
@@ -89,6 +89,8 @@ class Beam(object):
 
     @classmethod
     def from_json(cls, scotty: "Scotty", json_node: JSON) -> "Beam":
+        import dateutil.parser
+
         return cls(
             scotty,
             json_node["id"],
@@ -114,16 +116,20 @@ class Beam(object):
         for id_ in self._file_ids:
             yield self._scotty.get_file(id_)
 
-    def get_files(self, filter_: typing.Optional[str] = None) -> typing.List["File"]:
+    def get_files(
+        self, filter_: typing.Union[str, "FileFilter", None] = None
+    ) -> typing.List["File"]:
         """Get a list of :class:`.File` instances representing the beam files.
 
-        :ivar filter_: Optional filter string. When given, only files which their name contains the filter will be returned."""
+        :ivar filter_: Optional filter string. When given, only files which their name contains the filter will be returned.
+          A :class:`.FileFilter` can be given instead, for filtering by globs, regular expressions,
+          sizes and times."""
         return self._scotty.get_files(self.id, filter_)
 
     def set_comment(self, comment: str) -> None:
         data = {"beam": {"comment": comment}}
         response = self._scotty.session.put(
-            "{0}/beams/{1}".format(self._scotty.url, self.id), data=json.dumps(data)
+            "{0}/beams/{1}".format(self._scotty.url, self.id), data=jsonlib.dumps(data)
         )
         raise_for_status(response)
         self._comment = comment
@@ -140,8 +146,10 @@ class Beam(object):
         self.update()
         return self.completed
 
-    def get_pact(self) -> Pact:
+    def get_pact(self) -> "Pact":
         """Get a Pact instance. The pact is finished when the beam has been completed"""
+        from pact import Pact
+
         pact = Pact("Waiting for beam {}".format(self.id))
         pact.until(self._check_finish)
         return pact
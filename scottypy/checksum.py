@@ -0,0 +1,92 @@
+import hashlib
+import logging
+import typing
+
+from .types import Buffer
+
+if typing.TYPE_CHECKING:
+    from typing_extensions import Protocol
+else:
+    Protocol = object
+
+
+class Hasher(Protocol):
+    def update(self, data: Buffer) -> None:
+        """Digest data"""
+
+    def hexdigest(self) -> str:
+        """Return the digest of the data so far"""
+
+
+logger = logging.getLogger("scotty.checksum")  # type: logging.Logger
+
+DEFAULT_ALGORITHM = "sha256"
+
+_ALGORITHMS = {
+    "md5": hashlib.md5,
+    "sha1": hashlib.sha1,
+    "sha256": hashlib.sha256,
+    "sha512": hashlib.sha512,
+    "blake2b": hashlib.blake2b,
+}  # type: typing.Dict[str, typing.Callable[[], Hasher]]
+
+# Used to guess the algorithm of checksums given by the server without an algorithm prefix
+_ALGORITHM_BY_HEX_LENGTH = {32: "md5", 40: "sha1", 64: "sha256", 128: "sha512"}
+
+
+def register_algorithm(name: str, factory: typing.Callable[[], Hasher]) -> None:
+    """Make a digest algorithm available for verifying downloads.
+
+    :param str name: The name of the algorithm, as used in server checksums such as ``name:hexdigest``.
+    :param factory: A callable returning a new object with ``update`` and ``hexdigest`` methods,
+      e.g. ``xxhash.xxh64``."""
+    _ALGORITHMS[name] = factory
+
+
+def available_algorithms() -> typing.List[str]:
+    return sorted(_ALGORITHMS)
+
+
+def new(algorithm: str) -> Hasher:
+    try:
+        factory = _ALGORITHMS[algorithm]
+    except KeyError:
+        raise ValueError(
+            "Unknown checksum algorithm {}. Available algorithms: {}".format(
+                algorithm, ", ".join(available_algorithms())
+            )
+        ) from None
+    return factory()
+
+
+def parse_checksum(checksum: str) -> typing.Tuple[str, str]:
+    """Split a checksum in the form of ``algorithm:hexdigest`` to its parts.
+    A bare hex digest is assumed to be of the algorithm matching its length."""
+    algorithm, separator, digest = checksum.partition(":")
+    if separator:
+        return algorithm.lower(), digest.lower()
+    try:
+        return _ALGORITHM_BY_HEX_LENGTH[len(checksum)], checksum.lower()
+    except KeyError:
+        raise ValueError("Cannot parse checksum {!r}".format(checksum)) from None
+
+
+def parse_server_checksum(
+    checksum: typing.Optional[str],
+) -> typing.Optional[typing.Tuple[str, str]]:
+    """Split a checksum given by the server to its algorithm and hex digest, see
+    :func:`parse_checksum`.
+
+    :return: None if there is no checksum or it cannot be verified, e.g. as its algorithm isn't
+      registered. Such a checksum is logged and treated as absent."""
+    if not checksum:
+        return None
+    try:
+        algorithm, digest = parse_checksum(checksum)
+    except ValueError as e:
+        logger.warning("Ignoring the server checksum: %s", e)
+        return None
+    if algorithm not in _ALGORITHMS:
+        logger.warning("Ignoring the server checksum %r: Unknown algorithm", checksum)
+        return None
+    return algorithm, digest
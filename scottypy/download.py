@@ -0,0 +1,116 @@
+import logging
+import os
+import typing
+
+from . import checksum
+from .exc import ChecksumMismatch, NotOverwriting
+from .manifest import BeamManifest
+
+if typing.TYPE_CHECKING:
+    from .beam import Beam
+    from .filters import FileFilter
+    from .progress_bar import DownloadProgress
+
+logger = logging.getLogger("scotty.download")  # type: logging.Logger
+
+
+def write_beam_info(beam: "Beam", directory: str) -> None:
+    path = os.path.join(directory, "beam.txt")
+    with open(path + ".tmp", "w") as f:
+        f.write(
+            """Start: {start}
+Host: {host}
+Directory: {directory}
+Comment: {comment}
+""".format(
+                start=beam.start,
+                host=beam.host,
+                directory=beam.directory,
+                comment=beam.comment,
+            )
+        )
+    os.replace(path + ".tmp", path)
+
+
+def download_beam(
+    beam: "Beam",
+    directory: str,
+    overwrite: bool = False,
+    filter_: typing.Union[str, "FileFilter", None] = None,
+    sync: bool = False,
+    algorithm: str = checksum.DEFAULT_ALGORITHM,
+    progress: typing.Optional["DownloadProgress"] = None,
+) -> typing.List[ChecksumMismatch]:
+    """Download the files of beam to directory, recording their digests in its
+    :class:`.BeamManifest`, and describe the beam in a beam.txt file.
+
+    Files which the manifest records as intact are skipped unless overwriting, so that an
+    interrupted download resumes where it stopped.
+
+    :param bool sync: Overwrite the files which are not recorded as intact.
+    :param progress: A :class:`.DownloadProgress` to report to. By default, the files are
+      reported to the log.
+    :return: The errors of the files which failed checksum verification."""
+
+    def _report(line: str, err: bool = False) -> None:
+        if progress is not None:
+            progress.echo(line, err=err)
+        elif err:
+            logger.error(line)
+        else:
+            logger.info(line)
+
+    os.makedirs(directory, exist_ok=True)
+    _report("Downloading beam {} to directory {}".format(beam.id, directory))
+
+    manifest = BeamManifest.load(directory)
+    failures = []  # type: typing.List[ChecksumMismatch]
+    pending = []
+    for file_ in beam.get_files(filter_=filter_):
+        if (sync or not overwrite) and manifest.is_synced(
+            file_, file_.get_local_path(directory)
+        ):
+            _report("{} is up to date".format(file_.file_name))
+        else:
+            pending.append(file_)
+
+    if progress is not None:
+        progress.start(sum(file_.size for file_ in pending), len(pending))
+    try:
+        for file_ in pending:
+            try:
+                digest = file_.download(
+                    directory,
+                    overwrite=overwrite or sync,
+                    algorithm=algorithm,
+                    progress_callback=(
+                        None if progress is None else progress.file_callback(file_)
+                    ),
+                )
+            except NotOverwriting as e:
+                _report(
+                    "{} already exists. Use --overwrite to overwrite".format(e.file)
+                )
+                if progress is not None:
+                    progress.file_done(file_)
+                continue
+            except ChecksumMismatch as e:
+                _report(str(e), err=True)
+                if progress is not None:
+                    progress.file_done(file_)
+                failures.append(e)
+                continue
+            assert digest is not None
+            manifest.record(file_, file_.get_local_path(directory), algorithm, digest)
+            if progress is None:
+                _report("Downloaded {}".format(file_.file_name))
+            else:
+                progress.file_downloaded(file_)
+    finally:
+        if progress is not None:
+            progress.close()
+        manifest.save()
+
+    write_beam_info(beam, directory)
+    _report("Downloaded beam {} to directory {}".format(beam.id, directory))
+    return failures
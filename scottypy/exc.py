@@ -1,3 +1,6 @@
+import typing
+
+
 class PathNotExists(Exception):
     def __init__(self, path: str):
         super(PathNotExists, self).__init__("{} does not exist".format(path))
@@ -7,3 +10,91 @@ class NotOverwriting(Exception):
     def __init__(self, file_: str):
         super(NotOverwriting, self).__init__()
         self.file = file_
+
+
+class ChecksumMismatch(Exception):
+    def __init__(self, file_: str, algorithm: str, expected: str, actual: str):
+        super(ChecksumMismatch, self).__init__(
+            "{} checksum mismatch for {}: expected {}, got {}".format(
+                algorithm, file_, expected, actual
+            )
+        )
+        self.file = file_
+        self.algorithm = algorithm
+        self.expected = expected
+        self.actual = actual
+
+
+class IncompleteDownload(Exception):
+    def __init__(self, file_: str, expected: int, actual: int):
+        super(IncompleteDownload, self).__init__(
+            "Downloaded {} of {} bytes of {}".format(actual, expected, file_)
+        )
+        self.file = file_
+        self.expected = expected
+        self.actual = actual
+
+
+class CombadgeError(Exception):
+    """The combadge failed.
+
+    :ivar version: The version of the combadge.
+    :ivar duration: How long it ran, in seconds.
+    :ivar output: The last lines of its output.
+    :ivar returncode: Its exit code, or None if it didn't exit by itself."""
+
+    def __init__(
+        self,
+        version: str,
+        duration: float,
+        output: typing.List[str],
+        returncode: typing.Optional[int] = None,
+    ):
+        super(CombadgeError, self).__init__(
+            "\n".join([self._describe(version, duration, returncode)] + output)
+        )
+        self.version = version
+        self.duration = duration
+        self.output = output
+        self.returncode = returncode
+
+    @staticmethod
+    def _describe(
+        version: str, duration: float, returncode: typing.Optional[int]
+    ) -> str:
+        if returncode is None:
+            return "Combadge {} failed after {:.1f}s".format(version, duration)
+        return "Combadge {} exited with code {} after {:.1f}s".format(
+            version, returncode, duration
+        )
+
+
+class CombadgeTimeout(CombadgeError):
+    @staticmethod
+    def _describe(
+        version: str, duration: float, returncode: typing.Optional[int]
+    ) -> str:
+        return "Combadge {} timed out after {:.1f}s".format(version, duration)
+
+
+class BulkOperationError(Exception):
+    """Some of the operations of a bulk request failed.
+
+    :ivar failures: Tuples of the failed operation and its exception."""
+
+    def __init__(
+        self, total: int, failures: typing.List[typing.Tuple[typing.Any, Exception]]
+    ):
+        super(BulkOperationError, self).__init__(
+            "{} of {} operations failed: {}".format(
+                len(failures),
+                total,
+                "; ".join(
+                    "{}: {}".format(operation, error)
+                    for operation, error in failures[:3]
+                )
+                + ("; ..." if len(failures) > 3 else ""),
+            )
+        )
+        self.total = total
+        self.failures = failures
@@ -1,25 +1,165 @@
+import io
 import os
+import threading
 import typing
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-import dateutil.parser
-
-from .exc import NotOverwriting
-from .types import JSON
+from . import checksum, metrics, transfer
+from .exc import ChecksumMismatch, IncompleteDownload, NotOverwriting
+from .progress import ProgressCallback, ProgressTracker
+from .types import JSON, Buffer
 from .utils import fix_path_sep_for_current_platform, raise_for_status
 
 if typing.TYPE_CHECKING:
-    from requests import Session
+    from requests import Response, Session
 
 
 _CHUNK_SIZE = 1024**2 * 4
+# Files smaller than this are downloaded over a single stream by default
+_SEGMENT_THRESHOLD = 1024**2 * 64
+_SEGMENTS = 4
+# The least seconds between progress reports of a file
+_PROGRESS_INTERVAL = 0.1
 _EPOCH = datetime.utcfromtimestamp(0)
+# Appended to the name of a file while it is downloaded
+PART_SUFFIX = ".scotty-part"
+# File objects which copy what is written to them, so they can be given views of a reused buffer
+_COPYING_WRITERS = (io.FileIO, io.BufferedWriter, io.BufferedRandom, io.BytesIO)
 
 
 def _to_epoch(d: datetime) -> float:
     return (d - _EPOCH.replace(tzinfo=d.tzinfo)).total_seconds()
 
 
+def _slice_chunks(
+    chunks: typing.Iterable[bytes], start: int, end: typing.Optional[int]
+) -> typing.Iterator[bytes]:
+    """Yield the parts of a stream from offset start to end, reading no further than end"""
+    offset = 0
+    for chunk in chunks:
+        chunk_end = offset + len(chunk)
+        if chunk_end > start:
+            chunk_start = max(0, start - offset)
+            yield chunk[chunk_start : None if end is None else end - offset]
+        offset = chunk_end
+        if end is not None and offset >= end:
+            break
+
+
+def _slice_stream(
+    chunks: typing.Iterable[bytes], start: int, end: typing.Optional[int]
+) -> bytes:
+    """Return the bytes from start to end of a stream, where a negative start counts from its
+    end"""
+    if start >= 0:
+        return b"".join(_slice_chunks(chunks, start, end))
+    sliced = bytearray()
+    for chunk in chunks:
+        sliced += chunk
+        del sliced[:start]
+    return bytes(sliced)
+
+
+_seek_lock = threading.Lock()
+
+
+def _pwrite(fd: int, data: memoryview, offset: int) -> int:
+    if hasattr(os, "pwrite"):
+        return os.pwrite(fd, data, offset)
+    # Windows has no pwrite. Writers of the same file take turns moving its position instead
+    with _seek_lock:
+        os.lseek(fd, offset, os.SEEK_SET)
+        return os.write(fd, data)
+
+
+class _PositionalWriter(object):
+    """A file object which writes to a file descriptor from an offset, without using or moving
+    the position of the file descriptor"""
+
+    def __init__(self, fd: int, offset: int):
+        self.fd = fd
+        self.offset = offset
+
+    def write(self, data: Buffer) -> int:
+        view = memoryview(data)
+        while view:
+            written = _pwrite(self.fd, view, self.offset)
+            self.offset += written
+            view = view[written:]
+        return len(data)
+
+
+def _counted(
+    write: typing.Callable[[Buffer], int],
+    progress: typing.Optional[ProgressTracker] = None,
+) -> typing.Callable[[Buffer], None]:
+    def _write(data: Buffer) -> None:
+        write(data)
+        metrics.bytes_downloaded.inc(len(data))
+        if progress is not None:
+            progress.add(len(data))
+
+    return _write
+
+
+def _preallocate(fd: int, size: int) -> None:
+    """Reserve the disk space of a file of size bytes up front, so that it isn't fragmented as
+    its segments are written. Best effort: nothing is done where it isn't supported.
+
+    Where the file system has no fallocate, glibc emulates it by writing a byte to every block,
+    which is as slow as writing the file, so it is only used where segments of the file are
+    written out of order anyway"""
+    if size <= 0 or not hasattr(os, "posix_fallocate"):
+        return
+    try:
+        os.posix_fallocate(fd, 0, size)
+    except OSError:
+        pass
+
+
+def _finish_progress(progress: typing.Optional[ProgressTracker]) -> None:
+    if progress is not None:
+        progress.update(progress.transferred, files=1, force=True)
+
+
+class _Digests(object):
+    """Digests the content of a file, by the algorithm asked for and by the algorithm of the
+    checksum the server provides"""
+
+    def __init__(self, file_: "File", algorithm: typing.Optional[str]):
+        self.file_name = file_.file_name
+        self.expected = checksum.parse_server_checksum(file_.checksum)
+        if self.expected is not None:
+            if algorithm is None:
+                algorithm = self.expected[0]
+        self.algorithm = algorithm
+        self.hashers = {}  # type: typing.Dict[str, checksum.Hasher]
+        if algorithm is not None:
+            self.hashers[algorithm] = checksum.new(algorithm)
+        if self.expected is not None and self.expected[0] not in self.hashers:
+            self.hashers[self.expected[0]] = checksum.new(self.expected[0])
+        self._updates = [hasher.update for hasher in self.hashers.values()]
+
+    def update(self, data: Buffer) -> None:
+        for update in self._updates:
+            update(data)
+
+    def verify(self) -> typing.Optional[str]:
+        """:raise ChecksumMismatch: If the content doesn't match the server checksum.
+        :return: The hex digest by the algorithm asked for, if any."""
+        if self.expected is not None:
+            expected_algorithm, expected_digest = self.expected
+            actual = self.hashers[expected_algorithm].hexdigest()
+            if actual != expected_digest:
+                raise ChecksumMismatch(
+                    self.file_name, expected_algorithm, expected_digest, actual
+                )
+        if self.algorithm is None:
+            return None
+        return self.hashers[self.algorithm].hexdigest()
+
+
 class File(object):
     """A class representing a single file
 
@@ -28,7 +168,9 @@ class File(object):
     :ivar status: A string representing the status of the file.
     :ivar storage_name: The file name in Scotty's file system.
     :ivar size: The size of the file in bytes.
-    :ivar url: A URL for downloading the file."""
+    :ivar url: A URL for downloading the file.
+    :ivar checksum: The checksum of the file content as given by the server, e.g. ``sha256:<hexdigest>``,
+      or None if the server doesn't provide one."""
 
     def __init__(
         self,
@@ -40,6 +182,7 @@ class File(object):
         size: int,
         url: str,
         mtime: typing.Optional[datetime],
+        checksum: typing.Optional[str] = None,  # pylint: disable=redefined-outer-name
     ):
 
         self.id = id_
@@ -50,11 +193,17 @@ class File(object):
         self.size = size
         self.url = url
         self.mtime = mtime
+        self.checksum = checksum
 
     @classmethod
     def from_json(cls, session: "Session", json_node: JSON) -> "File":
         raw_mtime = json_node.get("mtime")
-        mtime = None if raw_mtime is None else dateutil.parser.parse(raw_mtime)
+        if raw_mtime is None:
+            mtime = None
+        else:
+            import dateutil.parser
+
+            mtime = dateutil.parser.parse(raw_mtime)
         return cls(
             session,
             json_node["id"],
@@ -64,24 +213,246 @@ class File(object):
             json_node["size"],
             json_node["url"],
             mtime,
+            json_node.get("checksum"),
+        )
+
+    def stream_to(
+        self,
+        fileobj: "typing.BinaryIO",
+        algorithm: typing.Optional[str] = None,
+        progress_callback: typing.Optional[ProgressCallback] = None,
+        views: bool = False,
+    ) -> typing.Optional[str]:
+        """Fetch the file content from the server and write it to fileobj.
+
+        The content is digested while it is streamed. If the server provides a checksum of the file,
+        it is verified and :class:`.ChecksumMismatch` is raised when it doesn't match. A checksum
+        which cannot be verified, e.g. of an unknown algorithm, is ignored.
+
+        The content is read into a reused buffer in chunks sized by throughput, see
+        :class:`.ChunkSizer`. fileobj is given a copy of every chunk as bytes, unless it is a
+        file or a :class:`io.BytesIO`, which copy what is written to them anyway.
+
+        :param str algorithm: The digest algorithm to compute, one of
+          :func:`scottypy.checksum.available_algorithms`. Defaults to the algorithm of the server
+          checksum.
+        :param progress_callback: Called with a :class:`.Progress` of the file when it starts,
+          from time to time while it is streamed and once it is done.
+        :param bool views: Give fileobj views of the buffer instead of copies, which are only
+          valid until its write returns. For file objects which don't keep what is written.
+        :return: The hex digest by `algorithm`, or None if none was computed."""
+        progress = self._progress_tracker(progress_callback)
+
+        def _write_copy(chunk: memoryview) -> None:
+            fileobj.write(bytes(chunk))
+
+        write = fileobj.write  # type: typing.Callable[[memoryview], typing.Any]
+        if not views and type(fileobj) not in _COPYING_WRITERS:
+            write = _write_copy
+        digest = self._stream(write, algorithm, progress)
+        _finish_progress(progress)
+        return digest
+
+    def _progress_tracker(
+        self, callback: typing.Optional[ProgressCallback]
+    ) -> typing.Optional[ProgressTracker]:
+        if callback is None:
+            return None
+        progress = ProgressTracker(
+            callback, total=self.size, total_files=1, min_interval=_PROGRESS_INTERVAL
         )
+        progress.update(0, files=0)
+        return progress
 
-    def stream_to(self, fileobj: "typing.BinaryIO") -> None:
-        """Fetch the file content from the server and write it to fileobj"""
+    def _stream(
+        self,
+        write: typing.Callable[[memoryview], typing.Any],
+        algorithm: typing.Optional[str],
+        progress: typing.Optional[ProgressTracker] = None,
+    ) -> typing.Optional[str]:
+        digests = _Digests(self, algorithm)
         response = self._session.get(self.url, stream=True)
         raise_for_status(response)
 
-        for chunk in response.iter_content(chunk_size=_CHUNK_SIZE):
-            fileobj.write(chunk)
+        def _write(chunk: memoryview) -> None:
+            write(chunk)
+            digests.update(chunk)
+            metrics.bytes_downloaded.inc(len(chunk))
+            if progress is not None:
+                progress.add(len(chunk))
+
+        # Release the connection even if writing fails midway
+        with response:
+            copied = transfer.copy_response(response, _write)
+        length = response.headers.get("Content-Length", "")
+        encoding = response.headers.get("Content-Encoding", "identity").lower()
+        if encoding == "identity" and length.isdigit() and copied != int(length):
+            raise IncompleteDownload(self.file_name, int(length), copied)
+        return digests.verify()
+
+    def readinto(self, buffer: Buffer, start: int = 0) -> int:
+        """Fetch the content of the file from offset start into buffer, such as a bytearray or a
+        writable memoryview, until it is full or the file ends.
+
+        The content is read from the socket straight into buffer when possible, so that it can be
+        processed in place without copies. It is not verified against the checksum of the file.
+
+        :return: The number of bytes read, fewer past the end of the file."""
+        size = memoryview(buffer).nbytes
+        if size == 0:
+            return 0
+        response = self._get_range("bytes={}-{}".format(start, start + size - 1))
+        with response:
+            if response.status_code == 416:
+                return 0
+            raise_for_status(response)
+            skip = 0 if response.status_code == 206 else start
+            read = transfer.readinto_response(response, buffer, skip)
+        metrics.bytes_downloaded.inc(read)
+        return read
+
+    def read_range(self, start: int, end: typing.Optional[int] = None) -> bytes:
+        """Fetch a part of the file content from the server using an HTTP range request.
+
+        start and end are offsets as in slicing: end is exclusive and defaults to the end of the
+        file, and a negative start with no end reads the last bytes of the file. Reading past the
+        end of the file returns what there is, possibly nothing. Servers which ignore the range
+        send all of the content, and only the requested part of it is kept.
+
+        The content is not verified against the checksum of the file."""
+        if start < 0:
+            if end is not None:
+                raise ValueError("A negative start can't be given with an end")
+            byte_range = "bytes={}".format(start)
+        elif end is None:
+            byte_range = "bytes={}-".format(start)
+        elif end <= start:
+            return b""
+        else:
+            byte_range = "bytes={}-{}".format(start, end - 1)
+
+        response = self._get_range(byte_range)
+        with response:
+            if response.status_code == 416:
+                # Some servers refuse a suffix longer than the file instead of sending all of it
+                return self.read_range(0) if start < 0 else b""
+            raise_for_status(response)
+            if response.status_code == 206:
+                content = response.content
+            else:
+                content = _slice_stream(
+                    response.iter_content(chunk_size=_CHUNK_SIZE), start, end
+                )
+        metrics.bytes_downloaded.inc(len(content))
+        return content
+
+    def download_range(self, fd: int, start: int, end: int) -> int:
+        """Fetch the content of the file from offset start to end, exclusive, and write it at
+        the same offsets of the open file descriptor fd.
+
+        The position of fd is neither used nor moved, so that several ranges can be downloaded
+        into the same file at once. The content is not verified against the checksum of the
+        file.
 
-    def download(self, directory: str = ".", overwrite: bool = False) -> None:
-        """Download the file to the specified directory, retaining its name"""
-        subdir, file_ = os.path.split(fix_path_sep_for_current_platform(self.file_name))
-        subdir = os.path.join(directory, subdir)
-        file_ = os.path.join(subdir, file_)
+        :return: The number of bytes written, fewer past the end of the file."""
+        return self._download_range(fd, start, end)
 
+    def _download_range(
+        self,
+        fd: int,
+        start: int,
+        end: int,
+        progress: typing.Optional[ProgressTracker] = None,
+    ) -> int:
+        if end <= start:
+            return 0
+        writer = _PositionalWriter(fd, start)
+        response = self._get_range("bytes={}-{}".format(start, end - 1))
+        with response:
+            if response.status_code == 416:
+                return 0
+            raise_for_status(response)
+            write = _counted(writer.write, progress)
+            if response.status_code == 206:
+                transfer.copy_response(response, write)
+            else:
+                chunks = response.iter_content(_CHUNK_SIZE)
+                for chunk in _slice_chunks(chunks, start, end):
+                    write(chunk)
+        return writer.offset - start
+
+    def _range_length(self) -> typing.Optional[int]:
+        """The length of the content, if the server supports range requests"""
+        with self._get_range("bytes=0-0") as response:
+            if response.status_code != 206:
+                return None
+            response.content  # pylint: disable=pointless-statement
+            length = response.headers.get("Content-Range", "").rpartition("/")[2]
+        return int(length) if length.isdigit() else None
+
+    def _download_segments(
+        self,
+        fd: int,
+        length: int,
+        segments: int,
+        progress: typing.Optional[ProgressTracker] = None,
+    ) -> None:
+        """Download the content into fd as segments fetched in parallel"""
+        segment_size = -(-length // segments)
+        ranges = [
+            (start, min(start + segment_size, length))
+            for start in range(0, length, segment_size)
+        ]
+        with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+            written = sum(
+                executor.map(
+                    lambda r: self._download_range(fd, r[0], r[1], progress), ranges
+                )
+            )
+        if written != length:
+            raise IncompleteDownload(self.file_name, length, written)
+
+    def _get_range(self, byte_range: str) -> "Response":
+        # Ranges of a compressed response would refer to the compressed content
+        headers = {"Range": byte_range, "Accept-Encoding": "identity"}
+        return self._session.get(self.url, headers=headers, stream=True)
+
+    def get_local_path(self, directory: str = ".") -> str:
+        """Return the path to which the file is downloaded under directory"""
+        file_ = os.path.join(
+            directory, fix_path_sep_for_current_platform(self.file_name)
+        )
         if file_.endswith(".gz") and not self.url.endswith(".gz"):
             file_ = file_[:-3]
+        return file_
+
+    def download(
+        self,
+        directory: str = ".",
+        overwrite: bool = False,
+        algorithm: typing.Optional[str] = None,
+        segments: int = _SEGMENTS,
+        segment_threshold: int = _SEGMENT_THRESHOLD,
+        progress_callback: typing.Optional[ProgressCallback] = None,
+    ) -> typing.Optional[str]:
+        """Download the file to the specified directory, retaining its name.
+
+        Files of at least segment_threshold bytes are split into segments which are downloaded
+        in parallel, if the server supports range requests. That is faster than a single stream
+        over high latency links. The segments are digested once they are all written.
+
+        The content is written to the file name with ``.scotty-part`` appended, which is
+        renamed to the file name once the content is verified. An interrupted download never
+        leaves a partial file under the name of the file.
+
+        :param str algorithm: An optional digest algorithm to compute while downloading.
+          See :func:`stream_to`.
+        :param int segments: The number of segments. 1 always downloads a single stream.
+        :param progress_callback: See :func:`stream_to`. It is called from the threads
+          downloading the segments, if any.
+        :return: The hex digest of the file, or None if no digest was computed."""
+        file_ = self.get_local_path(directory)
+        subdir = os.path.dirname(file_)
 
         if not os.path.isdir(subdir):
             os.makedirs(subdir)
@@ -89,12 +460,41 @@ class File(object):
         if os.path.isfile(file_) and not overwrite:
             raise NotOverwriting(file_)
 
-        with open(file_, "wb") as f:
-            self.stream_to(f)
-
-        if self.mtime is not None:
-            mtime = _to_epoch(self.mtime)
-            os.utime(file_, (mtime, mtime))
+        progress = self._progress_tracker(progress_callback)
+        part = file_ + PART_SUFFIX
+        digest = None  # type: typing.Optional[str]
+        try:
+            with open(part, "wb") as f:
+                length = None
+                if segments > 1 and self.size >= segment_threshold:
+                    length = self._range_length()
+                if length is None:
+                    # Write the chunks to the file descriptor, skipping the copy into the buffer
+                    # of f
+                    writer = _PositionalWriter(f.fileno(), 0)
+                    digest = self._stream(writer.write, algorithm, progress)
+                else:
+                    os.ftruncate(f.fileno(), length)
+                    _preallocate(f.fileno(), length)
+                    self._download_segments(f.fileno(), length, segments, progress)
+            if length is not None:
+                digests = _Digests(self, algorithm)
+                buffer = memoryview(bytearray(_CHUNK_SIZE))
+                with open(part, "rb", buffering=0) as f:
+                    for read in iter(lambda: f.readinto(buffer), 0):
+                        digests.update(buffer[:read])
+                digest = digests.verify()
+            if self.mtime is not None:
+                mtime = _to_epoch(self.mtime)
+                os.utime(part, (mtime, mtime))
+            os.replace(part, file_)
+        except BaseException:
+            if os.path.exists(part):
+                os.remove(part)
+            raise
+        metrics.files_downloaded.inc()
+        _finish_progress(progress)
+        return digest
 
     def link(self, storage_base: str, dest: str) -> None:
         source_path = os.path.join(storage_base, self.storage_name)
@@ -0,0 +1,193 @@
+import fnmatch
+import re
+import typing
+from datetime import datetime, timedelta, timezone
+
+from .types import JSON
+
+if typing.TYPE_CHECKING:
+    from .beam import Beam
+
+Predicate = typing.Callable[[JSON], bool]
+_Match = typing.Callable[[str], typing.Any]
+
+_SIZE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([kmgtp]?)(i?b?)\s*$", re.IGNORECASE)
+_AGE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([smhdw])\s*$", re.IGNORECASE)
+_SIZE_EXPONENTS = {"": 0, "k": 1, "m": 2, "g": 3, "t": 4, "p": 5}
+_AGE_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+_GLOB_SPECIAL = re.compile(r"\[[^\]]*\]|[*?]")
+
+
+def parse_size(value: str) -> int:
+    """Parse a size such as ``1M``, ``1MiB`` (1024**2 bytes), ``1MB`` (1000**2 bytes) or ``512``"""
+    m = _SIZE.match(value)
+    if not m:
+        raise ValueError("Invalid size {!r}".format(value))
+    number, prefix, suffix = m.groups()
+    base = 1000 if suffix.lower() == "b" and prefix else 1024
+    return int(float(number) * base ** _SIZE_EXPONENTS[prefix.lower()])
+
+
+def parse_time(value: str, now: typing.Optional[datetime] = None) -> datetime:
+    """Parse either an age such as ``30m``, ``2h`` or ``7d``, meaning that long before now,
+    or an absolute ISO 8601 date"""
+    m = _AGE.match(value)
+    if m:
+        number, unit = m.groups()
+        if now is None:
+            now = datetime.now(timezone.utc)
+        return now - timedelta(seconds=float(number) * _AGE_UNITS[unit.lower()])
+
+    import dateutil.parser
+
+    try:
+        parsed = dateutil.parser.parse(value)
+    except (ValueError, OverflowError):
+        raise ValueError("Invalid time {!r}".format(value)) from None
+    return _as_utc(parsed)
+
+
+def _as_utc(d: datetime) -> datetime:
+    if d.tzinfo is None:
+        return d.replace(tzinfo=timezone.utc)
+    return d
+
+
+def _literal_part(glob: str) -> str:
+    """Return the longest run of a glob pattern which has no wildcards"""
+    return max(_GLOB_SPECIAL.split(glob), key=len)
+
+
+class FileFilter(object):
+    """A filter on the files of a beam.
+
+    Scotty itself only supports filtering by a substring of the file name. Whatever it supports
+    is sent to the server, and the rest of the filter is compiled into a single predicate which
+    is applied to the listing before :class:`.File` objects are created.
+
+    :param str substring: Only files which contain this string in their name (case insensitive).
+    :param list globs: Only files whose name matches any of these glob patterns.
+    :param str regex: Only files whose name matches this regular expression.
+    :param int min_size: Only files of at least this many bytes.
+    :param int max_size: Only files of at most this many bytes.
+    :param datetime since: Only files modified at this time or later.
+    :param datetime until: Only files modified at this time or earlier."""
+
+    def __init__(
+        self,
+        substring: typing.Optional[str] = None,
+        globs: typing.Sequence[str] = (),
+        regex: typing.Optional[str] = None,
+        min_size: typing.Optional[int] = None,
+        max_size: typing.Optional[int] = None,
+        since: typing.Optional[datetime] = None,
+        until: typing.Optional[datetime] = None,
+    ):
+        self.substring = substring
+        self.globs = list(globs)
+        self.regex = regex
+        self.min_size = min_size
+        self.max_size = max_size
+        self.since = since
+        self.until = until
+
+    def server_filter(self) -> typing.Optional[str]:
+        """The substring filter sent to the server. With no explicit substring, the literal
+        part of a single glob narrows the listing."""
+        if self.substring:
+            return self.substring
+        if len(self.globs) == 1:
+            literal = _literal_part(self.globs[0])
+            if literal:
+                return literal
+        return None
+
+    def compile(self) -> typing.Optional[Predicate]:
+        """Return a predicate on the JSON of a file, or None if the server filter is enough"""
+        checks = []  # type: typing.List[Predicate]
+
+        if self.globs or self.regex:
+            patterns = [fnmatch.translate(glob) for glob in self.globs]
+            name_match = None  # type: typing.Optional[_Match]
+            if patterns:
+                name_match = re.compile("|".join(patterns)).match
+            regex_search = re.compile(self.regex).search if self.regex else None
+
+            def _check_name(node: JSON) -> bool:
+                name = node["file_name"]
+                if name_match is not None and not name_match(name):
+                    return False
+                return regex_search is None or regex_search(name) is not None
+
+            checks.append(_check_name)
+
+        if self.min_size is not None or self.max_size is not None:
+            min_size = self.min_size if self.min_size is not None else 0
+            max_size = self.max_size if self.max_size is not None else float("inf")
+            checks.append(lambda node: min_size <= node["size"] <= max_size)
+
+        if self.since is not None or self.until is not None:
+            import dateutil.parser
+
+            since = _as_utc(self.since) if self.since is not None else None
+            until = _as_utc(self.until) if self.until is not None else None
+
+            def _check_mtime(node: JSON) -> bool:
+                raw_mtime = node.get("mtime")
+                if raw_mtime is None:
+                    return False
+                mtime = _as_utc(dateutil.parser.parse(raw_mtime))
+                return (since is None or mtime >= since) and (
+                    until is None or mtime <= until
+                )
+
+            checks.append(_check_mtime)
+
+        if not checks:
+            return None
+        if len(checks) == 1:
+            return checks[0]
+        return lambda node: all(check(node) for check in checks)
+
+
+class BeamSelector(object):
+    """Selects beams by tag or issue, and optionally by their age and size.
+
+    :param str tag: Beams with this tag.
+    :param str issue: Beams associated with this issue. With a tag too, only beams which have both.
+    :param datetime older_than: Only beams started before this time.
+    :param int min_size: Only beams of at least this many bytes.
+    :param int max_size: Only beams of at most this many bytes.
+    :param bool include_pinned: Whether to select beams which someone pinned."""
+
+    def __init__(
+        self,
+        tag: typing.Optional[str] = None,
+        issue: typing.Optional[str] = None,
+        older_than: typing.Optional[datetime] = None,
+        min_size: typing.Optional[int] = None,
+        max_size: typing.Optional[int] = None,
+        include_pinned: bool = False,
+    ):
+        if tag is None and issue is None:
+            raise ValueError("Beams can only be selected by a tag or an issue")
+        self.tag = tag
+        self.issue = issue
+        self.older_than = older_than
+        self.min_size = min_size
+        self.max_size = max_size
+        self.include_pinned = include_pinned
+
+    def matches(self, beam: "Beam") -> bool:
+        """Check the properties of a beam which was found by its tag or issue"""
+        if beam.deleted or (beam.pins and not self.include_pinned):
+            return False
+        if self.older_than is not None and _as_utc(beam.start) >= _as_utc(
+            self.older_than
+        ):
+            return False
+        if self.min_size is not None and beam.size < self.min_size:
+            return False
+        if self.max_size is not None and beam.size > self.max_size:
+            return False
+        return True
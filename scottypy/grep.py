@@ -0,0 +1,201 @@
+import re
+import threading
+import typing
+import zlib
+
+from .utils import run_concurrently
+
+if typing.TYPE_CHECKING:
+    from .file import File
+
+_GZIP_MAGIC = b"\x1f\x8b"
+# Lines longer than this are cut, so that a file without newlines can't fill the memory
+_MAX_LINE = 1024**2
+# The most decompressed bytes produced by a single compressed chunk at once
+_DECOMPRESS_CHUNK = 1024**2 * 4
+
+
+class Match(object):
+    """A line which matched a pattern.
+
+    :ivar file: The :class:`.File` of the line.
+    :ivar line_number: The number of the line in the file, starting from 1.
+    :ivar line: The content of the line, without its newline."""
+
+    def __init__(self, file_: "File", line_number: int, line: bytes):
+        self.file = file_
+        self.line_number = line_number
+        self.line = line
+
+    @property
+    def text(self) -> str:
+        return self.line.decode("utf-8", errors="replace")
+
+    def __repr__(self) -> str:
+        return "<Match {}:{}>".format(self.file.file_name, self.line_number)
+
+
+class StopSearching(Exception):
+    """Raised by :meth:`StreamMatcher.write` to stop streaming once there are enough matches"""
+
+
+class StreamMatcher(object):
+    """A writable file object, for :meth:`.File.stream_to`, which searches the lines written to it.
+
+    Lines may span chunks. A gzip stream is detected by its magic bytes and decompressed on the
+    fly.
+
+    :param pattern: A compiled bytes regular expression.
+    :param on_match: Called with the number and the content of every matching line.
+    :param should_stop: Checked on every write. Once it returns True, writing raises
+      :class:`StopSearching`."""
+
+    def __init__(
+        self,
+        pattern: typing.Pattern[bytes],
+        on_match: typing.Callable[[int, bytes], None],
+        should_stop: typing.Callable[[], bool] = lambda: False,
+        max_line: int = _MAX_LINE,
+    ):
+        self._pattern = pattern
+        self._on_match = on_match
+        self._should_stop = should_stop
+        self._max_line = max_line
+        self._pending = b""
+        self._line_number = 0
+        self._skipping = False
+        self._sniffed = b""
+        self._decompressor = None  # type: typing.Optional[typing.Any]
+        self._started = False
+
+    def write(self, data: bytes) -> int:
+        if self._should_stop():
+            raise StopSearching()
+        # The data may be a view of a buffer which is reused once this returns
+        data = bytes(data)
+        if not self._started:
+            self._sniffed += data
+            if len(self._sniffed) < len(_GZIP_MAGIC):
+                return len(data)
+            self._started = True
+            if self._sniffed.startswith(_GZIP_MAGIC):
+                self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            written, data = len(data), self._sniffed
+            self._sniffed = b""
+        else:
+            written = len(data)
+
+        if self._decompressor is None:
+            self._feed(data)
+        else:
+            self._decompress(data)
+        return written
+
+    def _decompress(self, data: bytes) -> None:
+        assert self._decompressor is not None
+        while data:
+            self._feed(self._decompressor.decompress(data, _DECOMPRESS_CHUNK))
+            if self._decompressor.eof:
+                # Concatenated gzip members
+                data = self._decompressor.unused_data
+                self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            else:
+                data = self._decompressor.unconsumed_tail
+
+    def _feed(self, data: bytes) -> None:
+        if not data:
+            return
+        if self._skipping:
+            newline = data.find(b"\n")
+            if newline == -1:
+                return
+            self._skipping = False
+            data = data[newline + 1 :]
+
+        end = data.rfind(b"\n")
+        if end == -1:
+            self._pending += data
+        else:
+            self._search(self._pending + data[: end + 1])
+            self._pending = data[end + 1 :]
+
+        if len(self._pending) > self._max_line:
+            self._search(self._pending[: self._max_line] + b"\n")
+            self._pending = b""
+            self._skipping = True
+
+    def _search(self, lines: bytes) -> None:
+        """Search a block of complete lines, at once rather than line by line"""
+        counted = 0
+        position = 0
+        while True:
+            m = self._pattern.search(lines, position)
+            if m is None:
+                break
+            start = lines.rfind(b"\n", 0, m.start()) + 1
+            end = lines.find(b"\n", m.start())
+            if end == -1:
+                end = len(lines)
+            self._line_number += lines.count(b"\n", counted, start)
+            counted = start
+            self._on_match(self._line_number + 1, lines[start:end].rstrip(b"\r"))
+            position = end + 1
+            if position >= len(lines):
+                break
+        self._line_number += lines.count(b"\n", counted)
+
+    def close(self) -> None:
+        """Search the last line, if the content doesn't end with a newline"""
+        if self._sniffed:
+            self._started = True
+            self._feed(self._sniffed)
+            self._sniffed = b""
+        if self._pending and not self._skipping:
+            self._search(self._pending)
+        self._pending = b""
+
+
+def search_files(
+    files: typing.Iterable["File"],
+    pattern: typing.Union[str, typing.Pattern[bytes]],
+    on_match: typing.Callable[[Match], None],
+    max_count: typing.Optional[int] = None,
+    max_workers: int = 4,
+) -> typing.List[typing.Tuple["File", Exception]]:
+    """Search the lines of files for pattern, streaming max_workers files at once without
+    writing them to the disk.
+
+    :param on_match: Called with every :class:`Match`, from the searching threads but never
+      concurrently.
+    :param int max_count: Stop once this many lines matched.
+    :return: The files which could not be searched, along with the exception."""
+    compiled = (
+        re.compile(pattern.encode("utf-8"), re.MULTILINE)
+        if isinstance(pattern, str)
+        else pattern
+    )
+    lock = threading.Lock()
+    stop = threading.Event()
+    found = [0]
+
+    def _search_file(file_: "File") -> None:
+        if stop.is_set():
+            return
+
+        def _on_line(line_number: int, line: bytes) -> None:
+            with lock:
+                if stop.is_set():
+                    raise StopSearching()
+                found[0] += 1
+                if max_count is not None and found[0] >= max_count:
+                    stop.set()
+                on_match(Match(file_, line_number, line))
+
+        matcher = StreamMatcher(compiled, _on_line, stop.is_set)
+        try:
+            file_.stream_to(typing.cast(typing.BinaryIO, matcher), views=True)
+            matcher.close()
+        except StopSearching:
+            pass
+
+    return run_concurrently(_search_file, files, max_workers, stop.is_set)
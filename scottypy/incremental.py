@@ -0,0 +1,153 @@
+import hashlib
+import json
+import os
+import typing
+
+from . import checksum
+from .scan import DirectoryManifest, ManifestEntry
+from .types import JSON
+
+_STATE_DIRECTORY = os.path.expanduser("~/.scotty/incremental")
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def default_state_path(directory: str) -> str:
+    """The path of the state of the incremental beams of directory, under ``~/.scotty``"""
+    key = hashlib.sha1(os.path.abspath(directory).encode("utf-8")).hexdigest()
+    return os.path.join(_STATE_DIRECTORY, key + ".json")
+
+
+def _hash_file(path: str, algorithm: str) -> str:
+    hasher = checksum.new(algorithm)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class IncrementalState(object):
+    """What was last beamed up from a directory, so that the next beam only carries the files
+    which are new or modified since.
+
+    :param str directory: The beamed directory.
+    :param str path: Where the state is kept.
+    :ivar beam_id: The ID of the last beam, or None before the first one.
+    :ivar files: The size, modification time and optional digest of every beamed file, by its
+      relative path."""
+
+    def __init__(
+        self,
+        directory: str,
+        path: str,
+        beam_id: typing.Optional[int] = None,
+        files: typing.Optional[JSON] = None,
+    ):
+        self.directory = os.path.abspath(directory)
+        self.path = path
+        self.beam_id = beam_id
+        self.files = files or {}  # type: JSON
+        self._digests = {}  # type: typing.Dict[typing.Tuple[str, int, float, str], str]
+
+    @classmethod
+    def load(
+        cls, directory: str, path: typing.Optional[str] = None
+    ) -> "IncrementalState":
+        """Load the state of directory. A missing or unreadable state is treated as if nothing
+        was beamed yet"""
+        if path is None:
+            path = default_state_path(directory)
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            beam_id = data["beam_id"]  # type: typing.Optional[int]
+            files = data["files"]  # type: JSON
+        except (OSError, ValueError, KeyError, TypeError):
+            beam_id, files = None, {}
+        return cls(directory, path, beam_id, files)
+
+    def _is_unchanged(
+        self, entry: ManifestEntry, algorithm: typing.Optional[str]
+    ) -> bool:
+        previous = self.files.get(entry.path)
+        if previous is None:
+            return False
+        if previous["size"] == entry.size and previous["mtime"] == entry.mtime:
+            return True
+        if (
+            algorithm is None
+            or previous["size"] != entry.size
+            or previous.get("algorithm") != algorithm
+        ):
+            return False
+        # Only touched, perhaps. Hash it to make sure
+        digest = self._digest_of(entry, algorithm)
+        return bool(digest == previous["digest"])
+
+    def _digest_of(self, entry: ManifestEntry, algorithm: str) -> str:
+        key = (entry.path, entry.size, entry.mtime, algorithm)
+        if key not in self._digests:
+            self._digests[key] = _hash_file(
+                os.path.join(self.directory, *entry.path.split("/")), algorithm
+            )
+        return self._digests[key]
+
+    def changes(
+        self, manifest: DirectoryManifest, algorithm: typing.Optional[str] = None
+    ) -> DirectoryManifest:
+        """Return a manifest of the files of manifest which are new or modified since the last
+        beam. The unchanged files are added to its excluded files.
+
+        A file is unchanged if its size and modification time are the same as when it was last
+        beamed. With an algorithm, a file which only had its modification time changed is
+        hashed, and is unchanged if its content is the same."""
+        changed = DirectoryManifest(manifest.directory)
+        changed.excluded.extend(manifest.excluded)
+        for entry in manifest.entries:
+            if self._is_unchanged(entry, algorithm):
+                changed.excluded.append(entry.path)
+            else:
+                changed.entries.append(entry)
+        changed.excluded.sort()
+        return changed
+
+    def update(
+        self,
+        manifest: DirectoryManifest,
+        beam_id: int,
+        algorithm: typing.Optional[str] = None,
+    ) -> None:
+        """Record that the files of manifest were beamed up as beam_id"""
+        files = {}  # type: JSON
+        for entry in manifest.entries:
+            record = {"size": entry.size, "mtime": entry.mtime}  # type: JSON
+            if algorithm is not None:
+                previous = self.files.get(entry.path)
+                if (
+                    previous is not None
+                    and previous.get("algorithm") == algorithm
+                    and previous["size"] == entry.size
+                    and previous["mtime"] == entry.mtime
+                ):
+                    digest = previous["digest"]
+                else:
+                    digest = self._digest_of(entry, algorithm)
+                record.update(algorithm=algorithm, digest=digest)
+            files[entry.path] = record
+        self.files = files
+        self.beam_id = beam_id
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(
+                {
+                    "directory": self.directory,
+                    "beam_id": self.beam_id,
+                    "files": self.files,
+                },
+                f,
+                indent=1,
+                sort_keys=True,
+            )
+        os.replace(temp_path, self.path)
@@ -0,0 +1,139 @@
+import importlib
+import json
+import os
+import typing
+
+if typing.TYPE_CHECKING:
+    import requests
+
+Loads = typing.Callable[[typing.Union[bytes, str]], typing.Any]
+Dumps = typing.Callable[[typing.Any], bytes]
+
+_PREFERENCE = ("orjson", "ujson", "json")
+_ENV_VAR = "SCOTTY_JSON_BACKEND"
+
+
+class Backend(object):
+    """A JSON implementation.
+
+    :ivar name: The name of the backend.
+    :ivar loads: Decodes bytes or a string.
+    :ivar dumps: Encodes an object into UTF-8 bytes."""
+
+    def __init__(  # pylint: disable=redefined-outer-name
+        self, name: str, loads: Loads, dumps: Dumps
+    ):
+        self.name = name
+        self.loads = loads
+        self.dumps = dumps
+
+    def __repr__(self) -> str:
+        return "<JSON backend {}>".format(self.name)
+
+
+def _stdlib() -> Backend:
+    return Backend(
+        "json",
+        json.loads,
+        lambda obj: json.dumps(obj, ensure_ascii=False).encode("utf-8"),
+    )
+
+
+def _orjson() -> Backend:
+    orjson = importlib.import_module("orjson")
+    return Backend("orjson", orjson.loads, orjson.dumps)
+
+
+def _ujson() -> Backend:
+    ujson = importlib.import_module("ujson")
+    return Backend(
+        "ujson",
+        ujson.loads,
+        lambda obj: ujson.dumps(obj, ensure_ascii=False).encode("utf-8"),
+    )
+
+
+_FACTORIES = {
+    "json": _stdlib,
+    "orjson": _orjson,
+    "ujson": _ujson,
+}  # type: typing.Dict[str, typing.Callable[[], Backend]]
+_backend = None  # type: typing.Optional[Backend]
+
+
+def register_backend(name: str, factory: typing.Callable[[], Backend]) -> None:
+    """Make another backend available by name. factory may raise ImportError if it is not
+    installed"""
+    _FACTORIES[name] = factory
+
+
+def available_backends() -> typing.List[str]:
+    """The names of the backends which are installed"""
+    names = []
+    for name, factory in _FACTORIES.items():
+        try:
+            factory()
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+def get_backend(name: typing.Optional[str] = None) -> Backend:
+    """Return the backend named name, or the one in use.
+
+    Unless chosen with :func:`set_backend` or by setting ``SCOTTY_JSON_BACKEND`` to its name, the
+    fastest installed backend is used: orjson, then ujson, then the standard library.
+
+    :raise ValueError: If there is no such backend, or it is not installed."""
+    global _backend  # pylint: disable=global-statement
+
+    if name is not None:
+        try:
+            factory = _FACTORIES[name]
+        except KeyError:
+            raise ValueError("Unknown JSON backend {!r}".format(name)) from None
+        try:
+            return factory()
+        except ImportError:
+            raise ValueError(
+                "JSON backend {!r} is not installed".format(name)
+            ) from None
+
+    if _backend is None:
+        override = os.environ.get(_ENV_VAR)
+        if override:
+            _backend = get_backend(override)
+        else:
+            for preferred in _PREFERENCE:
+                try:
+                    _backend = _FACTORIES[preferred]()
+                    break
+                except ImportError:
+                    continue
+            assert _backend is not None
+    return _backend
+
+
+def set_backend(name: str) -> None:
+    """Use the backend named name from now on"""
+    global _backend  # pylint: disable=global-statement
+    _backend = get_backend(name)
+
+
+def loads(data: typing.Union[bytes, str]) -> typing.Any:
+    return get_backend().loads(data)
+
+
+def dumps(obj: typing.Any) -> bytes:
+    return get_backend().dumps(obj)
+
+
+def dumps_str(obj: typing.Any) -> str:
+    return dumps(obj).decode("utf-8")
+
+
+def response_json(response: "requests.Response") -> typing.Any:
+    """Decode the body of a response straight from its bytes, unlike ``response.json()`` which
+    decodes it into a string first"""
+    return loads(response.content)
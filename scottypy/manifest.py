@@ -0,0 +1,108 @@
+import json
+import os
+import typing
+
+from . import checksum
+from .types import JSON
+
+if typing.TYPE_CHECKING:
+    from .file import File
+
+MANIFEST_NAME = ".scotty_manifest.json"
+JOURNAL_NAME = ".scotty_manifest.journal"
+
+
+class BeamManifest(object):
+    """The digests of the files downloaded from a beam, kept next to them.
+
+    Every entry records the size and modification time of the local file when it was downloaded,
+    so that a later sync can tell an untouched file without reading it again.
+
+    Recorded entries are appended to a journal right away, one JSON line each, and the journal is
+    folded into the manifest when it is saved. A download which died midway is resumed from the
+    entries of the journal.
+
+    :param str directory: The directory the beam is downloaded to."""
+
+    def __init__(self, directory: str, entries: typing.Optional[JSON] = None):
+        self.directory = directory
+        self.entries = entries or {}  # type: JSON
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.directory, MANIFEST_NAME)
+
+    @property
+    def journal_path(self) -> str:
+        return os.path.join(self.directory, JOURNAL_NAME)
+
+    @classmethod
+    def load(cls, directory: str) -> "BeamManifest":
+        """Load the manifest of directory along with its journal. A missing or unreadable
+        manifest is treated as empty"""
+        try:
+            with open(os.path.join(directory, MANIFEST_NAME)) as f:
+                entries = json.load(f)["files"]  # type: JSON
+        except (OSError, ValueError, KeyError, TypeError):
+            entries = {}
+        manifest = cls(directory, entries)
+        manifest._replay()
+        return manifest
+
+    def _replay(self) -> None:
+        try:
+            with open(self.journal_path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        self.entries[entry.pop("file_name")] = entry
+                    except (ValueError, KeyError, AttributeError, TypeError):
+                        # The last line may be cut by a process which died writing it
+                        break
+        except OSError:
+            pass
+
+    def record(self, file_: "File", path: str, algorithm: str, digest: str) -> None:
+        st = os.stat(path)
+        entry = {
+            "id": file_.id,
+            "size": st.st_size,
+            "mtime": st.st_mtime,
+            "algorithm": algorithm,
+            "digest": digest,
+        }
+        self.entries[file_.file_name] = entry
+        with open(self.journal_path, "a") as f:
+            f.write(json.dumps(dict(entry, file_name=file_.file_name)) + "\n")
+
+    def is_synced(self, file_: "File", path: str) -> bool:
+        """Check whether path holds the verified content of file_, without reading it.
+
+        True if the file was recorded with the server's size and checksum, and the local copy
+        has not changed since then. Without a usable server checksum, a file recorded with the
+        same ID is taken as synced."""
+        entry = self.entries.get(file_.file_name)
+        if entry is None:
+            return False
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        if st.st_size != entry["size"] or st.st_mtime != entry["mtime"]:
+            return False
+        expected = checksum.parse_server_checksum(file_.checksum)
+        if expected is not None:
+            algorithm, digest = expected
+            return bool(entry["algorithm"] == algorithm and entry["digest"] == digest)
+        return bool(entry["id"] == file_.id)
+
+    def save(self) -> None:
+        """Write the manifest and remove the journal folded into it"""
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"files": self.entries}, f, indent=1, sort_keys=True)
+        os.replace(temp_path, self.path)
+        try:
+            os.remove(self.journal_path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,366 @@
+import atexit
+import os
+import re
+import tempfile
+import threading
+import typing
+
+_LabelValues = typing.Tuple[str, ...]
+_DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+_COMBADGE_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600)
+_NUMERIC_SEGMENT = re.compile(r"^\d+$")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: typing.Sequence[str], values: _LabelValues) -> str:
+    if not names:
+        return ""
+    return "{{{}}}".format(
+        ",".join(
+            '{}="{}"'.format(name, _escape(value)) for name, value in zip(names, values)
+        )
+    )
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric(object):
+    type_ = ""
+
+    def __init__(
+        self,
+        name: str,
+        help_: str,
+        labelnames: typing.Sequence[str],
+        lock: threading.Lock,
+    ):
+        self.name = name
+        self.help = help_
+        self.labelnames = tuple(labelnames)
+        self._lock = lock
+
+    def _label_values(self, labels: typing.Dict[str, typing.Any]) -> _LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                "{} expects labels {}, got {}".format(
+                    self.name, self.labelnames, tuple(labels)
+                )
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> typing.List[str]:
+        raise NotImplementedError()  # pragma: no cover
+
+    def render(self) -> str:
+        lines = [
+            "# HELP {} {}".format(self.name, self.help),
+            "# TYPE {} {}".format(self.name, self.type_),
+        ]
+        with self._lock:
+            lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """A monotonically increasing value, optionally split by labels"""
+
+    type_ = "counter"
+
+    def __init__(
+        self,
+        name: str,
+        help_: str,
+        labelnames: typing.Sequence[str],
+        lock: threading.Lock,
+    ):
+        super(Counter, self).__init__(name, help_, labelnames, lock)
+        self._values = {}  # type: typing.Dict[_LabelValues, float]
+
+    def inc(self, amount: float = 1, **labels: typing.Any) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels: typing.Any) -> float:
+        with self._lock:
+            return self._values.get(self._label_values(labels), 0)
+
+    def _samples(self) -> typing.List[str]:
+        return [
+            "{}{} {}".format(
+                self.name, _format_labels(self.labelnames, key), _format_value(value)
+            )
+            for key, value in sorted(self._values.items())
+        ]
+
+
+class Gauge(_Metric):
+    """A value which can go up and down, optionally split by labels"""
+
+    type_ = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help_: str,
+        labelnames: typing.Sequence[str],
+        lock: threading.Lock,
+    ):
+        super(Gauge, self).__init__(name, help_, labelnames, lock)
+        self._values = {}  # type: typing.Dict[_LabelValues, float]
+
+    def set(self, value: float, **labels: typing.Any) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def get(self, **labels: typing.Any) -> float:
+        with self._lock:
+            return self._values.get(self._label_values(labels), 0)
+
+    def _samples(self) -> typing.List[str]:
+        return [
+            "{}{} {}".format(
+                self.name, _format_labels(self.labelnames, key), _format_value(value)
+            )
+            for key, value in sorted(self._values.items())
+        ]
+
+
+class Histogram(_Metric):
+    """A distribution of observed values, counted into cumulative buckets"""
+
+    type_ = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_: str,
+        labelnames: typing.Sequence[str],
+        lock: threading.Lock,
+        buckets: typing.Sequence[float],
+    ):
+        super(Histogram, self).__init__(name, help_, labelnames, lock)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._counts = {}  # type: typing.Dict[_LabelValues, typing.List[int]]
+        self._sums = {}  # type: typing.Dict[_LabelValues, float]
+
+    def observe(self, value: float, **labels: typing.Any) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * len(self.buckets))
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+            self._sums[key] = self._sums.get(key, 0) + value
+
+    def get_count(self, **labels: typing.Any) -> int:
+        with self._lock:
+            counts = self._counts.get(self._label_values(labels))
+            return counts[-1] if counts else 0
+
+    def _samples(self) -> typing.List[str]:
+        samples = []
+        for key, counts in sorted(self._counts.items()):
+            for bound, count in zip(self.buckets, counts):
+                samples.append(
+                    "{}_bucket{} {}".format(
+                        self.name,
+                        _format_labels(
+                            self.labelnames + ("le",), key + (_format_value(bound),)
+                        ),
+                        count,
+                    )
+                )
+            labels = _format_labels(self.labelnames, key)
+            samples.append(
+                "{}_sum{} {}".format(self.name, labels, _format_value(self._sums[key]))
+            )
+            samples.append("{}_count{} {}".format(self.name, labels, counts[-1]))
+        return samples
+
+
+class Registry(object):
+    """A collection of metrics which can be rendered in the Prometheus text format"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._metrics = []  # type: typing.List[_Metric]
+
+    def counter(
+        self, name: str, help_: str, labelnames: typing.Sequence[str] = ()
+    ) -> Counter:
+        counter = Counter(name, help_, labelnames, self._lock)
+        self._metrics.append(counter)
+        return counter
+
+    def gauge(
+        self, name: str, help_: str, labelnames: typing.Sequence[str] = ()
+    ) -> Gauge:
+        gauge = Gauge(name, help_, labelnames, self._lock)
+        self._metrics.append(gauge)
+        return gauge
+
+    def histogram(
+        self,
+        name: str,
+        help_: str,
+        labelnames: typing.Sequence[str] = (),
+        buckets: typing.Sequence[float] = _DURATION_BUCKETS,
+    ) -> Histogram:
+        histogram = Histogram(name, help_, labelnames, self._lock, buckets)
+        self._metrics.append(histogram)
+        return histogram
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+    def write_textfile(self, path: str) -> None:
+        """Atomically write the metrics to path, to be picked up by node_exporter's textfile collector"""
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".scotty_metrics")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(self.render())
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+
+registry = Registry()
+
+bytes_downloaded = registry.counter(
+    "scotty_downloaded_bytes_total", "Bytes downloaded from Scotty"
+)
+files_downloaded = registry.counter(
+    "scotty_downloaded_files_total", "Files downloaded from Scotty"
+)
+beams_created = registry.counter(
+    "scotty_beams_created_total", "Beams created by this client", ["kind"]
+)
+combadge_runtime = registry.histogram(
+    "scotty_combadge_run_seconds",
+    "Wall clock time of combadge runs",
+    ["version"],
+    buckets=_COMBADGE_BUCKETS,
+)
+combadge_failures = registry.counter(
+    "scotty_combadge_failures_total",
+    "Combadge runs which failed or timed out",
+    ["version", "reason"],
+)
+http_requests = registry.counter(
+    "scotty_http_requests_total",
+    "HTTP requests made to Scotty",
+    ["endpoint", "method", "status"],
+)
+http_retries = registry.counter(
+    "scotty_http_retries_total",
+    "Retries of HTTP requests to Scotty",
+    ["endpoint"],
+)
+http_errors = registry.counter(
+    "scotty_http_errors_total",
+    "HTTP requests to Scotty which failed with an error status or a connection error",
+    ["endpoint"],
+)
+circuit_breaker_trips = registry.counter(
+    "scotty_circuit_breaker_trips_total",
+    "Times the circuit breaker opened because Scotty seemed to be down",
+)
+http_request_duration = registry.histogram(
+    "scotty_http_request_duration_seconds",
+    "Duration of HTTP requests made to Scotty, including retries",
+    ["endpoint"],
+)
+
+mirrored_beams = registry.counter(
+    "scotty_mirrored_beams_total", "Beams downloaded by scotty mirror", ["tag"]
+)
+mirror_pending_beams = registry.gauge(
+    "scotty_mirror_pending_beams",
+    "Completed beams which scotty mirror did not download yet",
+    ["tag"],
+)
+mirror_lag = registry.gauge(
+    "scotty_mirror_lag_seconds",
+    "Age of the oldest completed beam which scotty mirror did not download yet",
+    ["tag"],
+)
+mirror_last_poll = registry.gauge(
+    "scotty_mirror_last_poll_timestamp_seconds",
+    "When scotty mirror last listed the beams of its tag successfully",
+    ["tag"],
+)
+
+
+def endpoint_of(path: str) -> str:
+    """Reduce a URL path to a low cardinality endpoint label, e.g. /beams/:id/tags"""
+    segments = [
+        ":id" if _NUMERIC_SEGMENT.match(segment) else segment
+        for segment in path.split("/")
+        if segment
+    ]
+    return "/" + "/".join(segments[:3])
+
+
+class TextfileExporter(object):
+    """Write the metrics of a registry to a Prometheus textfile at exit,
+    and optionally every `interval` seconds while running"""
+
+    def __init__(
+        self,
+        path: str,
+        interval: typing.Optional[float] = None,
+        registry_: Registry = registry,
+    ):
+        self.path = path
+        self.interval = interval
+        self._registry = registry_
+        self._stopped = threading.Event()
+        self._thread = None  # type: typing.Optional[threading.Thread]
+
+    def start(self) -> None:
+        atexit.register(self.stop)
+        if self.interval:
+            self._thread = threading.Thread(
+                target=self._loop, name="scotty-metrics", daemon=True
+            )
+            self._thread.start()
+
+    def _loop(self) -> None:
+        assert self.interval
+        while not self._stopped.wait(self.interval):
+            self.export()
+
+    def export(self) -> None:
+        self._registry.write_textfile(self.path)
+
+    def stop(self) -> None:
+        """Stop the periodic export and write the final metrics"""
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        atexit.unregister(self.stop)
+        if self._thread is not None:
+            self._thread.join()
+        self.export()
+
+
+def enable_textfile_export(
+    path: str, interval: typing.Optional[float] = None
+) -> TextfileExporter:
+    """Write the client metrics to the Prometheus textfile at path when the process exits.
+    If interval is given, the file is also rewritten every interval seconds"""
+    exporter = TextfileExporter(path, interval)
+    exporter.start()
+    return exporter
@@ -0,0 +1,162 @@
+import json
+import logging
+import os
+import threading
+import time
+import typing
+from datetime import datetime, timezone
+
+from . import metrics
+from .download import download_beam
+from .utils import run_concurrently
+
+if typing.TYPE_CHECKING:
+    from .beam import Beam
+    from .scotty import Scotty
+
+STATE_NAME = ".scotty_mirror.json"
+logger = logging.getLogger("scotty.mirror")  # type: logging.Logger
+
+
+def _download_beam(beam: "Beam", directory: str) -> None:
+    failures = download_beam(beam, directory, sync=True)
+    if failures:
+        raise failures[0]
+
+
+class MirrorState(object):
+    """The beams of a tag which were mirrored, kept in the mirror directory.
+
+    :ivar mirrored: The Unix time each mirrored beam was downloaded at, by its ID."""
+
+    def __init__(
+        self, path: str, mirrored: typing.Optional[typing.Dict[int, float]] = None
+    ):
+        self.path = path
+        self.mirrored = mirrored or {}
+
+    @classmethod
+    def load(cls, path: str) -> "MirrorState":
+        """Load the state at path. A missing or unreadable state is treated as empty"""
+        try:
+            with open(path) as f:
+                mirrored = {
+                    int(beam_id): float(timestamp)
+                    for beam_id, timestamp in json.load(f)["mirrored"].items()
+                }
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            mirrored = {}
+        return cls(path, mirrored)
+
+    def save(self) -> None:
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(
+                {"mirrored": {str(k): v for k, v in self.mirrored.items()}},
+                f,
+                indent=1,
+                sort_keys=True,
+            )
+        os.replace(temp_path, self.path)
+
+
+class Mirror(object):
+    """Keeps a directory in sync with the beams of a tag, downloading every beam once it is
+    completed into a subdirectory named after its ID.
+
+    Only the IDs of the beams are listed on every poll, and the details of a beam are fetched
+    only until it is mirrored. The mirrored beams are remembered in the directory, so restarting a
+    mirror doesn't download anything again. Polls are `min_interval` seconds apart while beams
+    are coming in or in progress, and back off up to `max_interval` seconds while nothing
+    happens.
+
+    :param download: Called with a beam and its directory to download it. It should skip files
+      which are already there, as a beam whose download failed is downloaded again on the
+      next poll.
+    :param int max_workers: The maximal number of beams downloaded at once."""
+
+    def __init__(
+        self,
+        scotty: "Scotty",
+        tag: str,
+        directory: str,
+        download: typing.Callable[["Beam", str], None] = _download_beam,
+        max_workers: int = 4,
+        min_interval: float = 30,
+        max_interval: float = 600,
+        clock: typing.Callable[[], float] = time.time,
+    ):
+        self.scotty = scotty
+        self.tag = tag
+        self.directory = directory
+        self.max_workers = max_workers
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min_interval
+        self._download = download
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._deleted = set()  # type: typing.Set[int]
+        os.makedirs(directory, exist_ok=True)
+        self.state = MirrorState.load(os.path.join(directory, STATE_NAME))
+
+    def _lag(self, beams: typing.List["Beam"]) -> float:
+        if not beams:
+            return 0.0
+        oldest = min(beam.start for beam in beams)
+        if oldest.tzinfo is None:
+            oldest = oldest.replace(tzinfo=timezone.utc)
+        now = datetime.fromtimestamp(self._clock(), timezone.utc)
+        return max(0.0, (now - oldest).total_seconds())
+
+    def _mirror_beam(self, beam: "Beam") -> None:
+        logger.info("Mirroring beam %s", beam.id)
+        self._download(beam, os.path.join(self.directory, str(beam.id)))
+        with self._lock:
+            self.state.mirrored[beam.id] = self._clock()
+            self.state.save()
+        metrics.mirrored_beams.inc(tag=self.tag)
+
+    def poll(self) -> typing.List[int]:
+        """Download the completed beams of the tag which were not mirrored yet, and adjust the
+        polling interval.
+
+        :return: The IDs of the beams which were mirrored."""
+        beam_ids = self.scotty.get_beam_ids_by_tag(self.tag)
+        metrics.mirror_last_poll.set(self._clock(), tag=self.tag)
+        new_beams = [
+            beam_id
+            for beam_id in beam_ids
+            if beam_id not in self.state.mirrored and beam_id not in self._deleted
+        ]
+        beams = [self.scotty.get_beam(beam_id) for beam_id in new_beams]
+        self._deleted.update(beam.id for beam in beams if beam.deleted)
+        completed = [beam for beam in beams if beam.completed and not beam.deleted]
+
+        metrics.mirror_pending_beams.set(len(completed), tag=self.tag)
+        metrics.mirror_lag.set(self._lag(completed), tag=self.tag)
+        failures = run_concurrently(self._mirror_beam, completed, self.max_workers)
+        for beam, error in failures:
+            logger.error("Failed mirroring beam %s: %s", beam.id, error)
+        failed = set(beam.id for beam, _ in failures)
+        remaining = [beam for beam in completed if beam.id in failed]
+        metrics.mirror_pending_beams.set(len(remaining), tag=self.tag)
+        metrics.mirror_lag.set(self._lag(remaining), tag=self.tag)
+
+        if new_beams:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.interval * 2, self.max_interval)
+        return [beam.id for beam in completed if beam.id not in failed]
+
+    def run(self, stop: typing.Optional[threading.Event] = None) -> None:
+        """Poll until stop is set. Failing polls are logged and retried"""
+        if stop is None:
+            stop = threading.Event()
+        while not stop.is_set():
+            try:
+                self.poll()
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Failed polling the beams of %s", self.tag)
+                self.interval = min(self.interval * 2, self.max_interval)
+            stop.wait(self.interval)
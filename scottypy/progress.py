@@ -0,0 +1,153 @@
+import threading
+import time
+import typing
+
+# Weight of the latest measurement in the smoothed transfer rate
+_RATE_SMOOTHING = 0.3
+
+
+class Progress(object):
+    """A snapshot of a transfer in progress.
+
+    :ivar transferred: Bytes transferred so far.
+    :ivar total: Total bytes expected, or None if unknown.
+    :ivar files: Files transferred so far, or None if unknown.
+    :ivar total_files: Total files expected, or None if unknown.
+    :ivar elapsed: Seconds since the transfer started.
+    :ivar rate: Smoothed transfer rate in bytes per second."""
+
+    def __init__(
+        self,
+        transferred: int,
+        total: typing.Optional[int],
+        elapsed: float,
+        rate: float,
+        files: typing.Optional[int] = None,
+        total_files: typing.Optional[int] = None,
+    ):
+        self.transferred = transferred
+        self.total = total
+        self.elapsed = elapsed
+        self.rate = rate
+        self.files = files
+        self.total_files = total_files
+
+    @property
+    def fraction(self) -> typing.Optional[float]:
+        if not self.total:
+            return None
+        return min(1.0, self.transferred / self.total)
+
+    @property
+    def eta(self) -> typing.Optional[float]:
+        """Estimated seconds left, or None if it cannot be estimated"""
+        if self.total is None or self.rate <= 0:
+            return None
+        return max(0, self.total - self.transferred) / self.rate
+
+    def __repr__(self) -> str:
+        return "<Progress {}/{} bytes, {:.0f} B/s>".format(
+            self.transferred, self.total, self.rate
+        )
+
+
+ProgressCallback = typing.Callable[[Progress], None]
+
+
+class ProgressTracker(object):
+    """Turns raw transfer counters into :class:`.Progress` snapshots with a smoothed rate,
+    passing them to callback at most every `min_interval` seconds.
+
+    Safe to update from multiple threads.
+
+    :ivar exact: Whether the amount transferred was reported by the transfer itself. From then
+      on, estimated amounts are ignored, so that an estimate polled from elsewhere doesn't move
+      the progress back and forth."""
+
+    def __init__(
+        self,
+        callback: ProgressCallback,
+        total: typing.Optional[int] = None,
+        total_files: typing.Optional[int] = None,
+        min_interval: float = 0.0,
+    ):
+        self._callback = callback
+        self.total = total
+        self.total_files = total_files
+        self._min_interval = min_interval
+        self._lock = threading.Lock()
+        self._start = time.monotonic()
+        self._last_time = self._start
+        self._last_transferred = 0
+        self._last_report = None  # type: typing.Optional[float]
+        self._rate = 0.0
+        self.transferred = 0
+        self.files = None  # type: typing.Optional[int]
+        self.exact = False
+
+    def update(
+        self,
+        transferred: int,
+        files: typing.Optional[int] = None,
+        force: bool = False,
+        estimate: bool = False,
+    ) -> None:
+        """Set the absolute amount transferred so far.
+
+        :param estimate: Whether transferred is only an estimate, which is ignored once an exact
+          amount was set."""
+        self._report(transferred, files, force, estimate)
+
+    def add(self, amount: int, files: int = 0) -> None:
+        """Add to the amount transferred so far"""
+        self._report(amount, files or None, relative=True)
+
+    def _report(
+        self,
+        transferred: int,
+        files: typing.Optional[int],
+        force: bool = False,
+        estimate: bool = False,
+        relative: bool = False,
+    ) -> None:
+        # The callback is called under the lock as well, so that concurrent reports neither
+        # lose amounts added nor pass an older snapshot after a newer one
+        with self._lock:
+            now = time.monotonic()
+            if relative:
+                transferred += self.transferred
+                if files is not None:
+                    files += self.files or 0
+            if not estimate:
+                self.exact = True
+            elif self.exact:
+                transferred = self.transferred
+            self.transferred = transferred
+            if files is not None:
+                self.files = files
+            if now > self._last_time:
+                rate = (transferred - self._last_transferred) / (now - self._last_time)
+                self._rate = (
+                    rate
+                    if self._last_report is None
+                    else _RATE_SMOOTHING * rate + (1 - _RATE_SMOOTHING) * self._rate
+                )
+                self._last_time = now
+                self._last_transferred = transferred
+            if (
+                not force
+                and self._last_report is not None
+                and now - self._last_report < self._min_interval
+            ):
+                return
+            self._last_report = now
+            self._callback(
+                Progress(
+                    transferred,
+                    self.total,
+                    now - self._start,
+                    self._rate,
+                    files=self.files,
+                    total_files=self.total_files,
+                )
+            )
@@ -0,0 +1,129 @@
+import threading
+import typing
+from datetime import timedelta
+
+import click
+
+from .progress import Progress, ProgressCallback, ProgressTracker
+
+if typing.TYPE_CHECKING:
+    from .file import File
+
+# The least seconds between redraws of a progress bar
+_REDRAW_INTERVAL = 0.2
+_BAR_WIDTH = 30
+
+
+def describe_progress(progress: Progress, verb: str) -> str:
+    import capacity
+
+    line = "{} {} of {}".format(
+        verb,
+        progress.transferred * capacity.byte,
+        (progress.total or 0) * capacity.byte,
+    )
+    if progress.fraction is not None:
+        line += " ({:.0%})".format(progress.fraction)
+    if progress.eta is not None and progress.transferred < (progress.total or 0):
+        line += ", ETA {}".format(timedelta(seconds=int(progress.eta)))
+    return line
+
+
+class DownloadProgress(object):
+    """Renders the progress of downloading files one after the other as a bar of all of them
+    along with the rate of the current file, and a line with the rate of every file once it
+    is done.
+
+    The bar is redrawn in place at most every `interval` seconds, and only on a terminal.
+    Reports arriving while the bar is being drawn are dropped rather than waited for."""
+
+    def __init__(self, interactive: bool, interval: float = _REDRAW_INTERVAL):
+        self._tracker = ProgressTracker(self._render, min_interval=interval)
+        self._interactive = interactive
+        self._drawing = threading.Lock()
+        self._drawn = False
+        self._done = 0
+        self._files = 0
+        self._file_name = ""
+        self._file_progress = None  # type: typing.Optional[Progress]
+
+    def start(self, total: int, total_files: int) -> None:
+        """Start the bar of total_files files of total bytes"""
+        self._tracker.total = total
+        self._tracker.total_files = total_files
+        self._done = 0
+        self._files = 0
+
+    def file_callback(self, file_: "File") -> ProgressCallback:
+        """Return a progress callback for :meth:`.File.download` of file_"""
+        self._file_name = file_.file_name
+        self._file_progress = None
+
+        def _on_progress(progress: Progress) -> None:
+            self._file_progress = progress
+            self._tracker.update(self._done + progress.transferred, self._files)
+
+        return _on_progress
+
+    def file_done(self, file_: "File") -> None:
+        """Count file_ as done, whether it was downloaded or not"""
+        self._done += file_.size
+        self._files += 1
+        self._tracker.update(self._done, self._files, force=True)
+
+    def file_downloaded(self, file_: "File") -> None:
+        import capacity
+
+        progress = self._file_progress
+        line = "Downloaded {}".format(file_.file_name)
+        if progress is not None and progress.elapsed > 0:
+            line += " ({} at {}/s)".format(
+                progress.transferred * capacity.byte,
+                int(progress.transferred / progress.elapsed) * capacity.byte,
+            )
+        self.echo(line)
+        self.file_done(file_)
+
+    def echo(self, line: str, err: bool = False) -> None:
+        """Print a line above the bar"""
+        with self._drawing:
+            self._clear()
+            click.echo(line, err=err)
+
+    def close(self) -> None:
+        with self._drawing:
+            self._clear()
+
+    def _clear(self) -> None:
+        if self._drawn:
+            click.echo("\r\033[K", nl=False)
+            self._drawn = False
+
+    def _render(self, progress: Progress) -> None:
+        import capacity
+
+        if not self._interactive or not self._drawing.acquire(blocking=False):
+            return
+        try:
+            filled = int((progress.fraction or 0) * _BAR_WIDTH)
+            line = "[{}{}] {}, {}/{} files, {}/s".format(
+                "#" * filled,
+                "-" * (_BAR_WIDTH - filled),
+                describe_progress(progress, "Downloaded"),
+                progress.files or 0,
+                progress.total_files,
+                int(progress.rate) * capacity.byte,
+            )
+            file_progress = self._file_progress
+            if file_progress is not None:
+                line += " | {} {}/s".format(
+                    self._file_name, int(file_progress.rate) * capacity.byte
+                )
+            click.echo("\r\033[K" + line, nl=False)
+            self._drawn = True
+        finally:
+            self._drawing.release()
+
+
+def echo_upload_progress(progress: Progress) -> None:
+    click.echo(describe_progress(progress, "Uploaded"))
@@ -0,0 +1,35 @@
+import typing
+
+if typing.TYPE_CHECKING:
+    from .beam import Beam
+
+
+class PurgeReport(object):
+    """The outcome of :func:`.Scotty.delete_beams`.
+
+    :ivar beams: The selected beams.
+    :ivar dry_run: Whether the beams were only selected, without deleting them.
+    :ivar deleted: The IDs of the deleted beams.
+    :ivar failures: Tuples of a beam which could not be deleted and the exception."""
+
+    def __init__(self, beams: typing.List["Beam"], dry_run: bool):
+        self.beams = beams
+        self.dry_run = dry_run
+        self.deleted = []  # type: typing.List[int]
+        self.failures = []  # type: typing.List[typing.Tuple[Beam, Exception]]
+
+    @property
+    def reclaimable_size(self) -> int:
+        """The total size in bytes of the selected beams"""
+        return sum(beam.size for beam in self.beams)
+
+    @property
+    def reclaimed_size(self) -> int:
+        """The total size in bytes of the deleted beams"""
+        deleted = set(self.deleted)
+        return sum(beam.size for beam in self.beams if beam.id in deleted)
+
+    def __repr__(self) -> str:
+        return "<PurgeReport {} beams, {} bytes{}>".format(
+            len(self.beams), self.reclaimable_size, " (dry run)" if self.dry_run else ""
+        )
@@ -0,0 +1,278 @@
+import fnmatch
+import random
+import threading
+import time
+import typing
+from itertools import takewhile
+from urllib.parse import urlparse
+from uuid import uuid4
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from . import metrics
+
+_RETRY_STATUSES = (429, 502, 503, 504)
+# Statuses which tell that the server did not process the request, so even a POST can be resent
+_REJECTED_STATUSES = (429, 503)
+_BACKOFF_MAX = 120
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised instead of sending a request while Scotty is considered down"""
+
+
+class JitteredRetry(Retry):
+    """A urllib3 :class:`Retry` with "full jitter" exponential backoff: every wait is uniformly
+    random between zero and the exponential backoff, so that clients which failed together don't
+    retry together. Waits asked for by ``Retry-After`` are capped at
+    `RETRY_AFTER_MAX` seconds."""
+
+    RETRY_AFTER_MAX = 300
+
+    def __init__(
+        self, *args: typing.Any, backoff_max: float = _BACKOFF_MAX, **kwargs: typing.Any
+    ):
+        super(JitteredRetry, self).__init__(*args, **kwargs)
+        # Kept here rather than passed on, as only urllib3 2 takes backoff_max
+        self.backoff_max = backoff_max
+
+    def new(self, **kwargs: typing.Any) -> "JitteredRetry":
+        kwargs.setdefault("backoff_max", self.backoff_max)
+        retry = super(JitteredRetry, self).new(**kwargs)
+        assert isinstance(retry, JitteredRetry)
+        return retry
+
+    def get_backoff_time(self) -> float:
+        consecutive_errors = len(
+            list(
+                takewhile(lambda x: x.redirect_location is None, reversed(self.history))
+            )
+        )
+        if consecutive_errors == 0:
+            return 0
+        cap = min(self.backoff_max, self.backoff_factor * 2 ** (consecutive_errors - 1))
+        return random.uniform(0, cap)
+
+    def get_retry_after(self, response: typing.Any) -> typing.Optional[float]:
+        retry_after = super(JitteredRetry, self).get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, self.RETRY_AFTER_MAX)
+
+
+class RetryPolicy(object):
+    """How to retry a class of requests.
+
+    Requests which could not be sent are always retried.
+
+    :param int total: The maximal number of retries.
+    :param list statuses: Response statuses to retry on. ``Retry-After`` is respected.
+    :param float backoff_factor: The cap of the first backoff, doubled on every retry.
+    :param float backoff_max: The maximal backoff.
+    :param bool retry_reads: Whether to retry when the request was sent but reading the response
+      failed, which is only safe for idempotent requests.
+    :param bool idempotency_key: Whether to send an ``Idempotency-Key`` header, kept across
+      retries, for servers which support deduplicating requests."""
+
+    def __init__(
+        self,
+        total: int = 3,
+        statuses: typing.Collection[int] = _RETRY_STATUSES,
+        backoff_factor: float = 2,
+        backoff_max: float = 60,
+        retry_reads: bool = True,
+        idempotency_key: bool = False,
+    ):
+        self.total = total
+        self.statuses = frozenset(statuses)
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        self.retry_reads = retry_reads
+        self.idempotency_key = idempotency_key
+
+    def make_retry(self) -> Retry:
+        return JitteredRetry(
+            total=self.total,
+            read=None if self.retry_reads else 0,
+            status_forcelist=self.statuses,
+            allowed_methods=None,
+            backoff_factor=self.backoff_factor,
+            backoff_max=self.backoff_max,
+            raise_on_status=False,
+        )
+
+
+class CircuitBreaker(object):
+    """Fails requests fast while Scotty is down, instead of having every one of them wait for its
+    retries to run out.
+
+    After `failure_threshold` consecutive failures the circuit opens, and requests raise
+    :class:`CircuitOpenError` without being sent. Once `reset_timeout` seconds, give or take
+    half of it so that clients don't come back all at once, have passed, a single request is let
+    through. If it succeeds the circuit closes, and otherwise it opens again.
+
+    :param list failure_statuses: Response statuses which count as failures, besides requests
+      which could not be sent or timed out."""
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30,
+        failure_statuses: typing.Collection[int] = (502, 503, 504),
+        clock: typing.Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failure_statuses = frozenset(failure_statuses)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None  # type: typing.Optional[float]
+        self._open_for = 0.0
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        """One of ``closed``, ``open`` and ``half-open``"""
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if self._probing or self._clock() - self._opened_at >= self._open_for:
+                return "half-open"
+            return "open"
+
+    def before_request(self) -> None:
+        """:raise CircuitOpenError: If the request should not be sent"""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            remaining = self._opened_at + self._open_for - self._clock()
+            if remaining > 0 or self._probing:
+                raise CircuitOpenError(
+                    "Scotty seems to be down, not retrying for {:.0f} more seconds".format(
+                        max(0, remaining)
+                    )
+                )
+            self._probing = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                if not self._probing:
+                    metrics.circuit_breaker_trips.inc()
+                self._opened_at = self._clock()
+                self._open_for = self.reset_timeout * random.uniform(0.5, 1.5)
+                self._probing = False
+
+
+class Resilience(object):
+    """The retry policies of the requests to Scotty, and its circuit breaker.
+
+    :param default: The :class:`RetryPolicy` of requests which match no rule.
+    :param list rules: Tuples of an HTTP method (or ``*``), an endpoint glob pattern and the
+      :class:`RetryPolicy` of the matching requests. Endpoints are paths with IDs replaced by
+      ``:id``, such as ``/beams/:id/tags``. The first matching rule wins.
+    :param breaker: An optional :class:`CircuitBreaker`."""
+
+    def __init__(
+        self,
+        default: RetryPolicy,
+        rules: typing.Sequence[typing.Tuple[str, str, RetryPolicy]] = (),
+        breaker: typing.Optional[CircuitBreaker] = None,
+    ):
+        self.default = default
+        self.rules = list(rules)
+        self.breaker = breaker
+
+    @classmethod
+    def for_scotty(
+        cls, retry_times: int = 3, backoff_factor: float = 2
+    ) -> "Resilience":
+        """The default policies: idempotent requests are retried on connection errors and on
+        429, 502, 503 and 504. Requests creating objects, such as ``POST /beams``, are retried
+        only when they surely were not processed (429 and 503), and carry an idempotency
+        key."""
+        idempotent = RetryPolicy(total=retry_times, backoff_factor=backoff_factor)
+        unsafe = RetryPolicy(
+            total=retry_times,
+            backoff_factor=backoff_factor,
+            statuses=_REJECTED_STATUSES,
+            retry_reads=False,
+            idempotency_key=True,
+        )
+        rules = [
+            # Tagging a beam or associating it with an issue twice is harmless
+            ("POST", "/beams/:id/*", idempotent),
+            ("POST", "/beams/tags", idempotent),
+            ("POST", "*", unsafe),
+            ("PATCH", "*", unsafe),
+        ]
+        return cls(idempotent, rules, CircuitBreaker())
+
+    def policy_for(self, method: str, endpoint: str) -> RetryPolicy:
+        for rule_method, pattern, policy in self.rules:
+            if rule_method in ("*", method) and fnmatch.fnmatchcase(endpoint, pattern):
+                return policy
+        return self.default
+
+
+class ResilientAdapter(HTTPAdapter):
+    """An :class:`HTTPAdapter` which retries every request by its :class:`RetryPolicy` and goes
+    through the circuit breaker of a :class:`Resilience`"""
+
+    def __init__(self, resilience: Resilience, **kwargs: typing.Any):
+        self.resilience = resilience
+        self._local = threading.local()
+        super(ResilientAdapter, self).__init__(**kwargs)
+
+    # HTTPAdapter.send() retries by self.max_retries. Giving each thread its own value lets
+    # concurrent requests be retried by different policies
+    @property
+    def max_retries(self) -> Retry:
+        retries = getattr(
+            self._local, "max_retries", None
+        )  # type: typing.Optional[Retry]
+        return retries if retries is not None else self._default_max_retries
+
+    @max_retries.setter
+    def max_retries(self, value: Retry) -> None:
+        self._default_max_retries = value
+
+    def send(  # type: ignore[override] # pylint: disable=arguments-differ
+        self, request: requests.PreparedRequest, **kwargs: typing.Any
+    ) -> requests.Response:
+        method = request.method or "GET"
+        policy = self.resilience.policy_for(
+            method, metrics.endpoint_of(urlparse(str(request.url)).path)
+        )
+        if policy.idempotency_key:
+            request.headers.setdefault("Idempotency-Key", str(uuid4()))
+        breaker = self.resilience.breaker
+        if breaker is not None:
+            breaker.before_request()
+
+        self._local.max_retries = policy.make_retry()
+        try:
+            response = super(ResilientAdapter, self).send(request, **kwargs)
+        except Exception:
+            if breaker is not None:
+                breaker.record_failure()
+            raise
+        finally:
+            self._local.max_retries = None
+
+        if breaker is not None:
+            if response.status_code in breaker.failure_statuses:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+        return response
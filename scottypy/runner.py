@@ -0,0 +1,135 @@
+import collections
+import logging
+import re
+import threading
+import time
+import typing
+
+from .exc import CombadgeError, CombadgeTimeout
+
+if typing.TYPE_CHECKING:
+    from .progress import ProgressTracker
+
+_TAIL_LINES = 50
+# How long to wait for the rest of the output once the combadge exited, as its children may hold
+# its pipe open
+_OUTPUT_GRACE = 5
+logger = logging.getLogger("scotty.combadge")  # type: logging.Logger
+
+# Patterns of progress lines in the output of the combadge. Each one may have a "bytes" group, the
+# number of bytes sent so far, and a "files" group, the number of files sent so far
+_PROGRESS_PATTERNS = [
+    re.compile(r"(?P<bytes>\d+)\s*(?:/\s*\d+\s*)?bytes\b", re.IGNORECASE),
+    re.compile(r"(?P<files>\d+)\s*(?:/\s*\d+\s*)?files?\b", re.IGNORECASE),
+]  # type: typing.List[typing.Pattern[str]]
+
+
+def register_progress_pattern(pattern: typing.Union[str, typing.Pattern[str]]) -> None:
+    """Recognize another format of progress lines in the output of the combadge.
+
+    :param pattern: A regular expression with a ``bytes`` group, a ``files`` group or both,
+      matching the number of bytes or files sent so far."""
+    compiled = re.compile(pattern) if isinstance(pattern, str) else pattern
+    if not {"bytes", "files"} & set(compiled.groupindex):
+        raise ValueError("A progress pattern needs a 'bytes' or a 'files' group")
+    _PROGRESS_PATTERNS.insert(0, compiled)
+
+
+def parse_progress(
+    line: str,
+) -> typing.Tuple[typing.Optional[int], typing.Optional[int]]:
+    """Return the number of bytes and files sent so far according to a line of combadge output,
+    each of them None if the line doesn't tell"""
+    sent_bytes = sent_files = None
+    for pattern in _PROGRESS_PATTERNS:
+        m = pattern.search(line)
+        if m is None:
+            continue
+        groups = m.groupdict()
+        if sent_bytes is None and groups.get("bytes") is not None:
+            sent_bytes = int(groups["bytes"])
+        if sent_files is None and groups.get("files") is not None:
+            sent_files = int(groups["files"])
+    return sent_bytes, sent_files
+
+
+class OutputCapture(object):
+    """Consumes the output of a combadge line by line, keeping its tail and turning progress lines
+    into progress updates"""
+
+    def __init__(
+        self,
+        version: str,
+        progress: typing.Optional["ProgressTracker"] = None,
+        tail_lines: int = _TAIL_LINES,
+    ):
+        self._version = version
+        self._progress = progress
+        self.tail = collections.deque(maxlen=tail_lines)  # type: typing.Deque[str]
+
+    def feed(self, line: str) -> None:
+        line = line.rstrip("\r\n")
+        self.tail.append(line)
+        logger.debug("combadge %s: %s", self._version, line)
+        if self._progress is None:
+            return
+        sent_bytes, sent_files = parse_progress(line)
+        if sent_bytes is not None:
+            self._progress.update(sent_bytes, files=sent_files)
+        elif sent_files is not None:
+            self._progress.update(
+                self._progress.transferred, files=sent_files, estimate=True
+            )
+
+
+def run_process(
+    args: typing.List[str],
+    version: str,
+    timeout: typing.Optional[float] = None,
+    progress: typing.Optional["ProgressTracker"] = None,
+) -> None:
+    """Run a combadge process, streaming its merged stdout and stderr into the debug log and into
+    progress updates.
+
+    :raise CombadgeTimeout: If it ran for longer than timeout seconds, after killing it.
+    :raise CombadgeError: If it exited with a non-zero exit code."""
+    import subprocess
+
+    capture = OutputCapture(version, progress)
+    start = time.monotonic()
+    process = subprocess.Popen(
+        args,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        universal_newlines=True,
+        errors="replace",
+    )
+    assert process.stdout is not None
+    stdout = process.stdout
+
+    def _read() -> None:
+        with stdout:
+            for line in stdout:
+                capture.feed(line)
+
+    reader = threading.Thread(target=_read, name="scotty-combadge-output", daemon=True)
+    reader.start()
+    try:
+        returncode = process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+        reader.join(_OUTPUT_GRACE)
+        raise CombadgeTimeout(
+            version, time.monotonic() - start, list(capture.tail)
+        ) from None
+    except BaseException:
+        process.kill()
+        process.wait()
+        raise
+    reader.join(_OUTPUT_GRACE)
+    if returncode != 0:
+        raise CombadgeError(
+            version, time.monotonic() - start, list(capture.tail), returncode
+        )
@@ -0,0 +1,228 @@
+import errno
+import fnmatch
+import os
+import re
+import shutil
+import tempfile
+import typing
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .types import JSON
+
+if typing.TYPE_CHECKING:
+    from concurrent.futures import Future
+
+_DEFAULT_WORKERS = 8
+# Once this many directories are waiting to be scanned, the rest of the tree is scanned in parallel
+_PARALLEL_THRESHOLD = 16
+
+_ExcludeMatcher = typing.Callable[[str, str], bool]
+_ScanResult = typing.Tuple[
+    typing.List["ManifestEntry"], typing.List[str], typing.List[str]
+]
+
+
+class ManifestEntry(object):
+    """A regular file found by :func:`scan_directory`.
+
+    :ivar path: The path of the file relative to the scanned directory, separated by ``/``.
+    :ivar size: The size of the file in bytes.
+    :ivar mtime: The modification time of the file."""
+
+    __slots__ = ("path", "size", "mtime")
+
+    def __init__(self, path: str, size: int, mtime: float):
+        self.path = path
+        self.size = size
+        self.mtime = mtime
+
+    def to_json(self) -> JSON:
+        return {"path": self.path, "size": self.size, "mtime": self.mtime}
+
+    def __repr__(self) -> str:
+        return "<ManifestEntry {} ({} bytes)>".format(self.path, self.size)
+
+
+class DirectoryManifest(object):
+    """The regular files under a local directory, as found by :func:`scan_directory`.
+
+    :ivar directory: The absolute path of the scanned directory.
+    :ivar entries: A list of :class:`.ManifestEntry`, sorted by path.
+    :ivar excluded: The relative paths of the files and directories left out of the beam, such as
+      those matching the exclusion patterns."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.entries = []  # type: typing.List[ManifestEntry]
+        self.excluded = []  # type: typing.List[str]
+
+    @property
+    def total_size(self) -> int:
+        return sum(entry.size for entry in self.entries)
+
+    @property
+    def file_count(self) -> int:
+        return len(self.entries)
+
+    def to_json(self) -> JSON:
+        return {
+            "directory": self.directory,
+            "total_size": self.total_size,
+            "file_count": self.file_count,
+            "files": [entry.to_json() for entry in self.entries],
+        }
+
+    def stage(self) -> str:
+        """Create a temporary directory holding only the files of the manifest, with the same
+        layout, and return its path. The caller is responsible for removing it.
+
+        Files are hard linked, so staging costs no copying, when a temporary directory can be
+        created on the file system of the scanned one. Otherwise they are copied."""
+        staging = None  # type: typing.Optional[str]
+        parent = _staging_parent(self.directory)
+        if parent is not None:
+            try:
+                staging = tempfile.mkdtemp(prefix=".scotty_staging_", dir=parent)
+            except OSError:
+                pass
+        if staging is None:
+            staging = tempfile.mkdtemp(prefix="scotty_staging_")
+        link = True
+        try:
+            for entry in self.entries:
+                source = os.path.join(self.directory, *entry.path.split("/"))
+                target = os.path.join(staging, *entry.path.split("/"))
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                if link:
+                    try:
+                        os.link(source, target)
+                        continue
+                    except OSError as e:
+                        # No file can be linked across file systems, but others may fail alone
+                        link = e.errno != errno.EXDEV
+                shutil.copy2(source, target)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        return staging
+
+
+def _staging_parent(directory: str) -> typing.Optional[str]:
+    """Return a writable directory on the file system of directory, to hard link its files to.
+    Its parent is preferred over the temporary directory. None if neither will do"""
+    try:
+        device = os.stat(directory).st_dev
+    except OSError:
+        return None
+    for candidate in (os.path.dirname(directory), tempfile.gettempdir()):
+        try:
+            if os.stat(candidate).st_dev == device and os.access(candidate, os.W_OK):
+                return candidate
+        except OSError:
+            pass
+    return None
+
+
+def _compile_excludes(patterns: typing.Sequence[str]) -> _ExcludeMatcher:
+    """Patterns without a ``/`` match the name of a file or directory at any depth, like in
+    ``.gitignore``. The others match its whole relative path"""
+    name_patterns = [fnmatch.translate(p) for p in patterns if "/" not in p]
+    path_patterns = [fnmatch.translate(p.strip("/")) for p in patterns if "/" in p]
+    match_name = re.compile("|".join(name_patterns)).match if name_patterns else None
+    match_path = re.compile("|".join(path_patterns)).match if path_patterns else None
+
+    def _is_excluded(name: str, path: str) -> bool:
+        return bool(
+            (match_name is not None and match_name(name))
+            or (match_path is not None and match_path(path))
+        )
+
+    return _is_excluded
+
+
+def _scan_one(
+    directory: str, relative: str, is_excluded: _ExcludeMatcher
+) -> _ScanResult:
+    entries = []  # type: typing.List[ManifestEntry]
+    excluded = []  # type: typing.List[str]
+    subdirectories = []  # type: typing.List[str]
+    path = os.path.join(directory, relative) if relative else directory
+    try:
+        it = os.scandir(path)
+    except OSError:
+        # Like os.walk, skip what cannot be listed, but not the scanned directory itself
+        if not relative:
+            raise
+        return entries, excluded, subdirectories
+    with it:
+        for dir_entry in it:
+            entry_path = relative + "/" + dir_entry.name if relative else dir_entry.name
+            try:
+                if dir_entry.is_dir(follow_symlinks=False):
+                    if is_excluded(dir_entry.name, entry_path):
+                        excluded.append(entry_path + "/")
+                    else:
+                        subdirectories.append(entry_path)
+                elif dir_entry.is_file(follow_symlinks=False):
+                    if is_excluded(dir_entry.name, entry_path):
+                        excluded.append(entry_path)
+                    else:
+                        st = dir_entry.stat(follow_symlinks=False)
+                        entries.append(
+                            ManifestEntry(entry_path, st.st_size, st.st_mtime)
+                        )
+            except OSError:
+                pass
+    return entries, excluded, subdirectories
+
+
+def scan_directory(
+    directory: str,
+    exclude: typing.Sequence[str] = (),
+    workers: int = _DEFAULT_WORKERS,
+) -> DirectoryManifest:
+    """Build a manifest of the regular files under directory, without following symbolic links.
+
+    Narrow trees are scanned in the calling thread. Once enough directories are waiting to be
+    scanned, the rest of the tree is scanned by a pool of workers, which pays off on wide trees
+    and on network file systems.
+
+    :param str directory: The directory to scan.
+    :param list exclude: Glob patterns of files and directories to leave out. A pattern without a
+      ``/``, such as ``*.core``, matches names at any depth, and one with a ``/``, such as
+      ``build/*.o``, matches paths relative to directory.
+    :param int workers: The maximal number of threads scanning in parallel.
+    :rtype: :class:`.DirectoryManifest`"""
+    manifest = DirectoryManifest(os.path.abspath(directory))
+    is_excluded = _compile_excludes(exclude)
+
+    def _collect(result: _ScanResult) -> typing.List[str]:
+        entries, excluded, subdirectories = result
+        manifest.entries.extend(entries)
+        manifest.excluded.extend(excluded)
+        return subdirectories
+
+    pending = [""]
+    while pending and (workers <= 1 or len(pending) < _PARALLEL_THRESHOLD):
+        pending.extend(
+            _collect(_scan_one(manifest.directory, pending.pop(), is_excluded))
+        )
+
+    if pending:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = set()  # type: typing.Set[Future[_ScanResult]]
+            while pending or futures:
+                futures.update(
+                    executor.submit(
+                        _scan_one, manifest.directory, relative, is_excluded
+                    )
+                    for relative in pending
+                )
+                pending = []
+                done, futures = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.extend(_collect(future.result()))
+
+    manifest.entries.sort(key=lambda entry: entry.path)
+    manifest.excluded.sort()
+    return manifest
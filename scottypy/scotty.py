@@ -1,31 +1,49 @@
 import abc
+import contextlib
 import errno
 import itertools
-import json
 import logging
 import os
+import shutil
 import socket
 import stat
-import subprocess
 import sys
 import tempfile
-import types
+import threading
 import typing
 from tempfile import NamedTemporaryFile
 from uuid import uuid4
 
-import emport
 import requests
-from requests.adapters import HTTPAdapter
-from requests.packages.urllib3.util.retry import Retry  # type: ignore
 
+from . import jsonlib, metrics, runner, transfer
 from .beam import Beam
-from .exc import PathNotExists
+from .exc import BulkOperationError, CombadgeError, CombadgeTimeout, PathNotExists
 from .file import File
+from .filters import BeamSelector, FileFilter
+from .incremental import IncrementalState
+from .progress import ProgressCallback, ProgressTracker
+from .purge import PurgeReport
+from .resilience import Resilience, ResilientAdapter
+from .scan import scan_directory
+from .session import ScottySession
+from .tracing import Tracer
 from .types import JSON
-from .utils import raise_for_status
+from .utils import RateLimiter, TTLCache, raise_for_status, run_concurrently
+
+if typing.TYPE_CHECKING:
+    from .scan import DirectoryManifest
 
 _SLEEP_TIME = 10
+_PROGRESS_POLL_INTERVAL = 5
+_BULK_WORKERS = 8
+_CACHE_TTL = 300
+_PYTHON_COMBADGE_WORKER = """
+import sys
+import emport
+combadge_file, beam_id, directory, transporter_host = sys.argv[1:]
+emport.import_file(combadge_file).beam_up(int(beam_id), directory, transporter_host)
+"""
 _NUM_OF_RETRIES = (60 // _SLEEP_TIME) * 15
 _TIMEOUT = 30
 _DEFAULT_COMBADGE_VERSION = "v2"
@@ -48,29 +66,76 @@ class Combadge:
         pass
 
     @abc.abstractmethod
-    def run(self, *, beam_id: int, directory: str, transporter_host: str) -> None:
-        pass
+    def run(
+        self,
+        *,
+        beam_id: int,
+        directory: str,
+        transporter_host: str,
+        timeout: typing.Optional[float] = None,
+        progress: typing.Optional[ProgressTracker] = None
+    ) -> None:
+        """Run the combadge, beaming up directory.
+
+        :param float timeout: How many seconds to wait for the combadge before giving up.
+        :param progress: A :class:`.ProgressTracker` to update with the progress the combadge
+          reports, if it does.
+        :raise CombadgeTimeout: If the combadge ran for longer than timeout.
+        :raise CombadgeError: If the combadge failed."""
 
 
 class CombadgePython(Combadge):
+    """The v1 combadge, a Python module with a ``beam_up`` function.
+
+    It runs in a worker process of its own, so that it neither competes with the calling program
+    over the GIL nor keeps several beams from uploading in parallel. At most one worker per CPU
+    runs at any time."""
+
     version = "v1"  # type: str
+    _workers = threading.BoundedSemaphore(os.cpu_count() or 1)
 
-    def __init__(self, combadge_module: types.ModuleType):
-        self._combadge_module = combadge_module
+    def __init__(self, file_name: str):
+        self._file_name = file_name
 
     @classmethod
     def from_response(cls, response: requests.Response) -> "CombadgePython":
         with NamedTemporaryFile(mode="w", suffix=".py", delete=False) as combadge_file:
             combadge_file.write(response.text)
-            combadge_file.flush()
-        return cls(emport.import_file(combadge_file.name))
+        # Fail here rather than in the worker if the combadge is broken
+        compile(response.text, combadge_file.name, "exec")
+        return cls(combadge_file.name)
 
     def remove(self) -> None:
-        if self._combadge_module.__file__ is not None:
-            os.remove(self._combadge_module.__file__)
+        try:
+            os.remove(self._file_name)
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
 
-    def run(self, *, beam_id: int, directory: str, transporter_host: str) -> None:
-        self._combadge_module.beam_up(beam_id, directory, transporter_host)
+    def run(
+        self,
+        *,
+        beam_id: int,
+        directory: str,
+        transporter_host: str,
+        timeout: typing.Optional[float] = None,
+        progress: typing.Optional[ProgressTracker] = None
+    ) -> None:
+        with self._workers:
+            runner.run_process(
+                [
+                    sys.executable,
+                    "-c",
+                    _PYTHON_COMBADGE_WORKER,
+                    self._file_name,
+                    str(beam_id),
+                    directory,
+                    transporter_host,
+                ],
+                self.version,
+                timeout=timeout,
+                progress=progress,
+            )
 
 
 class CombadgeRust(Combadge):
@@ -94,8 +159,7 @@ class CombadgeRust(Combadge):
     def from_response(cls, response: requests.Response) -> "CombadgeRust":
         local_combadge_path = cls._get_local_combadge_path()
         with open(local_combadge_path, "wb") as combadge_file:
-            for chunk in response.iter_content(chunk_size=1024):
-                combadge_file.write(chunk)
+            transfer.copy_response(response, combadge_file.write)
             st = os.stat(local_combadge_path)
             os.chmod(local_combadge_path, st.st_mode | stat.S_IEXEC)
             return cls(combadge_file.name)
@@ -107,8 +171,16 @@ class CombadgeRust(Combadge):
             if e.errno != errno.ENOENT:
                 raise
 
-    def run(self, *, beam_id: int, directory: str, transporter_host: str) -> None:
-        subprocess.run(
+    def run(
+        self,
+        *,
+        beam_id: int,
+        directory: str,
+        transporter_host: str,
+        timeout: typing.Optional[float] = None,
+        progress: typing.Optional[ProgressTracker] = None
+    ) -> None:
+        runner.run_process(
             [
                 self._file_name,
                 "-b",
@@ -118,32 +190,83 @@ class CombadgeRust(Combadge):
                 "-t",
                 transporter_host,
             ],
-            check=False,
+            self.version,
+            timeout=timeout,
+            progress=progress,
         )
 
 
+class _BeamProgressPoller(object):
+    """Reports the progress of a beam while its combadge runs, by polling the size of the beam.
+
+    The polled size is an estimate, used until the combadge reports its own progress."""
+
+    def __init__(self, beam: Beam, tracker: ProgressTracker):
+        self._beam = beam
+        self._tracker = tracker
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="scotty-beam-progress", daemon=True
+        )
+
+    def __enter__(self) -> "_BeamProgressPoller":
+        self._tracker.update(0, force=True, estimate=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *_: typing.Any) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(_PROGRESS_POLL_INTERVAL):
+            try:
+                self._beam.update()
+            except Exception:  # pylint: disable=broad-except
+                logger.debug("Failed polling beam %s", self._beam.id, exc_info=True)
+                continue
+            if self._tracker.exact:
+                return
+            self._tracker.update(self._beam.size, estimate=True)
+
+
 class Scotty(object):
     """Main class that communicates with Scotty.
 
-    :param str url: The base URL of Scotty."""
-
-    def __init__(self, url: str, retry_times: int = 3, backoff_factor: int = 2):
+    :param str url: The base URL of Scotty.
+    :param int retry_times: How many times to retry a failed request.
+    :param float backoff_factor: The cap of the randomized wait before the first retry, doubled on
+      every retry.
+    :param resilience: A :class:`.Resilience` setting the retry policy of every endpoint and the
+      circuit breaker, instead of the defaults. Overrides retry_times and
+      backoff_factor.
+    :param float cache_ttl: How many seconds to remember the IDs of trackers and issues
+      for."""
+
+    def __init__(
+        self,
+        url: str,
+        retry_times: int = 3,
+        backoff_factor: float = 2,
+        resilience: typing.Optional[Resilience] = None,
+        cache_ttl: float = _CACHE_TTL,
+    ):
         self._url = url
-        self._session = requests.Session()
+        self._session = ScottySession()
         self._session.headers.update(
             {"Accept-Encoding": "gzip", "Content-Type": "application/json"}
         )
-        self._session.mount(
-            url,
-            HTTPAdapter(
-                max_retries=Retry(
-                    total=retry_times,
-                    status_forcelist=[502, 504],
-                    backoff_factor=backoff_factor,
-                )
-            ),
-        )
+        if resilience is None:
+            resilience = Resilience.for_scotty(retry_times, backoff_factor)
+        self._session.mount(url, ResilientAdapter(resilience))
         self._combadge = None  # type: typing.Optional[Combadge]
+        self._combadge_lock = threading.Lock()
+        self._batch_tags_supported = None  # type: typing.Optional[bool]
+        self._tracker_ids = TTLCache(cache_ttl)  # type: TTLCache[str, int]
+        self._issue_ids = TTLCache(
+            cache_ttl
+        )  # type: TTLCache[typing.Tuple[int, str], int]
+        self._last_trace = None  # type: typing.Optional[Tracer]
 
     def prefetch_combadge(
         self, combadge_version: str = _DEFAULT_COMBADGE_VERSION
@@ -159,26 +282,28 @@ class Scotty(object):
     def _get_combadge(self, combadge_version: str) -> "Combadge":
         """Get the combadge from the memory if it has been prefetched. Otherwise, download
         it from Scotty"""
-        if self._combadge and self._combadge.version == combadge_version:
-            return self._combadge
+        with self._combadge_lock:
+            if self._combadge and self._combadge.version == combadge_version:
+                return self._combadge
 
-        response = self._session.get(
-            "{}/combadge".format(self._url),
-            timeout=_TIMEOUT,
-            params={
-                "combadge_version": combadge_version,
-                "os_type": sys.platform,
-            },
-        )
-        raise_for_status(response)
+            response = self._session.get(
+                "{}/combadge".format(self._url),
+                timeout=_TIMEOUT,
+                stream=True,
+                params={
+                    "combadge_version": combadge_version,
+                    "os_type": sys.platform,
+                },
+            )
+            raise_for_status(response)
 
-        if combadge_version == "v1":  # python version
-            self._combadge = CombadgePython.from_response(response)
-        elif combadge_version == "v2":  # rust version
-            self._combadge = CombadgeRust.from_response(response)
-        else:
-            raise Exception("Wrong combadge type")
-        return self._combadge
+            if combadge_version == "v1":  # python version
+                self._combadge = CombadgePython.from_response(response)
+            elif combadge_version == "v2":  # rust version
+                self._combadge = CombadgeRust.from_response(response)
+            else:
+                raise Exception("Wrong combadge type")
+            return self._combadge
 
     @property
     def session(self) -> requests.Session:
@@ -191,6 +316,11 @@ class Scotty(object):
     def url(self) -> str:
         return self._url
 
+    @property
+    def last_trace(self) -> typing.Optional[Tracer]:
+        """The :class:`.Tracer` of the last call to :func:`beam_up`, holding its timing report"""
+        return self._last_trace
+
     def beam_up(
         self,
         directory: str,
@@ -201,6 +331,14 @@ class Scotty(object):
         return_beam_object: bool = False,
         tracker_name: str = "JIRA",
         associated_issue: typing.Optional[str] = None,
+        tracer: typing.Optional[Tracer] = None,
+        scan: bool = False,
+        exclude: typing.Sequence[str] = (),
+        progress_callback: typing.Optional[ProgressCallback] = None,
+        incremental: bool = False,
+        incremental_checksum: typing.Optional[str] = None,
+        state_path: typing.Optional[str] = None,
+        combadge_timeout: typing.Optional[float] = None,
     ) -> typing.Union["Beam", int]:
         """Beam up the specified local directory to Scotty.
 
@@ -210,15 +348,59 @@ class Scotty(object):
         :param bool return_beam_object: If set to True, return a :class:`.Beam` instance.
         :param str associated_issue: An optional associated issue ticket.
         :param str tracker_name: Name of the issues tracker.
+        :param tracer: An optional :class:`.Tracer` recording the duration of each phase of the beam.
+          Only the phases which run are recorded, along with the size of the directory if it is
+          scanned. The tracer of the last beam is also available as :attr:`last_trace`.
+        :param bool scan: Scan the directory before beaming it, sending its expected total size
+          and number of files along with the beam. Implied by the following parameters.
+        :param list exclude: Glob patterns of files and directories not to beam, as accepted by
+          :func:`.scan_directory`.
+        :param progress_callback: Called with a :class:`.Progress` from time to time while the
+          combadge runs, with the expected total size from the scan.
+        :param bool incremental: Only beam the files which are new or modified since the last
+          incremental beam of this directory. The comment of the new beam refers to the previous
+          one. Even if nothing changed, a new (empty) beam is created.
+        :param str incremental_checksum: A checksum algorithm, such as ``sha256``, for telling
+          files which were only touched from modified ones in incremental mode. By default, a
+          file is modified if its size or modification time changed.
+        :param str state_path: Where to keep the state of the incremental beams of this
+          directory. Defaults to a file under ``~/.scotty``.
+        :param float combadge_timeout: How many seconds to let the combadge run before killing
+          it and raising :class:`.CombadgeTimeout`. By default, it may run forever. A failing
+          combadge raises :class:`.CombadgeError`, with the tail of its output.
 
         :return: the beam id."""
         if not os.path.exists(directory):
             raise PathNotExists(directory)
+        scan = scan or bool(exclude) or progress_callback is not None or incremental
+        if tracer is None:
+            tracer = Tracer("beam_up")
+        self._last_trace = tracer
         combadge_version = self._get_combadge_version(version_override=combadge_version)
         directory = os.path.abspath(directory)
-        response = self._session.get("{}/info".format(self._url), timeout=_TIMEOUT)
-        raise_for_status(response)
-        transporter_host = response.json()["transporter"]
+        tracer.set_attribute("directory", directory)
+        manifest = None  # type: typing.Optional[DirectoryManifest]
+        if scan:
+            with tracer.span("scan_directory") as span:
+                manifest = scan_directory(directory, exclude=exclude)
+                span.attributes["excluded"] = len(manifest.excluded)
+            tracer.set_attribute("directory_size", manifest.total_size)
+            tracer.set_attribute("file_count", manifest.file_count)
+
+        state = None  # type: typing.Optional[IncrementalState]
+        directory_manifest = manifest
+        if incremental:
+            assert manifest is not None
+            with tracer.span("find_changes") as span:
+                state = IncrementalState.load(directory, state_path)
+                manifest = state.changes(manifest, incremental_checksum)
+                span.attributes["changed"] = manifest.file_count
+            tracer.set_attribute("predecessor", state.beam_id)
+
+        with tracer.span("info"):
+            response = self._session.get("{}/info".format(self._url), timeout=_TIMEOUT)
+            raise_for_status(response)
+            transporter_host = jsonlib.response_json(response)["transporter"]
 
         beam = {
             "directory": directory,
@@ -235,28 +417,81 @@ class Scotty(object):
         if tags:
             beam["tags"] = tags
 
-        response = self._session.post(
-            "{}/beams".format(self._url),
-            data=json.dumps({"beam": beam}),
-            timeout=_TIMEOUT,
-        )
-        raise_for_status(response)
+        if manifest is not None:
+            beam["expected_size"] = manifest.total_size
+            beam["expected_file_count"] = manifest.file_count
+
+        if state is not None and state.beam_id is not None:
+            beam["comment"] = "Changes since beam #{}".format(state.beam_id)
 
-        beam_data = response.json()
+        with tracer.span("create_beam"):
+            response = self._session.post(
+                "{}/beams".format(self._url),
+                data=jsonlib.dumps({"beam": beam}),
+                timeout=_TIMEOUT,
+            )
+            raise_for_status(response)
+
+        beam_data = jsonlib.response_json(response)
         beam_id = beam_data["beam"]["id"]  # type: int
         beam_obj = Beam.from_json(self, beam_data["beam"])
+        tracer.set_attribute("beam_id", beam_id)
+        metrics.beams_created.inc(kind="local")
 
         if associated_issue:
-            tracker_id = self.get_tracker_id(name=tracker_name)
-            issue_id = self.create_issue(
-                tracker_id=tracker_id, id_in_tracker=associated_issue
+            with tracer.span("get_tracker", tracker_name=tracker_name):
+                tracker_id = self.get_tracker_id(name=tracker_name)
+            with tracer.span("resolve_issue", issue=associated_issue):
+                issue_id = self.resolve_issue(
+                    tracker_id=tracker_id, id_in_tracker=associated_issue
+                )
+            with tracer.span("associate_issue", issue_id=issue_id):
+                beam_obj.set_issue_association(issue_id=issue_id, associated=True)
+
+        with tracer.span("fetch_combadge", combadge_version=combadge_version):
+            combadge = self._get_combadge(combadge_version)
+
+        staging = None  # type: typing.Optional[str]
+        if manifest is not None and manifest.excluded:
+            with tracer.span("stage_directory"):
+                staging = manifest.stage()
+        progress = None  # type: typing.Optional[ProgressTracker]
+        if progress_callback is not None:
+            assert manifest is not None
+            progress = ProgressTracker(
+                progress_callback,
+                total=manifest.total_size,
+                total_files=manifest.file_count,
             )
-            beam_obj.set_issue_association(issue_id=issue_id, associated=True)
-
-        combadge = self._get_combadge(combadge_version)
-        combadge.run(
-            beam_id=beam_id, directory=directory, transporter_host=transporter_host
-        )
+        try:
+            with tracer.span("run_combadge", combadge_version=combadge_version) as span:
+                with contextlib.ExitStack() as stack:
+                    if progress is not None:
+                        stack.enter_context(_BeamProgressPoller(beam_obj, progress))
+                    combadge.run(
+                        beam_id=beam_id,
+                        directory=staging or directory,
+                        transporter_host=transporter_host,
+                        timeout=combadge_timeout,
+                        progress=progress,
+                    )
+        except CombadgeError as e:
+            reason = "timeout" if isinstance(e, CombadgeTimeout) else "error"
+            metrics.combadge_failures.inc(version=combadge_version, reason=reason)
+            raise
+        finally:
+            if staging is not None:
+                shutil.rmtree(staging, ignore_errors=True)
+        if progress is not None:
+            assert manifest is not None
+            progress.update(manifest.total_size, files=manifest.file_count, force=True)
+        assert span.duration is not None
+        metrics.combadge_runtime.observe(span.duration, version=combadge_version)
+
+        if state is not None:
+            assert directory_manifest is not None
+            state.update(directory_manifest, beam_id, incremental_checksum)
+            state.save()
 
         if return_beam_object:
             return beam_obj
@@ -338,12 +573,13 @@ class Scotty(object):
 
         response = self._session.post(
             "{0}/beams".format(self._url),
-            data=json.dumps({"beam": beam}),
+            data=jsonlib.dumps({"beam": beam}),
             timeout=_TIMEOUT,
         )
         raise_for_status(response)
+        metrics.beams_created.inc(kind="remote")
 
-        beam_data = response.json()
+        beam_data = jsonlib.response_json(response)
 
         if return_beam_object:
             return Beam.from_json(self, beam_data["beam"])
@@ -371,6 +607,66 @@ class Scotty(object):
         )
         raise_for_status(response)
 
+    def add_tags(
+        self,
+        beam_ids: typing.Iterable[int],
+        tags: typing.Iterable[str],
+        max_workers: int = _BULK_WORKERS,
+    ) -> None:
+        """Add all the specified tags on all the specified beams.
+
+        A single request is made if Scotty supports tagging in bulk. Otherwise, the beams are
+        tagged one by one, with at most max_workers requests at once.
+
+        :param list beam_ids: Beam IDs.
+        :param list tags: Tag names.
+        :raise BulkOperationError: If tagging some of the beams failed. The others are
+          tagged."""
+        self._tag_in_bulk("POST", list(beam_ids), list(tags), self.add_tag, max_workers)
+
+    def remove_tags(
+        self,
+        beam_ids: typing.Iterable[int],
+        tags: typing.Iterable[str],
+        max_workers: int = _BULK_WORKERS,
+    ) -> None:
+        """Remove all the specified tags from all the specified beams, like :func:`add_tags`.
+
+        :param list beam_ids: Beam IDs.
+        :param list tags: Tag names.
+        :raise BulkOperationError: If untagging some of the beams failed."""
+        self._tag_in_bulk(
+            "DELETE", list(beam_ids), list(tags), self.remove_tag, max_workers
+        )
+
+    def _tag_in_bulk(
+        self,
+        method: str,
+        beam_ids: typing.List[int],
+        tags: typing.List[str],
+        tag_one: typing.Callable[[int, str], None],
+        max_workers: int,
+    ) -> None:
+        if not beam_ids or not tags:
+            return
+        if self._batch_tags_supported is not False:
+            response = self._session.request(
+                method,
+                "{0}/beams/tags".format(self._url),
+                data=jsonlib.dumps({"beam_ids": beam_ids, "tags": tags}),
+                timeout=_TIMEOUT,
+            )
+            if response.status_code not in (404, 405):
+                raise_for_status(response)
+                self._batch_tags_supported = True
+                return
+            self._batch_tags_supported = False
+
+        pairs = list(itertools.product(beam_ids, tags))
+        failures = run_concurrently(lambda pair: tag_one(*pair), pairs, max_workers)
+        if failures:
+            raise BulkOperationError(len(pairs), failures)
+
     def get_beam(self, beam_id: typing.Union[str, int]) -> "Beam":
         """Retrieve details about the specified beam.
 
@@ -381,19 +677,37 @@ class Scotty(object):
         )
         raise_for_status(response)
 
-        json_response = response.json()
+        json_response = jsonlib.response_json(response)
         return Beam.from_json(self, json_response["beam"])
 
     def get_files(
-        self, beam_id: int, filter_: typing.Optional[str] = None
+        self,
+        beam_id: int,
+        filter_: typing.Union[str, FileFilter, None] = None,
     ) -> typing.List[File]:
+        """Retrieve the files of the specified beam.
+
+        :param int beam_id: Beam ID.
+        :param filter_: Either a string, in which case only files which their name contains it
+          are returned, or a :class:`.FileFilter`.
+        :return: a list of :class:`.File` objects."""
+        predicate = None
+        if isinstance(filter_, FileFilter):
+            predicate = filter_.compile()
+            filter_ = filter_.server_filter()
+
         response = self._session.get(
             "{0}/files".format(self._url),
             params={"beam_id": beam_id, "filter": filter_},
             timeout=_TIMEOUT,
         )
         raise_for_status(response)
-        return [File.from_json(self._session, f) for f in response.json()["files"]]
+        nodes = jsonlib.response_json(response)["files"]
+        return [
+            File.from_json(self._session, f)
+            for f in nodes
+            if predicate is None or predicate(f)
+        ]
 
     def get_file(self, file_id: int) -> File:
         """Retrieve details about the specified file.
@@ -405,7 +719,7 @@ class Scotty(object):
         )
         raise_for_status(response)
 
-        json_response = response.json()
+        json_response = jsonlib.response_json(response)
         return File.from_json(self._session, json_response["file"])
 
     def get_beams_by_tag(self, tag: str) -> typing.List[Beam]:
@@ -414,14 +728,27 @@ class Scotty(object):
         :param str tag: The name of the tag.
         :return: a list of :class:`.Beam` objects.
         """
+        return list(self.iter_beams_by_tag(tag))
+
+    def iter_beams_by_tag(self, tag: str) -> typing.Iterator[Beam]:
+        """Iterate the beams associated with the specified tag, yielding every
+        :class:`.Beam` as soon as its details have been retrieved.
+
+        :param str tag: The name of the tag.
+        """
+        for id_ in self.get_beam_ids_by_tag(tag):
+            yield self.get_beam(id_)
 
+    def get_beam_ids_by_tag(self, tag: str) -> typing.List[int]:
+        """Retrieve the IDs of the beams associated with the specified tag, without their details.
+
+        :param str tag: The name of the tag."""
         response = self._session.get(
             "{0}/beams?tag={1}".format(self._url, tag), timeout=_TIMEOUT
         )
         raise_for_status(response)
 
-        ids = (b["id"] for b in response.json()["beams"])
-        return [self.get_beam(id_) for id_ in ids]
+        return [b["id"] for b in jsonlib.response_json(response)["beams"]]
 
     def get_beams_by_issue(self, issue: str) -> typing.List[Beam]:
         """Retrieve the list of beams associated with the specified issue.
@@ -440,18 +767,67 @@ class Scotty(object):
             )
             raise_for_status(response)
 
-            response_json = response.json()
+            response_json = jsonlib.response_json(response)
             ids = (b["id"] for b in response_json["beams"])
             beams.extend(self.get_beam(id_) for id_ in ids)
             if page >= response_json["meta"]["total_pages"]:
                 break
         return beams
 
+    def select_beams(self, selector: BeamSelector) -> typing.List[Beam]:
+        """Retrieve the beams matching a :class:`.BeamSelector`.
+
+        :return: a list of :class:`.Beam` objects."""
+        if selector.tag is not None:
+            beams = self.get_beams_by_tag(selector.tag)
+            if selector.issue is not None:
+                issue_beam_ids = {
+                    beam.id for beam in self.get_beams_by_issue(selector.issue)
+                }
+                beams = [beam for beam in beams if beam.id in issue_beam_ids]
+        else:
+            assert selector.issue is not None
+            beams = self.get_beams_by_issue(selector.issue)
+        return [beam for beam in beams if selector.matches(beam)]
+
+    def delete_beams(
+        self,
+        beams: typing.Union[BeamSelector, typing.Iterable[Beam]],
+        dry_run: bool = False,
+        max_workers: int = _BULK_WORKERS,
+        rate: typing.Optional[float] = None,
+    ) -> PurgeReport:
+        """Delete many beams concurrently.
+
+        :param beams: Either a :class:`.BeamSelector` or the :class:`.Beam` objects to delete.
+        :param bool dry_run: Only select the beams, to see how much space deleting them would
+          reclaim.
+        :param int max_workers: The maximal number of deletions running at once.
+        :param float rate: The maximal number of deletions to start per second.
+        :return: a :class:`.PurgeReport`. Beams which could not be deleted are listed in its
+          failures."""
+        if isinstance(beams, BeamSelector):
+            beams = self.select_beams(beams)
+        report = PurgeReport(list(beams), dry_run)
+        if dry_run:
+            return report
+
+        limiter = RateLimiter(rate) if rate else None
+
+        def _delete(beam: Beam) -> None:
+            if limiter is not None:
+                limiter.wait()
+            beam.delete()
+            report.deleted.append(beam.id)
+
+        report.failures = run_concurrently(_delete, report.beams, max_workers)
+        return report
+
     def sanity_check(self) -> None:
         """Check if this instance of Scotty is functioning. Raise an exception if something's wrong"""
         response = requests.get("{0}/info".format(self._url))
         raise_for_status(response)
-        info = json.loads(response.text)
+        info = jsonlib.response_json(response)
         assert "version" in info
 
     def create_tracker(
@@ -462,14 +838,14 @@ class Scotty(object):
                 "name": name,
                 "type": tracker_type,
                 "url": url,
-                "config": json.dumps(config),
+                "config": jsonlib.dumps_str(config),
             }
         }
         response = self._session.post(
-            "{}/trackers".format(self._url), data=json.dumps(data), timeout=_TIMEOUT
+            "{}/trackers".format(self._url), data=jsonlib.dumps(data), timeout=_TIMEOUT
         )
         raise_for_status(response)
-        tracker_id = response.json()["tracker"]["id"]  # type: int
+        tracker_id = jsonlib.response_json(response)["tracker"]["id"]  # type: int
         return tracker_id
 
     def get_tracker_by_name(self, name: str) -> typing.Optional[JSON]:
@@ -478,19 +854,43 @@ class Scotty(object):
                 "{}/trackers/by_name/{}".format(self._url, name), timeout=_TIMEOUT
             )
             raise_for_status(response)
-            tracker = response.json()["tracker"]  # type: JSON
+            tracker = jsonlib.response_json(response)["tracker"]  # type: JSON
             return tracker
         except requests.exceptions.HTTPError:
             return None
 
     def get_tracker_id(self, name: str) -> int:
+        """Return the ID of the tracker named name. IDs are remembered for `cache_ttl` seconds"""
+        cached = self._tracker_ids.get(name)
+        if cached is not None:
+            return cached
         response = self._session.get(
             "{}/trackers/by_name/{}".format(self._url, name), timeout=_TIMEOUT
         )
         raise_for_status(response)
-        tracker_id = response.json()["tracker"]["id"]  # type: int
+        tracker_id = jsonlib.response_json(response)["tracker"]["id"]  # type: int
+        self._tracker_ids.set(name, tracker_id)
         return tracker_id
 
+    def resolve_issue(self, tracker_id: int, id_in_tracker: str) -> int:
+        """Return the ID of an issue, creating it if Scotty doesn't know it yet.
+        IDs are remembered for `cache_ttl` seconds.
+
+        :param int tracker_id: The ID of the tracker of the issue.
+        :param str id_in_tracker: The name of the issue in its tracker, such as
+          ``JIRA-1234``."""
+        key = (tracker_id, id_in_tracker)
+        cached = self._issue_ids.get(key)
+        if cached is not None:
+            return cached
+        issue = self.get_issue_by_tracker(tracker_id, id_in_tracker)
+        if issue is not None:
+            issue_id = issue["id"]  # type: int
+        else:
+            issue_id = self.create_issue(tracker_id, id_in_tracker)
+        self._issue_ids.set(key, issue_id)
+        return issue_id
+
     def create_issue(self, tracker_id: int, id_in_tracker: str) -> int:
         data = {
             "issue": {
@@ -499,10 +899,10 @@ class Scotty(object):
             }
         }
         response = self._session.post(
-            "{}/issues".format(self._url), data=json.dumps(data), timeout=_TIMEOUT
+            "{}/issues".format(self._url), data=jsonlib.dumps(data), timeout=_TIMEOUT
         )
         raise_for_status(response)
-        issue_id = response.json()["issue"]["id"]  # type: int
+        issue_id = jsonlib.response_json(response)["issue"]["id"]  # type: int
         return issue_id
 
     def delete_issue(self, issue_id: int) -> None:
@@ -510,6 +910,7 @@ class Scotty(object):
             "{}/issues/{}".format(self._url, issue_id), timeout=_TIMEOUT
         )
         raise_for_status(response)
+        self._issue_ids.clear()
 
     def get_issue_by_tracker(
         self, tracker_id: int, id_in_tracker: str
@@ -523,18 +924,21 @@ class Scotty(object):
             params=params,
             timeout=_TIMEOUT,
         )
-        try:
-            raise_for_status(response)
-            issue = response.json()["issue"]  # type: JSON
-            return issue
-        except requests.exceptions.HTTPError:
+        # Only a missing issue means there is none. Anything else must not have beam_up create
+        # a duplicate of an issue which exists
+        if response.status_code == requests.codes.not_found:
             return None
+        raise_for_status(response)
+        issue = jsonlib.response_json(response)["issue"]  # type: JSON
+        return issue
 
     def delete_tracker(self, tracker_id: int) -> None:
         response = self._session.delete(
             "{}/trackers/{}".format(self._url, tracker_id), timeout=_TIMEOUT
         )
         raise_for_status(response)
+        self._tracker_ids.clear()
+        self._issue_ids.clear()
 
     def update_tracker(
         self,
@@ -552,11 +956,12 @@ class Scotty(object):
             data["url"] = url
 
         if config:
-            data["config"] = json.dumps(config)
+            data["config"] = jsonlib.dumps_str(config)
 
         response = self._session.put(
             "{}/trackers/{}".format(self._url, tracker_id),
-            data=json.dumps({"tracker": data}),
+            data=jsonlib.dumps({"tracker": data}),
             timeout=_TIMEOUT,
         )
         raise_for_status(response)
+        self._tracker_ids.clear()
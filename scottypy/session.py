@@ -0,0 +1,40 @@
+import time
+import typing
+from urllib.parse import urlparse
+
+import requests
+
+from . import metrics
+
+
+class ScottySession(requests.Session):
+    """The HTTP session used to communicate with Scotty.
+    Records the client metrics of every request sent through it."""
+
+    def send(
+        self, request: requests.PreparedRequest, **kwargs: typing.Any
+    ) -> requests.Response:
+        endpoint = metrics.endpoint_of(urlparse(str(request.url)).path)
+        start = time.perf_counter()
+        try:
+            response = super(ScottySession, self).send(request, **kwargs)
+        except requests.RequestException:
+            metrics.http_errors.inc(endpoint=endpoint)
+            metrics.http_requests.inc(
+                endpoint=endpoint, method=request.method, status="error"
+            )
+            raise
+        finally:
+            metrics.http_request_duration.observe(
+                time.perf_counter() - start, endpoint=endpoint
+            )
+
+        retries = getattr(response.raw, "retries", None)
+        if retries is not None and retries.history:
+            metrics.http_retries.inc(len(retries.history), endpoint=endpoint)
+        if response.status_code >= 400:
+            metrics.http_errors.inc(endpoint=endpoint)
+        metrics.http_requests.inc(
+            endpoint=endpoint, method=request.method, status=response.status_code
+        )
+        return response
@@ -0,0 +1,110 @@
+import contextlib
+import logging
+import time
+import typing
+
+from .types import JSON
+
+logger = logging.getLogger("scotty.trace")  # type: logging.Logger
+
+
+class Span(object):
+    """A single timed phase of an operation.
+
+    :ivar name: The name of the phase.
+    :ivar attributes: Extra information attached to the phase.
+    :ivar duration: The duration of the phase in seconds, or None if it hasn't finished yet.
+    :ivar error: A string representing the exception raised during the phase, if any."""
+
+    def __init__(self, name: str, attributes: JSON):
+        self.name = name
+        self.attributes = attributes
+        self.duration = None  # type: typing.Optional[float]
+        self.error = None  # type: typing.Optional[str]
+        self._start = time.perf_counter()
+
+    def finish(self) -> None:
+        self.duration = time.perf_counter() - self._start
+
+    def to_json(self) -> JSON:
+        return {
+            "name": self.name,
+            "duration": self.duration,
+            "error": self.error,
+            "attributes": dict(self.attributes),
+        }
+
+
+class Tracer(object):
+    """Records the phases of an operation as :class:`.Span` objects.
+
+    Every finished span is also emitted as a DEBUG record on the ``scotty.trace`` logger.
+    The record carries the span as a dictionary in its ``span`` attribute, together with
+    the attributes of the tracer itself (such as the beam ID).
+
+    :param str name: The name of the traced operation."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.attributes = {}  # type: JSON
+        self.spans = []  # type: typing.List[Span]
+
+    def set_attribute(self, key: str, value: typing.Any) -> None:
+        """Attach a value to the whole operation, e.g. the beam ID once it is known"""
+        self.attributes[key] = value
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attributes: typing.Any) -> typing.Iterator[Span]:
+        """Time the enclosed block as a phase called `name`"""
+        span = Span(name, attributes)
+        self.spans.append(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = repr(e)
+            raise
+        finally:
+            span.finish()
+            self._log(span)
+
+    def _log(self, span: Span) -> None:
+        record = span.to_json()
+        record["operation"] = self.name
+        record.update(self.attributes)
+        logger.debug(
+            "%s: %s took %.3fs",
+            self.name,
+            span.name,
+            span.duration,
+            extra={"span": record},
+        )
+
+    @property
+    def total_duration(self) -> float:
+        return sum(span.duration or 0 for span in self.spans)
+
+    def report(self) -> JSON:
+        """Return the timing report of the operation as a dictionary"""
+        return {
+            "name": self.name,
+            "attributes": dict(self.attributes),
+            "total_duration": self.total_duration,
+            "spans": [span.to_json() for span in self.spans],
+        }
+
+    def format_report(self) -> str:
+        """Return the timing report of the operation as a human readable table"""
+        attributes = ", ".join(
+            "{}={}".format(key, value) for key, value in sorted(self.attributes.items())
+        )
+        lines = ["{}: {}".format(self.name, attributes)]
+        for span in self.spans:
+            lines.append(
+                "    {:<20} {:>9.3f}s{}".format(
+                    span.name,
+                    span.duration or 0,
+                    " (failed: {})".format(span.error) if span.error else "",
+                )
+            )
+        lines.append("    {:<20} {:>9.3f}s".format("total", self.total_duration))
+        return "\n".join(lines)
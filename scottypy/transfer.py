@@ -0,0 +1,229 @@
+import http.client
+import threading
+import time
+import typing
+
+from .types import Buffer
+
+if typing.TYPE_CHECKING:
+    import requests
+
+MIN_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 4 * 1024**2
+# The most memory the buffers of all the streams running at once should take together
+MEMORY_BUDGET = 64 * 1024**2
+# How many seconds of data a chunk should hold at the measured throughput
+_TARGET_INTERVAL = 0.05
+# The weight of the newest measurement in the smoothed throughput
+_SMOOTHING = 0.3
+# The major versions of urllib3 whose responses can be read from their socket directly
+_FAST_PATH_URLLIB3_VERSIONS = ("1", "2")
+
+
+class ChunkSizer(object):
+    """Sizes the chunks of a stream by its throughput and by the number of streams running at
+    once.
+
+    A chunk holds about target_interval seconds of data at the measured throughput, so that a
+    fast stream is copied in few large chunks while a slow one doesn't wait to fill a large
+    buffer. The streams running at once share a memory budget, so thousands of parallel streams
+    use small chunks. Sizes are powers of two, so that buffers are rarely reallocated.
+
+    Use it as a context manager around a stream, to count the stream as running."""
+
+    _lock = threading.Lock()
+    _running = 0
+
+    def __init__(
+        self,
+        min_size: int = MIN_CHUNK_SIZE,
+        max_size: int = MAX_CHUNK_SIZE,
+        budget: int = MEMORY_BUDGET,
+        target_interval: float = _TARGET_INTERVAL,
+        clock: typing.Callable[[], float] = time.monotonic,
+    ):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.budget = budget
+        self.target_interval = target_interval
+        self.rate = None  # type: typing.Optional[float]
+        self._clock = clock
+        self._last = clock()
+
+    def __enter__(self) -> "ChunkSizer":
+        with ChunkSizer._lock:
+            ChunkSizer._running += 1
+        self._last = self._clock()
+        return self
+
+    def __exit__(self, *_: typing.Any) -> None:
+        with ChunkSizer._lock:
+            ChunkSizer._running -= 1
+
+    @classmethod
+    def running(cls) -> int:
+        """The number of streams running at once"""
+        with cls._lock:
+            return cls._running
+
+    @property
+    def size(self) -> int:
+        limit = min(self.max_size, self.budget // max(1, self.running()))
+        wanted = (
+            self.min_size
+            if self.rate is None
+            else int(self.rate * self.target_interval)
+        )
+        size = max(self.min_size, min(limit, wanted))
+        # Round down to a power of two
+        return 1 << (size.bit_length() - 1)
+
+    def record(self, amount: int) -> None:
+        """Record that amount bytes were copied since the previous record"""
+        now = self._clock()
+        elapsed = now - self._last
+        self._last = now
+        if elapsed <= 0:
+            return
+        rate = amount / elapsed
+        if self.rate is None:
+            self.rate = rate
+        else:
+            self.rate += _SMOOTHING * (rate - self.rate)
+
+
+def _readinto(read: typing.Callable[[memoryview], int], view: memoryview) -> int:
+    """Read into view, raising the exceptions requests would"""
+    try:
+        return int(read(view))
+    except Exception as e:
+        import requests
+        from urllib3 import exceptions
+
+        if isinstance(e, (exceptions.ProtocolError, http.client.HTTPException)):
+            raise requests.exceptions.ChunkedEncodingError(e)
+        if isinstance(e, exceptions.DecodeError):
+            raise requests.exceptions.ContentDecodingError(e)
+        if isinstance(e, exceptions.SSLError):
+            raise requests.exceptions.SSLError(e)
+        if isinstance(e, (exceptions.ReadTimeoutError, OSError)):
+            raise requests.exceptions.ConnectionError(e)
+        raise
+
+
+def _fast_path_supported(raw: typing.Any) -> bool:
+    """Whether raw is the response of a urllib3 version whose private attributes the fast path
+    of :func:`_reader` is known to work with"""
+    import urllib3
+
+    major = getattr(urllib3, "__version__", "").split(".")[0]
+    if major not in _FAST_PATH_URLLIB3_VERSIONS or not hasattr(raw, "release_conn"):
+        return False
+    # urllib3 2 keeps a buffer of its own, which has to be empty for the socket to be read
+    return major == "1" or hasattr(raw, "_decoded_buffer")
+
+
+def _reader(response: "requests.Response") -> typing.Callable[[memoryview], int]:
+    """Return a function reading the body of a streamed response into a buffer, returning the
+    number of bytes read and 0 at its end.
+
+    A body without a content encoding is read by http.client straight from the socket into
+    the buffer, skipping the buffering and decoding of urllib3. That relies on internals of
+    urllib3, so other bodies and unknown urllib3 versions are read through urllib3.
+
+    A body which ends before its Content-Length, compressed or not, raises
+    :class:`requests.exceptions.ChunkedEncodingError`."""
+    raw = response.raw
+    fp = getattr(raw, "_fp", None)
+    encoding = response.headers.get("Content-Encoding", "identity").lower()
+    if (
+        encoding == "identity"
+        and isinstance(fp, http.client.HTTPResponse)
+        and _fast_path_supported(raw)
+        and not getattr(raw, "_decoded_buffer", b"")
+    ):
+
+        def _readinto_body(view: memoryview) -> int:
+            read = fp.readinto(view)
+            if not read and len(view) and fp.length:
+                # http.client quietly ends a body which is cut short, where urllib3 raises
+                raise http.client.IncompleteRead(b"", fp.length)
+            return read
+
+        def _read(view: memoryview) -> int:
+            read = _readinto(_readinto_body, view)
+            if fp.isclosed():
+                # The body ended. Return the connection to the pool, as urllib3 does
+                raw.release_conn()
+            return read
+
+        return _read
+
+    raw.decode_content = True
+    length = response.headers.get("Content-Length", "")
+    expected = int(length) if length.isdigit() else None
+
+    def _readinto_decoded(view: memoryview) -> int:
+        read = int(raw.readinto(view))
+        # Not every urllib3 version enforces the Content-Length, which counts the bytes over the
+        # wire rather than the decoded ones
+        if not read and len(view) and expected is not None and raw.tell() < expected:
+            raise http.client.IncompleteRead(b"", expected - raw.tell())
+        return read
+
+    return lambda view: _readinto(_readinto_decoded, view)
+
+
+def readinto_response(
+    response: "requests.Response", buffer: Buffer, skip: int = 0
+) -> int:
+    """Read the body of a streamed response into buffer until it is full or the body ends,
+    after discarding its first skip bytes.
+
+    :return: The number of bytes read into buffer."""
+    read = _reader(response)
+    view = memoryview(buffer).cast("B")
+    while skip > 0:
+        # Discard into the buffer itself rather than into a new one
+        discarded = read(view[: min(skip, len(view))])
+        if not discarded:
+            return 0
+        skip -= discarded
+    filled = 0
+    while filled < len(view):
+        n = read(view[filled:])
+        if not n:
+            break
+        filled += n
+    return filled
+
+
+def copy_response(
+    response: "requests.Response",
+    write: typing.Callable[[memoryview], typing.Any],
+    sizer: typing.Optional[ChunkSizer] = None,
+) -> int:
+    """Read the body of a streamed response into a reused buffer, in chunks sized by a
+    :class:`ChunkSizer`, and pass every chunk to write.
+
+    The chunks are views of the buffer, which are only valid until write returns.
+
+    :return: The number of bytes copied."""
+    read = _reader(response)
+    if sizer is None:
+        sizer = ChunkSizer()
+    buffer = memoryview(bytearray(0))
+    copied = 0
+    with sizer:
+        while True:
+            size = sizer.size
+            if len(buffer) < size:
+                buffer.release()
+                buffer = memoryview(bytearray(size))
+            count = read(buffer[:size])
+            if not count:
+                break
+            write(buffer[:count])
+            sizer.record(count)
+            copied += count
+    return copied
@@ -1,3 +1,4 @@
 import typing
 
 JSON = typing.Dict[str, typing.Any]
+Buffer = typing.Union[bytes, bytearray, memoryview]
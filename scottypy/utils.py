@@ -1,9 +1,21 @@
+import collections
 import os
+import threading
+import time
+import typing
+from concurrent.futures import ThreadPoolExecutor
 
-import requests
+if typing.TYPE_CHECKING:
+    from concurrent.futures import Future
 
+    import requests
 
-def raise_for_status(response: requests.Response) -> None:
+T = typing.TypeVar("T")
+K = typing.TypeVar("K")
+V = typing.TypeVar("V")
+
+
+def raise_for_status(response: "requests.Response") -> None:
     if 400 <= response.status_code < 500:
         error_type = "Client"
     elif 500 <= response.status_code < 600:
@@ -11,6 +23,8 @@ def raise_for_status(response: requests.Response) -> None:
     else:
         error_type = ""
     if error_type:
+        import requests
+
         try:
             content = response.content.decode()
         except UnicodeDecodeError:
@@ -27,3 +41,91 @@ def raise_for_status(response: requests.Response) -> None:
 
 def fix_path_sep_for_current_platform(file_name: str) -> str:
     return file_name.replace("\\", os.path.sep).replace("/", os.path.sep)
+
+
+def run_concurrently(
+    function: typing.Callable[[T], None],
+    items: typing.Iterable[T],
+    max_workers: int,
+    stop: typing.Optional[typing.Callable[[], bool]] = None,
+) -> typing.List[typing.Tuple[T, Exception]]:
+    """Call function on every item, with at most max_workers calls running at once.
+    Every call runs even if others fail.
+
+    Items are pulled lazily, at most twice max_workers ahead of the calls which are done, so
+    that a generator of items isn't drained up front.
+
+    :param stop: Checked before pulling every item. Once it returns True, no more items are
+      pulled, and the calls which were already started are waited for.
+    :return: the items whose call failed, along with their exception."""
+    failures = []  # type: typing.List[typing.Tuple[T, Exception]]
+    window = collections.deque()  # type: typing.Deque[typing.Tuple[T, Future[None]]]
+
+    def _collect() -> None:
+        item, future = window.popleft()
+        error = future.exception()
+        if isinstance(error, Exception):
+            failures.append((item, error))
+        elif error is not None:
+            raise error
+
+    iterator = iter(items)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while stop is None or not stop():
+            if len(window) >= 2 * max_workers:
+                _collect()
+                continue
+            try:
+                item = next(iterator)
+            except StopIteration:
+                break
+            window.append((item, executor.submit(function, item)))
+        while window:
+            _collect()
+    return failures
+
+
+class RateLimiter(object):
+    """Spaces calls to :func:`wait` at least 1 / rate seconds apart, across threads"""
+
+    def __init__(self, rate: float):
+        self._interval = 1.0 / rate
+        self._lock = threading.Lock()
+        self._next = time.monotonic()
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            wait_until = max(now, self._next)
+            self._next = wait_until + self._interval
+        if wait_until > now:
+            time.sleep(wait_until - now)
+
+
+class TTLCache(typing.Generic[K, V]):
+    """A thread safe cache whose entries expire ttl seconds after they are set"""
+
+    def __init__(self, ttl: float, clock: typing.Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = {}  # type: typing.Dict[K, typing.Tuple[float, V]]
+
+    def get(self, key: K) -> typing.Optional[V]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if self._clock() >= expires:
+                del self._entries[key]
+                return None
+            return value
+
+    def set(self, key: K, value: V) -> None:
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl, value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
@@ -28,8 +28,9 @@ setup(name="scottypy",
       author_email="roey.ghost@gmail.com",
       url="https://github.com/getslash/scottypy",
       version=__version__,  # pylint: disable=E0602
-      packages=find_packages(exclude=["unittests"]),
+      packages=find_packages(exclude=["unittests", "benchmarks"]),
       install_requires=install_requires,
+      extras_require={"fastjson": ["orjson"]},
       entry_points=dict(
           console_scripts=[
               "scotty  = scottypy.app:main",
@@ -0,0 +1,277 @@
+# pylint: disable=redefined-outer-name,unused-variable
+import contextlib
+import datetime
+import hashlib
+import os
+import urllib.parse
+
+import flask
+import pytest
+from flask import Flask, jsonify, request, send_file
+from flask_loopback import FlaskLoopback
+
+from scottypy import Scotty
+
+
+class APICallLogger:
+    def __init__(self):
+        self.calls = []
+
+    def log_call(self, request):
+        try:
+            json = request.json
+        except Exception:
+            json = None
+        self.calls.append(dict(url=request.url, params=dict(request.values), json=json))
+
+    @contextlib.contextmanager
+    def isolate(self):
+        old_calls = self.calls
+        self.calls = []
+        yield
+        self.calls = old_calls
+
+    def get_single_call_or_raise(self):
+        assert len(self.calls) == 1, "Expected one call, got {calls}".format(
+            calls=self.calls
+        )
+        return self.calls[0]
+
+    def _assert_urls_equal(self, actual_url, expected_url):
+        actual_url_parsed = urllib.parse.urlparse(actual_url)
+        expected_url_parsed = urllib.parse.urlparse(expected_url)
+        assert actual_url_parsed.scheme == expected_url_parsed.scheme
+        assert actual_url_parsed.netloc == expected_url_parsed.netloc
+        assert actual_url_parsed.path == expected_url_parsed.path
+        assert urllib.parse.parse_qs(actual_url_parsed.query) == urllib.parse.parse_qs(
+            expected_url_parsed.query
+        )
+        assert actual_url_parsed.fragment == expected_url_parsed.fragment
+
+    def assert_urls_equal_to(self, expected_urls):
+        assert len(expected_urls) == len(
+            self.calls
+        ), "Expected {} calls, got {} instead".format(
+            len(expected_urls), len(self.calls)
+        )
+        for call, expected_url in zip(self.calls, expected_urls):
+            actual_url = call["url"]
+            self._assert_urls_equal(actual_url, expected_url)
+
+
+@pytest.fixture
+def api_call_logger():
+    return APICallLogger()
+
+
+@pytest.fixture
+def server_features():
+    """Optional server features, which tests can turn on"""
+    return {
+        "batch_tags": False,
+        "ranges": True,
+        "beams_completed": False,
+        "issues_broken": False,
+    }
+
+
+@pytest.fixture
+def scotty(api_call_logger, server_features):
+    app = Flask(__name__)
+    url = "http://mock-scotty"
+
+    @app.route("/combadge")
+    def combadge_file():
+        api_call_logger.log_call(flask.request)
+        combadge_version = flask.request.values.get("combadge_version")
+        fixtures_folder = os.path.join(os.path.dirname(__file__), "fixtures")
+        if combadge_version == "v1":
+            file_name = "combadge.py"
+        elif combadge_version == "v2":
+            file_name = "combadge"
+        else:
+            raise ValueError(
+                "Unknown combadge version {combadge_version}".format(
+                    combadge_version=combadge_version
+                )
+            )
+        return send_file(os.path.join(fixtures_folder, file_name))
+
+    @app.route("/beams", methods=["POST"])
+    def beams():
+        api_call_logger.log_call(flask.request)
+        json = flask.request.json
+        date = datetime.datetime(year=2020, month=2, day=27).isoformat() + "Z"
+        return jsonify(
+            {
+                "beam": {
+                    "id": 666,
+                    "start": date,
+                    "size": 0,
+                    "host": json["beam"].get("host"),
+                    "comment": json["beam"].get("comment"),
+                    "directory": json["beam"].get("directory"),
+                    "initiator": json["beam"].get("user"),
+                    "error": None,
+                    "combadge_contacted": False,
+                    "pending_deletion": False,
+                    "completed": False,
+                    "deleted": False,
+                    "pins": [],
+                    "tags": [],
+                    "associated_issues": [],
+                    "purge_time": 0,
+                }
+            }
+        )
+
+    beam_count = 2
+    all_beams = [
+        {
+            "id": i,
+            "start": datetime.datetime(year=2020 + i, month=2, day=27).isoformat()
+            + "Z",
+            "size": 1000 * i,
+            "host": "host{}".format(i),
+            "comment": "comment{}".format(i),
+            "directory": "directory{}".format(i),
+            "initiator": "user{}".format(i),
+            "error": None,
+            "combadge_contacted": False,
+            "pending_deletion": False,
+            "completed": False,
+            "deleted": False,
+            "pins": [],
+            "tags": [],
+            "associated_issues": [],
+            "purge_time": 0,
+        }
+        for i in range(beam_count)
+    ]
+
+    @app.route("/beams")
+    def beams_index():
+        api_call_logger.log_call(request)
+        page = int(request.values.get("page", 1))
+        return jsonify(
+            {
+                "beams": all_beams[page - 1 : page],
+                "meta": {
+                    "total_pages": beam_count,
+                },
+            }
+        )
+
+    @app.route("/beams/<int:beam>/tags/<tag>", methods=["POST", "DELETE"])
+    def beam_tag(beam, tag):
+        api_call_logger.log_call(request)
+        if beam >= 100:
+            return "No such beam", 404
+        return ""
+
+    @app.route("/beams/tags", methods=["POST", "DELETE"])
+    def beam_tags():
+        api_call_logger.log_call(request)
+        if not server_features["batch_tags"]:
+            return "Not found", 404
+        return ""
+
+    @app.route("/beams/<int:beam>", methods=["DELETE"])
+    def delete_beam(beam):
+        api_call_logger.log_call(request)
+        return ""
+
+    @app.route("/beams/<int:beam>")
+    def single_beam(beam):
+        return jsonify(
+            {
+                "beam": dict(
+                    all_beams[beam], completed=server_features["beams_completed"]
+                ),
+            }
+        )
+
+    def file_content(file_id):
+        return "content of file {}\n".format(file_id).encode() * 100
+
+    @app.route("/files")
+    def files_index():
+        api_call_logger.log_call(request)
+        beam_id = int(request.values["beam_id"])
+        files = []
+        for i in range(2):
+            file_id = beam_id * 10 + i
+            # The files of beam 1 are corrupt
+            checksum_of = file_id if beam_id != 1 else file_id + 1
+            files.append(
+                {
+                    "id": file_id,
+                    "file_name": "beam{}/file{}.log".format(beam_id, i),
+                    "status": "uploaded",
+                    "storage_name": "storage{}".format(i),
+                    "size": 100 * i,
+                    "url": "http://mock-scotty/file_contents/{}".format(file_id),
+                    "mtime": None,
+                    "checksum": "sha256:"
+                    + hashlib.sha256(file_content(checksum_of)).hexdigest(),
+                }
+            )
+        return jsonify({"files": files})
+
+    @app.route("/file_contents/<int:file_id>")
+    def file_contents(file_id):
+        api_call_logger.log_call(request)
+        content = file_content(file_id)
+        if not server_features["ranges"] or request.range is None:
+            return content
+        byte_range = request.range.range_for_length(len(content))
+        if byte_range is None:
+            return "", 416, {"Content-Range": "bytes */{}".format(len(content))}
+        start, stop = byte_range
+        return (
+            content[start:stop],
+            206,
+            {"Content-Range": request.range.to_content_range_header(len(content))},
+        )
+
+    issues = {}
+
+    @app.route("/trackers/by_name/<name>")
+    def tracker_by_name(name):
+        api_call_logger.log_call(request)
+        return jsonify({"tracker": {"id": 1, "name": name}})
+
+    @app.route("/issues/get_by_tracker")
+    def issue_by_tracker():
+        api_call_logger.log_call(request)
+        key = (int(request.values["tracker_id"]), request.values["id_in_tracker"])
+        if server_features["issues_broken"]:
+            return "Internal error", 500
+        if key not in issues:
+            return "No such issue", 404
+        return jsonify({"issue": {"id": issues[key]}})
+
+    @app.route("/issues", methods=["POST"])
+    def create_issue():
+        api_call_logger.log_call(request)
+        issue = request.json["issue"]
+        issue_id = len(issues) + 1
+        issues[(issue["tracker_id"], issue["id_in_tracker"])] = issue_id
+        return jsonify({"issue": {"id": issue_id}})
+
+    @app.route("/beams/<int:beam>/issues/<int:issue>", methods=["POST", "DELETE"])
+    def beam_issue(beam, issue):
+        api_call_logger.log_call(request)
+        return ""
+
+    @app.route("/info")
+    def info():
+        return jsonify(
+            {
+                "transporter": "mock-transporter",
+                "version": "0.0.0",
+            }
+        )
+
+    with FlaskLoopback(app).on(("mock-scotty", 80)):
+        yield Scotty(url)
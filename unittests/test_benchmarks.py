@@ -0,0 +1,19 @@
+from benchmarks import run
+from benchmarks.server import SyntheticData
+
+
+def test_benchmark_suite_runs():
+    data = SyntheticData(beams=3, files=4, file_size=1000)
+    suite = run.run_suite(data, sorted(run.CASES), repeat=2)
+    assert set(suite["results"]) == set(run.CASES)
+    for result in suite["results"].values():
+        assert result["p50"] <= result["p90"] <= result["p99"]
+        assert result["throughput"] > 0
+
+
+def test_compare_reports_regressions():
+    baseline = {"results": {"get_files": {"p50": 0.010}, "download": {"p50": 0.010}}}
+    current = {"results": {"get_files": {"p50": 0.011}, "download": {"p50": 0.020}}}
+    regressions = run.compare(baseline, current, tolerance=0.2)
+    assert len(regressions) == 1
+    assert regressions[0].startswith("download:")
@@ -0,0 +1,50 @@
+import hashlib
+
+import pytest
+
+from scottypy import checksum
+
+
+@pytest.mark.parametrize(
+    "value,expected",
+    [
+        ("sha256:ABCD", ("sha256", "abcd")),
+        ("md5:abcd", ("md5", "abcd")),
+        ("a" * 32, ("md5", "a" * 32)),
+        ("a" * 64, ("sha256", "a" * 64)),
+    ],
+)
+def test_parse_checksum(value, expected):
+    assert checksum.parse_checksum(value) == expected
+
+
+def test_parse_checksum_unknown_length():
+    with pytest.raises(ValueError):
+        checksum.parse_checksum("abc")
+
+
+def test_unknown_algorithm():
+    with pytest.raises(ValueError, match="Available algorithms"):
+        checksum.new("crc99")
+
+
+def test_register_algorithm():
+    checksum.register_algorithm("sha3_256", hashlib.sha3_256)
+    assert "sha3_256" in checksum.available_algorithms()
+    hasher = checksum.new("sha3_256")
+    hasher.update(b"data")
+    assert hasher.hexdigest() == hashlib.sha3_256(b"data").hexdigest()
+
+
+@pytest.mark.parametrize(
+    "value,expected",
+    [
+        (None, None),
+        ("", None),
+        ("MD5:ABCD", ("md5", "abcd")),
+        ("crc32c:ab", None),
+        ("abc", None),
+    ],
+)
+def test_parse_server_checksum(value, expected):
+    assert checksum.parse_server_checksum(value) == expected
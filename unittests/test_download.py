@@ -0,0 +1,220 @@
+import hashlib
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from click.testing import CliRunner
+
+from scottypy.app import main
+from scottypy.exc import ChecksumMismatch
+from scottypy.file import File
+from scottypy.manifest import MANIFEST_NAME
+from scottypy.progress import Progress
+from scottypy.progress_bar import DownloadProgress
+
+
+def test_download_verifies_checksum(scotty, tmpdir):
+    file_ = scotty.get_files(0)[0]
+    digest = file_.download(str(tmpdir), algorithm="md5")
+    with open(file_.get_local_path(str(tmpdir)), "rb") as f:
+        assert hashlib.md5(f.read()).hexdigest() == digest
+
+
+def test_download_checksum_mismatch(scotty, tmpdir):
+    file_ = scotty.get_files(1)[0]
+    with pytest.raises(ChecksumMismatch):
+        file_.download(str(tmpdir))
+    assert not os.path.exists(file_.get_local_path(str(tmpdir)))
+
+
+@pytest.mark.parametrize("server_checksum", ["crc32c:deadbeef", "abc123"])
+def test_download_ignores_unusable_checksum(scotty, tmpdir, caplog, server_checksum):
+    file_ = scotty.get_files(1)[0]
+    file_.checksum = server_checksum
+    with caplog.at_level(logging.WARNING, logger="scotty.checksum"):
+        digest = file_.download(str(tmpdir), algorithm="md5")
+    assert "Ignoring the server checksum" in caplog.text
+    with open(file_.get_local_path(str(tmpdir)), "rb") as f:
+        assert hashlib.md5(f.read()).hexdigest() == digest
+
+
+def test_down_sync(scotty, tmpdir, api_call_logger):
+    dest = str(tmpdir / "beam")
+    args = ["down", "0", "--url", scotty.url, "--dest", dest]
+    result = CliRunner().invoke(main, args)
+    assert result.exit_code == 0, result.output
+    assert os.path.exists(os.path.join(dest, MANIFEST_NAME))
+
+    with api_call_logger.isolate():
+        result = CliRunner().invoke(main, args + ["--sync"])
+        assert result.exit_code == 0, result.output
+        assert "beam0/file0.log is up to date" in result.output
+        api_call_logger.assert_urls_equal_to(["http://mock-scotty/files?beam_id=0"])
+
+    with open(os.path.join(dest, "beam0", "file1.log"), "a") as f:
+        f.write("local change")
+    with api_call_logger.isolate():
+        result = CliRunner().invoke(main, args + ["--sync"])
+        assert result.exit_code == 0, result.output
+        api_call_logger.assert_urls_equal_to(
+            [
+                "http://mock-scotty/files?beam_id=0",
+                "http://mock-scotty/file_contents/1",
+            ]
+        )
+
+
+def test_down_checksum_mismatch_fails(scotty, tmpdir):
+    result = CliRunner().invoke(
+        main, ["down", "1", "--url", scotty.url, "--dest", str(tmpdir)]
+    )
+    assert result.exit_code != 0
+    assert "2 files failed checksum verification" in result.output
+
+
+@pytest.mark.parametrize("ranges", [True, False])
+def test_download_range(scotty, server_features, tmpdir, ranges):
+    server_features["ranges"] = ranges
+    file_ = scotty.get_files(0)[1]
+    content = "content of file 1\n".encode() * 100
+    path = str(tmpdir / "file")
+    with open(path, "wb") as f:
+        fd = f.fileno()
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            written = list(
+                executor.map(
+                    lambda r: file_.download_range(fd, *r),
+                    [(1500, 3000), (700, 1500), (0, 700)],
+                )
+            )
+        assert written == [300, 800, 700]
+        assert f.tell() == 0
+        assert file_.download_range(fd, 3000, 4000) == 0
+    with open(path, "rb") as f:
+        assert f.read() == content
+
+
+@pytest.mark.parametrize("segments", [1, 4])
+def test_download_size_follows_content(scotty, tmpdir, segments):
+    file_ = scotty.get_files(0)[1]
+    file_.size = 1024**2
+    file_.download(str(tmpdir), segments=segments, segment_threshold=0)
+    assert os.path.getsize(file_.get_local_path(str(tmpdir))) == 1800
+
+
+@pytest.mark.parametrize("ranges", [True, False])
+def test_download_segmented(scotty, server_features, api_call_logger, tmpdir, ranges):
+    server_features["ranges"] = ranges
+    file_ = scotty.get_files(0)[1]
+    with api_call_logger.isolate():
+        digest = file_.download(
+            str(tmpdir), algorithm="md5", segments=4, segment_threshold=0
+        )
+        assert len(api_call_logger.calls) == (5 if ranges else 2)
+    with open(file_.get_local_path(str(tmpdir)), "rb") as f:
+        content = f.read()
+    assert content == "content of file 1\n".encode() * 100
+    assert digest == hashlib.md5(content).hexdigest()
+
+
+def test_download_segmented_checksum_mismatch(scotty, tmpdir):
+    file_ = scotty.get_files(1)[0]
+    with pytest.raises(ChecksumMismatch):
+        file_.download(str(tmpdir), segments=3, segment_threshold=0)
+    assert not os.path.exists(file_.get_local_path(str(tmpdir)))
+
+
+@pytest.mark.parametrize("segments", [1, 4])
+def test_download_progress(scotty, tmpdir, segments):
+    file_ = scotty.get_files(0)[1]
+    progress = []
+    file_.download(
+        str(tmpdir),
+        segments=segments,
+        segment_threshold=0,
+        progress_callback=progress.append,
+    )
+    assert progress[0].transferred == 0
+    assert progress[0].files == 0
+    assert progress[-1].transferred == len("content of file 1\n" * 100)
+    assert progress[-1].total == file_.size
+    assert progress[-1].files == progress[-1].total_files == 1
+
+
+def test_stream_to_progress(scotty):
+    progress = []
+    scotty.get_files(0)[1].stream_to(io.BytesIO(), progress_callback=progress.append)
+    assert progress[-1].transferred == len("content of file 1\n" * 100)
+    assert progress[-1].files == 1
+
+
+def test_down_prints_file_rates(scotty, tmpdir):
+    result = CliRunner().invoke(
+        main, ["down", "0", "--url", scotty.url, "--dest", str(tmpdir)]
+    )
+    assert result.exit_code == 0, result.output
+    assert "Downloaded beam0/file1.log (1.8 KB at " in result.output
+    # No bar is drawn when the output isn't a terminal
+    assert "\r" not in result.output
+
+
+def test_download_progress_bar(scotty, capsys):
+    file_ = scotty.get_files(0)[1]
+    progress = DownloadProgress(interactive=True, interval=0)
+    progress.start(file_.size * 2, 2)
+    callback = progress.file_callback(file_)
+    callback(Progress(50, file_.size, 1, 50, files=0, total_files=1))
+    progress.file_done(file_)
+    progress.close()
+    out = capsys.readouterr().out
+    assert (
+        "[#######-----------------------] Downloaded 50 byte of 200 byte (25%)" in out
+    )
+    assert "0/2 files" in out
+    assert "| beam0/file1.log 50 byte/s" in out
+    assert "Downloaded 100 byte of 200 byte (50%)" in out
+    assert out.endswith("\r")
+
+
+def test_failed_download_keeps_existing_file(scotty, tmpdir):
+    file_ = scotty.get_files(1)[0]
+    path = file_.get_local_path(str(tmpdir))
+    os.makedirs(os.path.dirname(path))
+    with open(path, "w") as f:
+        f.write("previous")
+    with pytest.raises(ChecksumMismatch):
+        file_.download(str(tmpdir), overwrite=True)
+    with open(path) as f:
+        assert f.read() == "previous"
+    assert os.listdir(os.path.dirname(path)) == [os.path.basename(path)]
+
+
+def test_down_resumes(scotty, tmpdir, api_call_logger, monkeypatch):
+    dest = str(tmpdir / "beam")
+    args = ["down", "0", "--url", scotty.url, "--dest", dest]
+    download = File.download
+
+    def _fail_second(self, *args, **kwargs):
+        if self.id == 1:
+            raise KeyboardInterrupt()
+        return download(self, *args, **kwargs)
+
+    monkeypatch.setattr(File, "download", _fail_second)
+    result = CliRunner().invoke(main, args)
+    assert result.exit_code != 0
+    assert not os.path.exists(os.path.join(dest, "beam0", "file1.log"))
+    assert not os.path.exists(os.path.join(dest, "beam.txt"))
+
+    monkeypatch.setattr(File, "download", download)
+    with api_call_logger.isolate():
+        result = CliRunner().invoke(main, args)
+        assert result.exit_code == 0, result.output
+        assert "beam0/file0.log is up to date" in result.output
+        api_call_logger.assert_urls_equal_to(
+            [
+                "http://mock-scotty/files?beam_id=0",
+                "http://mock-scotty/file_contents/1",
+            ]
+        )
@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from scottypy.filters import FileFilter, parse_size, parse_time
+
+
+def _node(file_name, size=100, mtime="2020-02-27T12:00:00Z"):
+    return {"file_name": file_name, "size": size, "mtime": mtime}
+
+
+@pytest.mark.parametrize(
+    "value,expected",
+    [
+        ("512", 512),
+        ("1k", 1024),
+        ("1M", 1024**2),
+        ("1MiB", 1024**2),
+        ("1MB", 1000**2),
+        ("1.5G", int(1.5 * 1024**3)),
+    ],
+)
+def test_parse_size(value, expected):
+    assert parse_size(value) == expected
+
+
+@pytest.mark.parametrize("value", ["", "M", "1X", "-1"])
+def test_parse_size_invalid(value):
+    with pytest.raises(ValueError):
+        parse_size(value)
+
+
+def test_parse_time_age():
+    now = datetime(2020, 2, 27, 12, tzinfo=timezone.utc)
+    assert parse_time("2h", now=now) == now - timedelta(hours=2)
+    assert parse_time("7d", now=now) == now - timedelta(days=7)
+
+
+def test_parse_time_date():
+    assert parse_time("2020-02-27") == datetime(2020, 2, 27, tzinfo=timezone.utc)
+
+
+def test_empty_filter():
+    file_filter = FileFilter()
+    assert file_filter.server_filter() is None
+    assert file_filter.compile() is None
+
+
+@pytest.mark.parametrize(
+    "globs,server_filter",
+    [
+        (["*.log"], ".log"),
+        (["debug_[0-9].log.*"], "debug_"),
+        (["*.log", "*.txt"], None),
+    ],
+)
+def test_glob_server_filter(globs, server_filter):
+    assert FileFilter(globs=globs).server_filter() == server_filter
+
+
+def test_substring_is_sent_to_server():
+    assert FileFilter(substring="debug", globs=["*.log"]).server_filter() == "debug"
+
+
+def test_globs():
+    predicate = FileFilter(globs=["*.log", "*.txt"]).compile()
+    assert predicate(_node("a/debug.log"))
+    assert predicate(_node("notes.txt"))
+    assert not predicate(_node("core.dump"))
+
+
+def test_regex_and_size():
+    predicate = FileFilter(regex=r"debug_\d+", min_size=10, max_size=1000).compile()
+    assert predicate(_node("debug_1.log"))
+    assert not predicate(_node("debug_1.log", size=1001))
+    assert not predicate(_node("debug_1.log", size=9))
+    assert not predicate(_node("debug.log"))
+
+
+def test_mtime_window():
+    predicate = FileFilter(
+        since=datetime(2020, 2, 27, tzinfo=timezone.utc), until=datetime(2020, 2, 28)
+    ).compile()
+    assert predicate(_node("a.log"))
+    assert not predicate(_node("a.log", mtime="2020-02-26T12:00:00Z"))
+    assert not predicate(_node("a.log", mtime="2020-02-28T12:00:00+00:00"))
+    assert not predicate(_node("a.log", mtime=None))
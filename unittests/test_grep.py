@@ -0,0 +1,114 @@
+import gzip
+import re
+
+import pytest
+from click.testing import CliRunner
+
+from scottypy.app import main
+from scottypy.grep import StopSearching, StreamMatcher, search_files
+
+_CONTENT = b"".join(
+    b"line %d %s\n" % (i, b"Traceback" if i % 7 == 0 else b"ok") for i in range(1, 200)
+)
+_EXPECTED = [(i, b"line %d Traceback" % i) for i in range(7, 200, 7)]
+
+
+def _search(data, chunk_size, pattern=b"Traceback", **kwargs):
+    found = []
+    matcher = StreamMatcher(
+        re.compile(pattern, re.MULTILINE),
+        lambda number, line: found.append((number, line)),
+        **kwargs
+    )
+    for i in range(0, len(data), chunk_size):
+        matcher.write(data[i : i + chunk_size])
+    matcher.close()
+    return found
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 17, 4096])
+def test_chunk_boundaries(chunk_size):
+    assert _search(_CONTENT, chunk_size) == _EXPECTED
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 4096])
+def test_gzip(chunk_size):
+    data = gzip.compress(_CONTENT[:1000]) + gzip.compress(_CONTENT[1000:])
+    assert _search(data, chunk_size) == _EXPECTED
+
+
+def test_last_line_without_newline():
+    assert _search(b"a\nb Traceback", 4) == [(2, b"b Traceback")]
+
+
+def test_crlf():
+    assert _search(b"Traceback\r\nok\r\n", 100) == [(1, b"Traceback")]
+
+
+def test_long_lines_are_cut():
+    data = b"x" * 100 + b" Traceback\nTraceback\n"
+    assert _search(data, 7, max_line=50) == [(2, b"Traceback")]
+    assert _search(data, 7, pattern=b"x{50}", max_line=50) == [(1, b"x" * 50)]
+
+
+def test_stop():
+    stop = [False]
+    matcher = StreamMatcher(
+        re.compile(b"a"), lambda number, line: None, lambda: stop[0]
+    )
+    matcher.write(b"a\n")
+    stop[0] = True
+    with pytest.raises(StopSearching):
+        matcher.write(b"a\n")
+
+
+class _FakeFile(object):
+    def __init__(self, file_name, streamed):
+        self.file_name = file_name
+        self._streamed = streamed
+
+    def stream_to(self, fileobj, views=False):
+        self._streamed.append(self.file_name)
+        fileobj.write(b"a match\n")
+
+
+def test_max_count_stops_fetching_files():
+    streamed = []
+    pulled = []
+
+    def _files():
+        for i in range(1000):
+            pulled.append(i)
+            yield _FakeFile("file{}".format(i), streamed)
+
+    found = []
+    failures = search_files(_files(), "match", found.append, max_count=1, max_workers=2)
+    assert not failures
+    assert len(found) == 1
+    assert len(pulled) < 10
+    assert len(streamed) <= len(pulled)
+
+
+def test_grep(scotty, api_call_logger):
+    result = CliRunner().invoke(
+        main, ["grep", "file 1$", "0", "--url", scotty.url, "--glob", "*.log"]
+    )
+    assert result.exit_code == 0, result.output
+    lines = result.output.splitlines()
+    assert len(lines) == 100
+    assert lines[0] == "0/beam0/file1.log:1:content of file 1"
+    assert lines[-1] == "0/beam0/file1.log:100:content of file 1"
+
+
+def test_grep_max_count(scotty):
+    result = CliRunner().invoke(
+        main, ["grep", "-m", "3", "-i", "FILE", "0", "--url", scotty.url]
+    )
+    assert result.exit_code == 0, result.output
+    assert len(result.output.splitlines()) == 3
+
+
+def test_grep_no_match(scotty):
+    result = CliRunner().invoke(main, ["grep", "nothing", "0", "--url", scotty.url])
+    assert result.exit_code == 1
+    assert result.output == ""
@@ -0,0 +1,81 @@
+import subprocess
+import sys
+
+import pytest
+
+# Modules which the command line tool should only import once a command actually needs them
+_LAZY_MODULES = [
+    "capacity",
+    "dateutil",
+    "emport",
+    "pact",
+    "requests",
+    "subprocess",
+    "urllib3",
+    "webbrowser",
+]
+# How many modules the command line tool may import on top of those of click. Counted rather
+# than timed, as import times vary too much between machines
+_MODULE_BUDGET = 50
+
+pytestmark = pytest.mark.skipif(
+    sys.version_info < (3, 7), reason="-X importtime requires python 3.7"
+)
+
+
+def _run_python(*args):
+    return subprocess.run(
+        [sys.executable] + list(args),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+
+
+def _import_times(module):
+    """Return a dictionary of module name to cumulative import time in microseconds"""
+    stderr = _run_python("-X", "importtime", "-c", "import " + module).stderr
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+@pytest.mark.parametrize("module", ["scottypy", "scottypy.app"])
+def test_import_is_lazy(module):
+    imported = _import_times(module)
+    assert not [m for m in _LAZY_MODULES if m in imported]
+
+
+def test_import_module_budget():
+    imported = set(_import_times("scottypy.app")) - set(_import_times("click"))
+    assert len(imported) <= _MODULE_BUDGET, sorted(imported)
+
+
+def test_help_is_lazy():
+    stdout = _run_python(
+        "-c",
+        "import sys\n"
+        "from scottypy.app import main\n"
+        "try:\n"
+        "    main(['tag', '--help'])\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        "print(' '.join(sys.modules))\n",
+    ).stdout
+    modules = stdout.splitlines()[-1].split()
+    assert not [m for m in _LAZY_MODULES if m in modules]
+
+
+def test_public_names_are_still_available():
+    stdout = _run_python(
+        "-c",
+        "import scottypy\n"
+        "print(scottypy.Scotty.__module__, scottypy.File.__module__)\n",
+    ).stdout
+    assert stdout.split() == ["scottypy.scotty", "scottypy.file"]
@@ -0,0 +1,71 @@
+# pylint: disable=redefined-outer-name
+import os
+
+import pytest
+
+from scottypy.incremental import IncrementalState
+from scottypy.scan import scan_directory
+
+
+@pytest.fixture
+def directory(tmpdir):
+    for name in ("a.log", "b.log"):
+        with (tmpdir / name).open("w") as f:
+            f.write(name)
+    return str(tmpdir)
+
+
+@pytest.fixture
+def state_path(tmpdir_factory):
+    return str(tmpdir_factory.mktemp("state") / "state.json")
+
+
+def _changed_paths(directory, state_path, algorithm=None):
+    state = IncrementalState.load(directory, state_path)
+    return [
+        entry.path
+        for entry in state.changes(scan_directory(directory), algorithm).entries
+    ]
+
+
+def _beam(directory, state_path, beam_id, algorithm=None):
+    state = IncrementalState.load(directory, state_path)
+    state.update(scan_directory(directory), beam_id, algorithm)
+    state.save()
+
+
+def test_first_beam_has_everything(directory, state_path):
+    assert IncrementalState.load(directory, state_path).beam_id is None
+    assert _changed_paths(directory, state_path) == ["a.log", "b.log"]
+
+
+def test_only_changes(directory, state_path):
+    _beam(directory, state_path, 1)
+    assert IncrementalState.load(directory, state_path).beam_id == 1
+    assert _changed_paths(directory, state_path) == []
+
+    with open(os.path.join(directory, "b.log"), "a") as f:
+        f.write("more")
+    with open(os.path.join(directory, "c.log"), "w") as f:
+        f.write("new")
+    assert _changed_paths(directory, state_path) == ["b.log", "c.log"]
+
+
+def test_touched_file_with_checksum(directory, state_path):
+    _beam(directory, state_path, 1, algorithm="sha256")
+    path = os.path.join(directory, "a.log")
+    st = os.stat(path)
+    os.utime(path, (st.st_atime, st.st_mtime + 10))
+    assert _changed_paths(directory, state_path) == ["a.log"]
+    assert _changed_paths(directory, state_path, algorithm="sha256") == []
+
+    with open(path, "w") as f:
+        f.write("A.log")
+    os.utime(path, (st.st_atime, st.st_mtime + 20))
+    assert _changed_paths(directory, state_path, algorithm="sha256") == ["a.log"]
+
+
+def test_corrupt_state(directory, state_path):
+    with open(state_path, "w") as f:
+        f.write("{")
+    assert _changed_paths(directory, state_path) == ["a.log", "b.log"]
@@ -0,0 +1,73 @@
+import pytest
+
+from benchmarks import json_decode
+from scottypy import jsonlib
+
+
+@pytest.fixture(autouse=True)
+def reset_backend(monkeypatch):
+    monkeypatch.setattr(jsonlib, "_backend", None)
+    monkeypatch.delenv("SCOTTY_JSON_BACKEND", raising=False)
+
+
+@pytest.mark.parametrize("name", jsonlib.available_backends())
+def test_round_trip(name):
+    backend = jsonlib.get_backend(name)
+    obj = {"files": [{"id": 1, "file_name": "dïr/a.log", "size": 2**40}], "x": None}
+    encoded = backend.dumps(obj)
+    assert isinstance(encoded, bytes)
+    assert backend.loads(encoded) == obj
+    assert backend.loads(encoded.decode("utf-8")) == obj
+
+
+def test_stdlib_is_always_available():
+    assert "json" in jsonlib.available_backends()
+
+
+def test_fastest_backend_is_preferred():
+    expected = [
+        name
+        for name in ("orjson", "ujson", "json")
+        if name in jsonlib.available_backends()
+    ][0]
+    assert jsonlib.get_backend().name == expected
+
+
+def test_environment_override(monkeypatch):
+    monkeypatch.setenv("SCOTTY_JSON_BACKEND", "json")
+    assert jsonlib.get_backend().name == "json"
+
+
+def test_set_backend():
+    jsonlib.set_backend("json")
+    assert jsonlib.get_backend().name == "json"
+    assert jsonlib.dumps_str({"a": 1}) == '{"a": 1}'
+
+
+def test_unknown_backend(monkeypatch):
+    with pytest.raises(ValueError):
+        jsonlib.get_backend("nosuchjson")
+    monkeypatch.setenv("SCOTTY_JSON_BACKEND", "nosuchjson")
+    with pytest.raises(ValueError):
+        jsonlib.get_backend()
+
+
+def test_backend_not_installed():
+    def _missing():
+        raise ImportError("missing")
+
+    jsonlib.register_backend("missing", _missing)
+    try:
+        assert "missing" not in jsonlib.available_backends()
+        with pytest.raises(ValueError):
+            jsonlib.set_backend("missing")
+    finally:
+        del jsonlib._FACTORIES["missing"]
+
+
+def test_decode_benchmark_payload():
+    payload = json_decode.file_listing(10)
+    for name in jsonlib.available_backends():
+        durations = json_decode.time_backend(jsonlib.get_backend(name), payload, 2)
+        assert len(durations) == 2
+    assert len(jsonlib.loads(payload)["files"]) == 10
@@ -0,0 +1,62 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from scottypy.manifest import JOURNAL_NAME, MANIFEST_NAME, BeamManifest
+
+
+def _file(file_id, file_name):
+    return SimpleNamespace(id=file_id, file_name=file_name, checksum=None)
+
+
+def _record(tmpdir, manifest, file_):
+    path = str(tmpdir / file_.file_name)
+    with open(path, "w") as f:
+        f.write(file_.file_name)
+    manifest.record(file_, path, "sha256", "digest")
+    return path
+
+
+def test_journal_survives_without_save(tmpdir):
+    directory = str(tmpdir)
+    file_ = _file(1, "a.log")
+    path = _record(tmpdir, BeamManifest(directory), file_)
+    assert os.path.exists(os.path.join(directory, JOURNAL_NAME))
+    assert not os.path.exists(os.path.join(directory, MANIFEST_NAME))
+    assert BeamManifest.load(directory).is_synced(file_, path)
+
+
+def test_save_folds_journal(tmpdir):
+    directory = str(tmpdir)
+    manifest = BeamManifest(directory)
+    first, second = _file(1, "a.log"), _file(2, "b.log")
+    _record(tmpdir, manifest, first)
+    manifest.save()
+    path = _record(tmpdir, manifest, second)
+    manifest.save()
+    assert not os.path.exists(os.path.join(directory, JOURNAL_NAME))
+    loaded = BeamManifest.load(directory)
+    assert sorted(loaded.entries) == ["a.log", "b.log"]
+    assert loaded.is_synced(second, path)
+
+
+def test_truncated_journal_line_is_ignored(tmpdir):
+    directory = str(tmpdir)
+    file_ = _file(1, "a.log")
+    path = _record(tmpdir, BeamManifest(directory), file_)
+    with open(os.path.join(directory, JOURNAL_NAME), "a") as f:
+        f.write('{"file_name": "b.lo')
+    loaded = BeamManifest.load(directory)
+    assert list(loaded.entries) == ["a.log"]
+    assert loaded.is_synced(file_, path)
+
+
+@pytest.mark.parametrize("server_checksum", ["crc32c:deadbeef", "abc123"])
+def test_unusable_server_checksum_is_ignored(tmpdir, server_checksum):
+    file_ = _file(1, "a.log")
+    file_.checksum = server_checksum
+    manifest = BeamManifest(str(tmpdir))
+    path = _record(tmpdir, manifest, file_)
+    assert manifest.is_synced(file_, path)
+    assert not manifest.is_synced(_file(2, "a.log"), path)
@@ -0,0 +1,77 @@
+# pylint: disable=redefined-outer-name
+import pytest
+
+from scottypy import metrics
+
+
+@pytest.fixture
+def registry():
+    return metrics.Registry()
+
+
+def test_counter_render(registry):
+    counter = registry.counter("requests_total", "Requests", ["endpoint"])
+    counter.inc(endpoint="/beams")
+    counter.inc(2, endpoint='/odd"name')
+    assert registry.render() == (
+        "# HELP requests_total Requests\n"
+        "# TYPE requests_total counter\n"
+        'requests_total{endpoint="/beams"} 1\n'
+        'requests_total{endpoint="/odd\\"name"} 2\n'
+    )
+
+
+def test_histogram_render(registry):
+    histogram = registry.histogram("run_seconds", "Runtime", buckets=(1, 10))
+    histogram.observe(0.5)
+    histogram.observe(5)
+    assert registry.render() == (
+        "# HELP run_seconds Runtime\n"
+        "# TYPE run_seconds histogram\n"
+        'run_seconds_bucket{le="1"} 1\n'
+        'run_seconds_bucket{le="10"} 2\n'
+        'run_seconds_bucket{le="+Inf"} 2\n'
+        "run_seconds_sum 5.5\n"
+        "run_seconds_count 2\n"
+    )
+
+
+def test_gauge_render(registry):
+    gauge = registry.gauge("lag_seconds", "Lag", ["tag"])
+    gauge.set(5, tag="nightly")
+    gauge.set(2.5, tag="nightly")
+    assert gauge.get(tag="nightly") == 2.5
+    assert registry.render() == (
+        "# HELP lag_seconds Lag\n"
+        "# TYPE lag_seconds gauge\n"
+        'lag_seconds{tag="nightly"} 2.5\n'
+    )
+
+
+def test_wrong_labels(registry):
+    counter = registry.counter("requests_total", "Requests", ["endpoint"])
+    with pytest.raises(ValueError):
+        counter.inc(method="GET")
+
+
+@pytest.mark.parametrize(
+    "path,endpoint",
+    [
+        ("/beams", "/beams"),
+        ("/beams/12/tags/nightly", "/beams/:id/tags"),
+        ("/files/7", "/files/:id"),
+    ],
+)
+def test_endpoint_of(path, endpoint):
+    assert metrics.endpoint_of(path) == endpoint
+
+
+def test_textfile_exporter(registry, tmpdir):
+    path = str(tmpdir / "scotty.prom")
+    registry.counter("beams_total", "Beams").inc()
+    exporter = metrics.TextfileExporter(path, registry_=registry)
+    exporter.start()
+    exporter.stop()
+    with open(path) as f:
+        assert "beams_total 1" in f.read()
+    assert tmpdir.listdir() == [tmpdir / "scotty.prom"]
@@ -0,0 +1,56 @@
+import os
+
+from click.testing import CliRunner
+
+from scottypy import metrics
+from scottypy.app import main
+from scottypy.manifest import MANIFEST_NAME
+from scottypy.mirror import STATE_NAME, Mirror
+
+
+def test_mirror(scotty, api_call_logger, server_features, tmpdir, monkeypatch):
+    fetched = []
+    get_beam = scotty.get_beam
+    monkeypatch.setattr(
+        scotty, "get_beam", lambda beam_id: fetched.append(beam_id) or get_beam(beam_id)
+    )
+    dest = str(tmpdir / "mirror")
+    mirror = Mirror(scotty, "nightly", dest, min_interval=10, max_interval=25)
+    assert mirror.poll() == []
+    assert mirror.interval == 10
+    assert metrics.mirror_pending_beams.get(tag="nightly") == 0
+
+    server_features["beams_completed"] = True
+    mirrored = metrics.mirrored_beams.get(tag="nightly")
+    assert mirror.poll() == [0]
+    assert metrics.mirrored_beams.get(tag="nightly") == mirrored + 1
+    assert os.path.exists(os.path.join(dest, "0", "beam0", "file1.log"))
+    assert os.path.exists(os.path.join(dest, STATE_NAME))
+
+    del fetched[:]
+    with api_call_logger.isolate():
+        assert mirror.poll() == []
+        api_call_logger.assert_urls_equal_to(["http://mock-scotty/beams?tag=nightly"])
+    assert not fetched
+    assert mirror.interval == 20
+    mirror.poll()
+    assert mirror.interval == 25
+
+    # A restarted mirror remembers what was mirrored
+    with api_call_logger.isolate():
+        assert Mirror(scotty, "nightly", dest).poll() == []
+        assert len(api_call_logger.calls) == 1
+    assert not fetched
+
+
+def test_mirror_command(scotty, server_features, tmpdir):
+    server_features["beams_completed"] = True
+    dest = str(tmpdir / "mirror")
+    result = CliRunner().invoke(
+        main, ["mirror", "t:nightly", "--dest", dest, "--once", "--url", scotty.url]
+    )
+    assert result.exit_code == 0, result.output
+    assert os.path.exists(os.path.join(dest, "0", "beam.txt"))
+    assert os.path.exists(os.path.join(dest, "0", MANIFEST_NAME))
+    # Beams are mirrored in parallel, so no progress bars are drawn
+    assert "\r" not in result.output
@@ -0,0 +1,30 @@
+import threading
+
+from scottypy.progress import ProgressTracker
+
+
+def test_add_from_threads():
+    updates = []
+    progress = ProgressTracker(lambda p: updates.append(p.transferred))
+
+    def _add():
+        for _ in range(20000):
+            progress.add(1)
+
+    threads = [threading.Thread(target=_add) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert progress.transferred == 80000
+    assert updates == sorted(updates)
+    assert updates[-1] == 80000
+
+
+def test_add_files():
+    updates = []
+    progress = ProgressTracker(updates.append, total_files=2)
+    progress.add(10)
+    progress.add(5, files=1)
+    progress.add(0, files=1)
+    assert [(p.transferred, p.files) for p in updates] == [(10, None), (15, 1), (15, 2)]
@@ -0,0 +1,191 @@
+# pylint: disable=redefined-outer-name
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+import pytest
+import requests
+from urllib3.util.retry import Retry
+
+from scottypy import Scotty, metrics
+from scottypy.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    JitteredRetry,
+    Resilience,
+    RetryPolicy,
+)
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    # http.server.ThreadingHTTPServer is only available from Python 3.7
+    daemon_threads = True
+
+
+class _ScriptedServer(object):
+    """Answers requests with the scripted statuses in turn, then with 200"""
+
+    def __init__(self):
+        self.statuses = []
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _respond(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                self.rfile.read(length)
+                server.requests.append((self.command, self.path, dict(self.headers)))
+                status = server.statuses.pop(0) if server.statuses else 200
+                self.send_response(status)
+                if status in (429, 503):
+                    self.send_header("Retry-After", "0")
+                self.send_header("Content-Length", "2")
+                self.end_headers()
+                self.wfile.write(b"{}")
+
+            do_GET = do_POST = do_DELETE = _respond
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = _ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = "http://127.0.0.1:{}".format(self._httpd.server_address[1])
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, args=(0.05,), daemon=True
+        )
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *_):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+@pytest.fixture
+def server():
+    with _ScriptedServer() as server:
+        yield server
+
+
+def _scotty(url, **kwargs):
+    return Scotty(url, resilience=Resilience.for_scotty(backoff_factor=0, **kwargs))
+
+
+def test_get_is_retried(server):
+    server.statuses = [503, 502, 429]
+    response = _scotty(server.url).session.get(server.url + "/beams/1")
+    assert response.status_code == 200
+    assert len(server.requests) == 4
+
+
+def test_retries_run_out(server):
+    server.statuses = [502] * 10
+    response = _scotty(server.url, retry_times=2).session.get(server.url + "/info")
+    assert response.status_code == 502
+    assert len(server.requests) == 3
+
+
+def test_post_is_retried_only_when_rejected(server):
+    scotty = _scotty(server.url)
+    server.statuses = [503, 502]
+    response = scotty.session.post(server.url + "/beams", data="{}")
+    assert response.status_code == 502
+    assert len(server.requests) == 2
+    keys = {headers["Idempotency-Key"] for _, _, headers in server.requests}
+    assert len(keys) == 1
+
+
+def test_tagging_is_retried(server):
+    server.statuses = [502]
+    _scotty(server.url).add_tag(1, "nightly")
+    assert len(server.requests) == 2
+    assert "Idempotency-Key" not in server.requests[0][2]
+
+
+def test_full_jitter():
+    retry = JitteredRetry(backoff_factor=1, backoff_max=60)
+    assert retry.get_backoff_time() == 0
+    for _ in range(3):
+        retry = retry.increment(
+            method="GET", url="/", error=requests.exceptions.ConnectionError()
+        )
+    assert len(retry.history) == 3
+    backoffs = {retry.get_backoff_time() for _ in range(100)}
+    assert all(0 <= backoff <= 4 for backoff in backoffs)
+    assert len(backoffs) > 1
+
+
+def test_backoff_max_is_kept_across_retries(monkeypatch):
+    init = Retry.__init__
+
+    def _init_without_backoff_max(self, *args, **kwargs):
+        # As in urllib3 1.26
+        assert "backoff_max" not in kwargs
+        init(self, *args, **kwargs)
+
+    monkeypatch.setattr(Retry, "__init__", _init_without_backoff_max)
+    retry = RetryPolicy(backoff_factor=10, backoff_max=3).make_retry()
+    for _ in range(3):
+        retry = retry.increment(
+            method="GET", url="/", error=requests.exceptions.ConnectionError()
+        )
+    assert retry.backoff_max == 3
+    assert all(0 <= retry.get_backoff_time() <= 3 for _ in range(100))
+
+
+def test_policy_rules():
+    resilience = Resilience.for_scotty()
+    assert resilience.policy_for("GET", "/beams") is resilience.default
+    assert resilience.policy_for("POST", "/beams/:id/tags") is resilience.default
+    assert resilience.policy_for("POST", "/beams").idempotency_key
+    custom = RetryPolicy(total=10)
+    resilience.rules.insert(0, ("*", "/files*", custom))
+    assert resilience.policy_for("GET", "/files/:id") is custom
+
+
+def test_circuit_breaker():
+    now = [0.0]
+    breaker = CircuitBreaker(
+        failure_threshold=3, reset_timeout=10, clock=lambda: now[0]
+    )
+    trips = metrics.circuit_breaker_trips.get()
+    for _ in range(3):
+        breaker.before_request()
+        breaker.record_failure()
+    assert breaker.state == "open"
+    assert metrics.circuit_breaker_trips.get() == trips + 1
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+    now[0] += 15
+    assert breaker.state == "half-open"
+    breaker.before_request()
+    # Only a single request probes the server
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    now[0] += 30
+    breaker.before_request()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.before_request()
+
+
+def test_circuit_breaker_fails_fast(server):
+    url = server.url
+    scotty = Scotty(
+        url,
+        resilience=Resilience(
+            RetryPolicy(total=0), breaker=CircuitBreaker(failure_threshold=2)
+        ),
+    )
+    server.statuses = [502, 502, 502]
+    for _ in range(2):
+        assert scotty.session.get(url + "/info").status_code == 502
+    with pytest.raises(CircuitOpenError):
+        scotty.session.get(url + "/info")
+    assert len(server.requests) == 2
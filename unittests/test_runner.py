@@ -0,0 +1,76 @@
+import sys
+
+import pytest
+
+from scottypy import runner
+from scottypy.exc import CombadgeError, CombadgeTimeout
+from scottypy.progress import ProgressTracker
+
+
+def _python(code):
+    return [sys.executable, "-c", code]
+
+
+def test_parse_progress():
+    assert runner.parse_progress("sent 1024/2048 bytes, 3 files") == (1024, 3)
+    assert runner.parse_progress("uploaded 2 files") == (None, 2)
+    assert runner.parse_progress("connecting to transporter") == (None, None)
+
+
+def test_register_progress_pattern(monkeypatch):
+    monkeypatch.setattr(runner, "_PROGRESS_PATTERNS", list(runner._PROGRESS_PATTERNS))
+    runner.register_progress_pattern(r"^\[(?P<files>\d+)/\d+\] (?P<bytes>\d+)B")
+    assert runner.parse_progress("[4/10] 4096B") == (4096, 4)
+    with pytest.raises(ValueError):
+        runner.register_progress_pattern(r"\d+")
+
+
+def test_run_process_progress():
+    updates = []
+    progress = ProgressTracker(updates.append)
+    runner.run_process(
+        _python("print('sent 10 bytes, 1 file'); print('sent 30 bytes, 2 files')"),
+        "v2",
+        progress=progress,
+    )
+    assert [(p.transferred, p.files) for p in updates] == [(10, 1), (30, 2)]
+
+
+def test_polled_estimates_yield_to_combadge_progress():
+    updates = []
+    progress = ProgressTracker(updates.append)
+    progress.update(50, estimate=True)
+    capture = runner.OutputCapture("v2", progress)
+    capture.feed("sent 10 bytes, 1 file")
+    progress.update(80, estimate=True)
+    capture.feed("uploaded 2 files")
+    assert [(p.transferred, p.files) for p in updates] == [
+        (50, None),
+        (10, 1),
+        (10, 1),
+        (10, 2),
+    ]
+
+
+def test_run_process_error():
+    code = (
+        "import sys; print('\\n'.join(map(str, range(100)))); sys.exit('broken pipe')"
+    )
+    with pytest.raises(CombadgeError) as caught:
+        runner.run_process(_python(code), "v2")
+    error = caught.value
+    assert not isinstance(error, CombadgeTimeout)
+    assert error.returncode == 1
+    assert error.version == "v2"
+    assert len(error.output) == runner._TAIL_LINES
+    assert error.output[-1] == "broken pipe"
+    assert str(error).startswith("Combadge v2 exited with code 1 after")
+
+
+def test_run_process_timeout():
+    code = "import time; print('started', flush=True); time.sleep(60)"
+    with pytest.raises(CombadgeTimeout) as caught:
+        runner.run_process(_python(code), "v2", timeout=1)
+    assert caught.value.returncode is None
+    assert caught.value.duration < 30
+    assert caught.value.output == ["started"]
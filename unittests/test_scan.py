@@ -0,0 +1,123 @@
+# pylint: disable=redefined-outer-name
+import errno
+import os
+import shutil
+
+import pytest
+
+from scottypy import scan
+
+
+def _write(path, content="x"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+
+
+@pytest.fixture
+def tree(tmpdir):
+    root = str(tmpdir / "tree")
+    _write(os.path.join(root, "a.log"), "aaa")
+    _write(os.path.join(root, "sub", "b.log"), "bb")
+    _write(os.path.join(root, "sub", "core.1234.core"), "c" * 100)
+    _write(os.path.join(root, "build", "out.o"), "o" * 10)
+    _write(os.path.join(root, "other", "build", "keep.o"), "k")
+    return root
+
+
+def test_scan_directory(tree):
+    manifest = scan.scan_directory(tree)
+    assert [entry.path for entry in manifest.entries] == [
+        "a.log",
+        "build/out.o",
+        "other/build/keep.o",
+        "sub/b.log",
+        "sub/core.1234.core",
+    ]
+    assert manifest.total_size == 3 + 10 + 1 + 2 + 100
+    assert manifest.file_count == 5
+    assert not manifest.excluded
+    mtime = os.stat(os.path.join(tree, "a.log")).st_mtime
+    assert manifest.entries[0].mtime == mtime
+
+
+def test_scan_directory_exclude(tree):
+    manifest = scan.scan_directory(tree, exclude=["*.core", "build/*.o"])
+    assert [entry.path for entry in manifest.entries] == [
+        "a.log",
+        "other/build/keep.o",
+        "sub/b.log",
+    ]
+    assert manifest.excluded == ["build/out.o", "sub/core.1234.core"]
+
+
+def test_scan_directory_exclude_directory(tree):
+    manifest = scan.scan_directory(tree, exclude=["build"])
+    assert [entry.path for entry in manifest.entries] == [
+        "a.log",
+        "sub/b.log",
+        "sub/core.1234.core",
+    ]
+    assert manifest.excluded == ["build/", "other/build/"]
+
+
+def test_scan_directory_parallel(tmpdir):
+    root = str(tmpdir)
+    for i in range(50):
+        for j in range(3):
+            _write(
+                os.path.join(root, "dir{}".format(i), "nested", "f{}".format(j)),
+                "x" * i,
+            )
+    serial = scan.scan_directory(root, workers=1)
+    parallel = scan.scan_directory(root, workers=4)
+    assert parallel.to_json() == serial.to_json()
+    assert parallel.file_count == 150
+
+
+def test_stage(tree):
+    manifest = scan.scan_directory(tree, exclude=["*.core"])
+    staging = manifest.stage()
+    try:
+        assert os.path.dirname(staging) == os.path.dirname(tree)
+        assert scan.scan_directory(staging).to_json()["files"] == [
+            entry.to_json() for entry in manifest.entries
+        ]
+        assert os.path.samefile(
+            os.path.join(staging, "sub", "b.log"), os.path.join(tree, "sub", "b.log")
+        )
+    finally:
+        shutil.rmtree(staging)
+
+
+def test_stage_copies_across_file_systems(tree, monkeypatch):
+    links = []
+
+    def _link(source, target):
+        links.append(source)
+        raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+    monkeypatch.setattr(os, "link", _link)
+    staging = scan.scan_directory(tree).stage()
+    try:
+        assert len(links) == 1
+        staged = os.path.join(staging, "sub", "b.log")
+        assert not os.path.samefile(staged, os.path.join(tree, "sub", "b.log"))
+        with open(staged) as f:
+            assert f.read() == "bb"
+    finally:
+        shutil.rmtree(staging)
+
+
+def test_stage_outside_read_only_parent(tree, monkeypatch):
+    parent = os.path.dirname(tree)
+    access = os.access
+    monkeypatch.setattr(
+        os, "access", lambda path, mode: path != parent and access(path, mode)
+    )
+    staging = scan.scan_directory(tree).stage()
+    try:
+        assert os.path.dirname(staging) != parent
+        assert os.path.exists(os.path.join(staging, "sub", "b.log"))
+    finally:
+        shutil.rmtree(staging)
@@ -1,177 +1,22 @@
 # pylint: disable=redefined-outer-name,unused-variable
-import contextlib
 import datetime
+import logging
 import os
 import sys
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
 
-import flask
 import pytest
-from flask import Flask, jsonify, request, send_file
-from flask_loopback import FlaskLoopback
+import requests
+from click.testing import CliRunner
 
-from scottypy import Scotty
+from scottypy import Tracer, metrics
+from scottypy.app import main
+from scottypy.exc import BulkOperationError, CombadgeTimeout
+from scottypy.filters import BeamSelector, FileFilter
 from scottypy.scotty import CombadgePython, CombadgeRust
 
 
-class APICallLogger:
-    def __init__(self):
-        self.calls = []
-
-    def log_call(self, request):
-        try:
-            json = request.json
-        except Exception:
-            json = None
-        self.calls.append(dict(url=request.url, params=dict(request.values), json=json))
-
-    @contextlib.contextmanager
-    def isolate(self):
-        old_calls = self.calls
-        self.calls = []
-        yield
-        self.calls = old_calls
-
-    def get_single_call_or_raise(self):
-        assert len(self.calls) == 1, "Expected one call, got {calls}".format(
-            calls=self.calls
-        )
-        return self.calls[0]
-
-    def _assert_urls_equal(self, actual_url, expected_url):
-        actual_url_parsed = urllib.parse.urlparse(actual_url)
-        expected_url_parsed = urllib.parse.urlparse(expected_url)
-        assert actual_url_parsed.scheme == expected_url_parsed.scheme
-        assert actual_url_parsed.netloc == expected_url_parsed.netloc
-        assert actual_url_parsed.path == expected_url_parsed.path
-        assert urllib.parse.parse_qs(actual_url_parsed.query) == urllib.parse.parse_qs(
-            expected_url_parsed.query
-        )
-        assert actual_url_parsed.fragment == expected_url_parsed.fragment
-
-    def assert_urls_equal_to(self, expected_urls):
-        assert len(expected_urls) == len(
-            self.calls
-        ), "Expected {} calls, got {} instead".format(
-            len(expected_urls), len(self.calls)
-        )
-        for call, expected_url in zip(self.calls, expected_urls):
-            actual_url = call["url"]
-            self._assert_urls_equal(actual_url, expected_url)
-
-
-@pytest.fixture
-def api_call_logger():
-    return APICallLogger()
-
-
-@pytest.fixture
-def scotty(api_call_logger):
-    app = Flask(__name__)
-    url = "http://mock-scotty"
-
-    @app.route("/combadge")
-    def combadge_file():
-        api_call_logger.log_call(flask.request)
-        combadge_version = flask.request.values.get("combadge_version")
-        fixtures_folder = os.path.join(os.path.dirname(__file__), "fixtures")
-        if combadge_version == "v1":
-            file_name = "combadge.py"
-        elif combadge_version == "v2":
-            file_name = "combadge"
-        else:
-            raise ValueError(
-                "Unknown combadge version {combadge_version}".format(
-                    combadge_version=combadge_version
-                )
-            )
-        return send_file(os.path.join(fixtures_folder, file_name))
-
-    @app.route("/beams", methods=["POST"])
-    def beams():
-        api_call_logger.log_call(flask.request)
-        json = flask.request.json
-        date = datetime.datetime(year=2020, month=2, day=27).isoformat() + "Z"
-        return jsonify(
-            {
-                "beam": {
-                    "id": 666,
-                    "start": date,
-                    "size": 0,
-                    "host": json["beam"].get("host"),
-                    "comment": json["beam"].get("comment"),
-                    "directory": json["beam"].get("directory"),
-                    "initiator": json["beam"].get("user"),
-                    "error": None,
-                    "combadge_contacted": False,
-                    "pending_deletion": False,
-                    "completed": False,
-                    "deleted": False,
-                    "pins": [],
-                    "tags": [],
-                    "associated_issues": [],
-                    "purge_time": 0,
-                }
-            }
-        )
-
-    beam_count = 2
-    all_beams = [
-        {
-            "id": i,
-            "start": datetime.datetime(year=2020, month=2, day=27).isoformat() + "Z",
-            "size": 0,
-            "host": "host{}".format(i),
-            "comment": "comment{}".format(i),
-            "directory": "directory{}".format(i),
-            "initiator": "user{}".format(i),
-            "error": None,
-            "combadge_contacted": False,
-            "pending_deletion": False,
-            "completed": False,
-            "deleted": False,
-            "pins": [],
-            "tags": [],
-            "associated_issues": [],
-            "purge_time": 0,
-        }
-        for i in range(beam_count)
-    ]
-
-    @app.route("/beams")
-    def beams_index():
-        api_call_logger.log_call(request)
-        page = int(request.values.get("page", 1))
-        return jsonify(
-            {
-                "beams": all_beams[page - 1 : page],
-                "meta": {
-                    "total_pages": beam_count,
-                },
-            }
-        )
-
-    @app.route("/beams/<int:beam>")
-    def single_beam(beam):
-        return jsonify(
-            {
-                "beam": all_beams[beam],
-            }
-        )
-
-    @app.route("/info")
-    def info():
-        return jsonify(
-            {
-                "transporter": "mock-transporter",
-                "version": "0.0.0",
-            }
-        )
-
-    with FlaskLoopback(app).on(("mock-scotty", 80)):
-        yield Scotty(url)
-
-
 @pytest.fixture
 def directory(tmpdir):
     with (tmpdir / "debug.log").open("w") as f:
@@ -378,3 +223,302 @@ def test_initiate_beam(scotty, directory, combadge_version, api_call_logger):
 def test_get_beams_by_issue(scotty, api_call_logger):
     beams = scotty.get_beams_by_issue("TEST-1234")
     assert len(beams) == 2
+
+
+def test_beam_up_trace(scotty, directory, api_call_logger):
+    tracer = Tracer("beam_up")
+    scotty.beam_up(directory=directory, combadge_version="v1", tracer=tracer, scan=True)
+    assert scotty.last_trace is tracer
+    report = tracer.report()
+    assert report["attributes"]["beam_id"] == 666
+    assert report["attributes"]["directory_size"] == len("debug debug")
+    assert report["attributes"]["file_count"] == 1
+    assert [span["name"] for span in report["spans"]] == [
+        "scan_directory",
+        "info",
+        "create_beam",
+        "fetch_combadge",
+        "run_combadge",
+    ]
+    assert all(span["duration"] >= 0 for span in report["spans"])
+
+
+def test_beam_up_trace_is_observational(scotty, directory, api_call_logger):
+    tracer = Tracer("beam_up")
+    scotty.beam_up(directory=directory, combadge_version="v1", tracer=tracer)
+    report = tracer.report()
+    assert [span["name"] for span in report["spans"]] == [
+        "info",
+        "create_beam",
+        "fetch_combadge",
+        "run_combadge",
+    ]
+    assert "directory_size" not in report["attributes"]
+    [create] = [
+        call for call in api_call_logger.calls if call["url"].endswith("/beams")
+    ]
+    assert "expected_size" not in create["json"]["beam"]
+
+
+def test_beam_up_trace_is_logged(scotty, directory, caplog):
+    with caplog.at_level(logging.DEBUG, logger="scotty.trace"):
+        scotty.beam_up(directory=directory, combadge_version="v1")
+    spans = [record.span for record in caplog.records if hasattr(record, "span")]
+    assert [span["name"] for span in spans] == [
+        "info",
+        "create_beam",
+        "fetch_combadge",
+        "run_combadge",
+    ]
+    assert all(span["beam_id"] == 666 for span in spans[2:])
+    assert "directory_size" not in scotty.last_trace.attributes
+
+
+def test_beam_up_scan_and_exclude(scotty, directory, api_call_logger):
+    with open(os.path.join(directory, "huge.core"), "w") as f:
+        f.write("x" * 1000)
+    with api_call_logger.isolate():
+        scotty.beam_up(directory=directory, combadge_version="v1", exclude=["*.core"])
+        beam = api_call_logger.calls[0]["json"]["beam"]
+    assert beam["directory"] == directory
+    assert beam["expected_size"] == len("debug debug")
+    assert beam["expected_file_count"] == 1
+    # The combadge ran on a staging directory without the excluded file
+    assert not os.path.exists(os.path.join(directory, "output"))
+    assert not [
+        name for name in os.listdir(os.path.dirname(directory)) if "staging" in name
+    ]
+
+
+def test_beam_up_incremental(scotty, directory, api_call_logger, tmpdir):
+    state_path = str(tmpdir / "state" / "beams.json")
+    directory = os.path.join(directory, "logs")
+    os.mkdir(directory)
+    with open(os.path.join(directory, "a.log"), "w") as f:
+        f.write("a")
+
+    def _beam_up():
+        with api_call_logger.isolate():
+            scotty.beam_up(
+                directory=directory,
+                combadge_version="v1",
+                incremental=True,
+                state_path=state_path,
+            )
+            return api_call_logger.calls[0]["json"]["beam"]
+
+    beam = _beam_up()
+    assert beam["expected_file_count"] == 1
+    assert "comment" not in beam
+    # The first beam has nothing to leave out, so the combadge ran on the directory itself
+    os.remove(os.path.join(directory, "output"))
+
+    with open(os.path.join(directory, "b.log"), "w") as f:
+        f.write("bb")
+    beam = _beam_up()
+    assert beam["expected_file_count"] == 1
+    assert beam["expected_size"] == 2
+    assert beam["comment"] == "Changes since beam #666"
+
+    beam = _beam_up()
+    assert beam["expected_file_count"] == 0
+
+
+def test_beam_up_progress(scotty, directory):
+    progress = []
+    scotty.beam_up(
+        directory=directory, combadge_version="v1", progress_callback=progress.append
+    )
+    assert progress[0].transferred == 0
+    assert progress[-1].transferred == progress[-1].total == len("debug debug")
+    assert progress[-1].files == progress[-1].total_files == 1
+
+
+def test_beam_up_combadge_timeout(scotty, directory, tmpdir):
+    combadge_path = str(tmpdir / "hanging_combadge.py")
+    with open(combadge_path, "w") as f:
+        f.write("import time\n\ndef beam_up(*args):\n    time.sleep(60)\n")
+    scotty._combadge = CombadgePython(combadge_path)
+    failures = metrics.combadge_failures.get(version="v1", reason="timeout")
+    with pytest.raises(CombadgeTimeout):
+        scotty.beam_up(directory=directory, combadge_timeout=1)
+    assert metrics.combadge_failures.get(version="v1", reason="timeout") == failures + 1
+
+
+def test_beam_up_v1_concurrently(scotty, tmpdir):
+    directories = [str(tmpdir.mkdir("dir{}".format(i))) for i in range(4)]
+    scotty.prefetch_combadge("v1")
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(lambda d: scotty.beam_up(directory=d), directories))
+    for directory in directories:
+        _validate_beam_up(combadge_version="v1", directory=directory)
+
+
+def test_beam_up_metrics(scotty, directory):
+    beams_created = metrics.beams_created.get(kind="local")
+    runs = metrics.combadge_runtime.get_count(version="v1")
+    requests_count = metrics.http_requests.get(
+        endpoint="/beams", method="POST", status=200
+    )
+    scotty.beam_up(directory=directory, combadge_version="v1")
+    assert metrics.beams_created.get(kind="local") == beams_created + 1
+    assert metrics.combadge_runtime.get_count(version="v1") == runs + 1
+    assert (
+        metrics.http_requests.get(endpoint="/beams", method="POST", status=200)
+        == requests_count + 1
+    )
+
+
+def test_iter_beams_by_tag_is_lazy(scotty, api_call_logger):
+    beams = scotty.iter_beams_by_tag("nightly")
+    assert api_call_logger.calls == []
+    assert next(beams).id == 0
+    api_call_logger.assert_urls_equal_to(["http://mock-scotty/beams?tag=nightly"])
+
+
+def test_show_tag(scotty, api_call_logger):
+    result = CliRunner().invoke(main, ["show", "t:nightly", "--url", scotty.url])
+    assert result.exit_code == 0, result.output
+    assert result.output.splitlines() == [
+        "Beam #0",
+        "    Host: host0",
+        "    Directory: directory0",
+        "    Size: 0 bit",
+        "    Files:",
+        "        beam0/file0.log (0 bit)",
+        "        beam0/file1.log (100 byte)",
+        "",
+    ]
+
+
+def test_get_files_with_file_filter(scotty, api_call_logger):
+    files = scotty.get_files(0, FileFilter(globs=["*/file1.*"], min_size=1))
+    assert [f.file_name for f in files] == ["beam0/file1.log"]
+    api_call_logger.assert_urls_equal_to(
+        ["http://mock-scotty/files?beam_id=0&filter=/file1."]
+    )
+
+
+def test_up_local_progress(scotty, directory):
+    result = CliRunner().invoke(
+        main,
+        ["up", "local", directory, "--url", scotty.url, "--progress", "-x", "*.core"],
+    )
+    assert result.exit_code == 0, result.output
+    lines = result.output.splitlines()
+    assert lines[1] == "Uploaded 0 bit of 11 byte (0%)"
+    assert lines[-2] == "Uploaded 11 byte of 11 byte (100%)"
+    assert lines[-1] == "Successfully beamed beam #666"
+
+
+def test_add_tags_fan_out(scotty, api_call_logger):
+    scotty.add_tags([1, 2, 3], ["nightly", "green"])
+    urls = [call["url"] for call in api_call_logger.calls]
+    assert urls[0] == "http://mock-scotty/beams/tags"
+    assert sorted(urls[1:]) == sorted(
+        "http://mock-scotty/beams/{}/tags/{}".format(beam, tag)
+        for beam in (1, 2, 3)
+        for tag in ("nightly", "green")
+    )
+    # Scotty remembers that there is no batch endpoint
+    with api_call_logger.isolate():
+        scotty.remove_tags([1], ["nightly"])
+        api_call_logger.assert_urls_equal_to(
+            ["http://mock-scotty/beams/1/tags/nightly"]
+        )
+
+
+def test_add_tags_batch(scotty, api_call_logger, server_features):
+    server_features["batch_tags"] = True
+    scotty.add_tags(range(300), ["nightly"])
+    call = api_call_logger.get_single_call_or_raise()
+    assert call["json"] == {"beam_ids": list(range(300)), "tags": ["nightly"]}
+
+
+def test_add_tags_errors(scotty):
+    with pytest.raises(BulkOperationError) as caught:
+        scotty.add_tags([1, 100, 2, 101], ["nightly"])
+    assert caught.value.total == 4
+    assert sorted(pair for pair, _ in caught.value.failures) == [
+        (100, "nightly"),
+        (101, "nightly"),
+    ]
+
+
+def test_tag_command_stdin(scotty, api_call_logger):
+    result = CliRunner().invoke(
+        main, ["tag", "nightly", "--url", scotty.url], input="1\n2 3\n"
+    )
+    assert result.exit_code == 0, result.output
+    assert len(api_call_logger.calls) == 4
+
+    result = CliRunner().invoke(
+        main, ["tag", "-d", "nightly", "100", "--url", scotty.url]
+    )
+    assert result.exit_code == 1
+    assert "1 of 1 operations failed" in result.output
+
+
+def test_delete_beams_dry_run(scotty, api_call_logger):
+    selector = BeamSelector(issue="TEST-1234", min_size=1)
+    report = scotty.delete_beams(selector, dry_run=True)
+    assert [beam.id for beam in report.beams] == [1]
+    assert report.reclaimable_size == 1000
+    assert report.deleted == []
+    assert all(
+        call["url"].startswith("http://mock-scotty/beams?")
+        for call in api_call_logger.calls
+    )
+
+
+def test_delete_beams(scotty, api_call_logger):
+    older_than = datetime.datetime(2021, 1, 1, tzinfo=datetime.timezone.utc)
+    with api_call_logger.isolate():
+        report = scotty.delete_beams(
+            BeamSelector(issue="TEST-1234", older_than=older_than), rate=100
+        )
+        assert api_call_logger.calls[-1]["url"] == "http://mock-scotty/beams/0"
+    assert report.deleted == [0]
+    assert report.failures == []
+
+
+def test_purge_command(scotty, api_call_logger):
+    args = ["purge", "--issue", "TEST-1234", "--url", scotty.url]
+    result = CliRunner().invoke(main, args, input="n\n")
+    assert result.exit_code == 1
+    assert "2 beams, 1 KB reclaimable" in result.output
+
+    result = CliRunner().invoke(main, args + ["--min-size", "1", "--yes"])
+    assert result.exit_code == 0, result.output
+    assert result.output.splitlines()[-1] == "Deleted 1 beams, reclaiming 1 KB"
+
+    result = CliRunner().invoke(main, ["purge", "--url", scotty.url])
+    assert result.exit_code == 2
+
+
+def test_beam_up_resolves_issue_once(scotty, directory, api_call_logger):
+    for _ in range(3):
+        scotty.beam_up(
+            directory=directory, combadge_version="v1", associated_issue="JIRA-1"
+        )
+    urls = [urllib.parse.urlparse(call["url"]).path for call in api_call_logger.calls]
+    assert urls.count("/trackers/by_name/JIRA") == 1
+    assert urls.count("/issues/get_by_tracker") == 1
+    assert urls.count("/issues") == 1
+    assert urls.count("/beams/666/issues/1") == 3
+
+
+def test_resolve_existing_issue(scotty, api_call_logger):
+    issue_id = scotty.create_issue(1, "JIRA-2")
+    with api_call_logger.isolate():
+        assert scotty.resolve_issue(1, "JIRA-2") == issue_id
+        assert scotty.resolve_issue(1, "JIRA-2") == issue_id
+        assert len(api_call_logger.calls) == 1
+
+
+def test_resolve_issue_fails_on_server_error(scotty, api_call_logger, server_features):
+    server_features["issues_broken"] = True
+    with pytest.raises(requests.exceptions.HTTPError):
+        scotty.resolve_issue(1, "JIRA-3")
+    urls = [urllib.parse.urlparse(call["url"]).path for call in api_call_logger.calls]
+    assert "/issues" not in urls
@@ -0,0 +1,48 @@
+import pytest
+from click.testing import CliRunner
+
+from scottypy.app import main
+
+
+@pytest.mark.parametrize("ranges", [True, False])
+def test_read_range(scotty, server_features, ranges):
+    server_features["ranges"] = ranges
+    file_ = scotty.get_files(0)[1]
+    content = "content of file 1\n".encode() * 100
+    assert file_.read_range(0, 10) == content[:10]
+    assert file_.read_range(5, 30) == content[5:30]
+    assert file_.read_range(1990) == content[1990:]
+    assert file_.read_range(-25) == content[-25:]
+    assert file_.read_range(-5000) == content
+    assert file_.read_range(5000) == b""
+    assert file_.read_range(10, 10) == b""
+
+
+def test_tail(scotty, api_call_logger):
+    result = CliRunner().invoke(
+        main, ["tail", "-n", "2", "0", "beam0/file1.log", "--url", scotty.url]
+    )
+    assert result.exit_code == 0, result.output
+    # The listing says the file is 100 bytes long, so it ends in the middle of a line
+    assert result.output == "content of file 1\ncontent of"
+    assert api_call_logger.calls[-1]["url"] == "http://mock-scotty/file_contents/1"
+
+
+def test_tail_follow(scotty, monkeypatch):
+    def _complete(beam):
+        beam.completed = True
+
+    monkeypatch.setattr("scottypy.beam.Beam.update", _complete)
+    result = CliRunner().invoke(
+        main,
+        ["tail", "-n", "1", "-f", "--interval", "0", "0", "file1", "--url", scotty.url],
+    )
+    assert result.exit_code == 0, result.output
+    content = "content of file 1\n" * 100
+    assert result.output == content[90:]
+
+
+def test_tail_no_such_file(scotty):
+    result = CliRunner().invoke(main, ["tail", "0", "nothing", "--url", scotty.url])
+    assert result.exit_code != 0
+    assert "Beam 0 has no file named nothing" in result.output
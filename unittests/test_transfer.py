@@ -0,0 +1,194 @@
+# pylint: disable=redefined-outer-name
+import contextlib
+import gzip
+import io
+import os
+import socket
+import threading
+
+import pytest
+import requests
+
+from benchmarks.server import SyntheticData, serve
+from scottypy import Scotty, transfer
+from scottypy.file import File
+from scottypy.transfer import ChunkSizer, copy_response
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeRaw(io.BytesIO):
+    decode_content = False
+
+
+class FakeResponse(object):
+    def __init__(self, content):
+        self.raw = FakeRaw(content)
+        self.headers = {}
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_starts_small(clock):
+    with ChunkSizer(clock=clock) as sizer:
+        assert sizer.size == transfer.MIN_CHUNK_SIZE
+
+
+def test_grows_with_throughput(clock):
+    with ChunkSizer(target_interval=0.1, clock=clock) as sizer:
+        clock.now += 0.1
+        sizer.record(1024**2)
+        # 10MB/s holds 1MB in 0.1s
+        assert sizer.size == 1024**2
+        for _ in range(20):
+            clock.now += 0.01
+            sizer.record(1024**2)
+        assert sizer.size == transfer.MAX_CHUNK_SIZE
+
+
+def test_sizes_are_powers_of_two(clock):
+    with ChunkSizer(target_interval=1, clock=clock) as sizer:
+        clock.now += 1
+        sizer.record(300 * 1024)
+        assert sizer.size == 256 * 1024
+
+
+def test_budget_is_shared(clock):
+    with contextlib.ExitStack() as stack:
+        sizers = [
+            stack.enter_context(ChunkSizer(budget=1024**2, clock=clock))
+            for _ in range(8)
+        ]
+        clock.now += 1
+        sizers[0].record(1024**3)
+        assert sizers[0].size == 128 * 1024
+    assert ChunkSizer.running() == 0
+
+
+def test_copy_response_reuses_buffer(clock):
+    content = bytes(range(256)) * 1000
+    chunks = []
+    buffers = set()
+
+    def _write(chunk):
+        buffers.add(id(chunk.obj))
+        chunks.append(bytes(chunk))
+
+    response = FakeResponse(content)
+    sizer = ChunkSizer(clock=clock)
+    assert copy_response(response, _write, sizer) == len(content)
+    assert b"".join(chunks) == content
+    assert response.raw.decode_content
+    assert len(chunks) == 4
+    assert len(buffers) == 1
+
+
+@pytest.fixture
+def served_file():
+    data = SyntheticData(beams=1, files=1, file_size=300 * 1024 + 7)
+    with serve(data, "http") as url:
+        yield Scotty(url).get_file(0), b"".join(data.content(data.file_size))
+
+
+def test_readinto(served_file):
+    file_, content = served_file
+    buffer = bytearray(100 * 1024)
+    assert file_.readinto(buffer, 1000) == len(buffer)
+    assert buffer == content[1000 : 1000 + len(buffer)]
+    view = memoryview(buffer)[:50]
+    assert file_.readinto(view, len(content) - 20) == 20
+    assert buffer[:20] == content[-20:]
+    assert file_.readinto(buffer, len(content)) == 0
+
+
+def test_download_over_socket(served_file, tmpdir):
+    file_, content = served_file
+    file_.download(str(tmpdir), segments=1)
+    with open(file_.get_local_path(str(tmpdir)), "rb") as f:
+        assert f.read() == content
+
+
+class _Chunks(object):
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, chunk):
+        self.chunks.append(chunk)
+
+
+def test_stream_to_gives_copies(served_file, monkeypatch):
+    file_, content = served_file
+    # Keep reading into the same buffer, in chunks which don't line up with the repeating content
+    monkeypatch.setattr(transfer.ChunkSizer, "size", 100 * 1000)
+    fileobj = _Chunks()
+    file_.stream_to(fileobj)
+    assert len(fileobj.chunks) > 1
+    assert b"".join(fileobj.chunks) == content
+
+
+def test_stream_to_file(served_file, tmpdir):
+    file_, content = served_file
+    path = str(tmpdir / "file")
+    with open(path, "wb") as f:
+        file_.stream_to(f)
+    with open(path, "rb") as f:
+        assert f.read() == content
+
+
+def _truncating_server(headers, body):
+    """Serve a response with a Content-Length of body and close the connection after 300 bytes
+    of it"""
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(1)
+
+    def _serve():
+        conn, _ = listener.accept()
+        with conn:
+            conn.recv(64 * 1024)
+            conn.sendall(
+                b"HTTP/1.1 200 OK\r\n"
+                + headers
+                + b"Content-Length: %d\r\n\r\n" % len(body)
+                + body[:300]
+            )
+
+    thread = threading.Thread(target=_serve, daemon=True)
+    thread.start()
+    return listener, thread
+
+
+@pytest.fixture(params=["identity", "gzip"])
+def truncated_url(request):
+    if request.param == "gzip":
+        listener, thread = _truncating_server(
+            b"Content-Encoding: gzip\r\n", gzip.compress(os.urandom(1000))
+        )
+    else:
+        listener, thread = _truncating_server(b"", b"x" * 1000)
+    try:
+        yield "http://127.0.0.1:{}/file".format(listener.getsockname()[1])
+    finally:
+        listener.close()
+        thread.join(timeout=5)
+
+
+@pytest.mark.parametrize("fast_path", [True, False])
+def test_download_truncated_body(truncated_url, tmpdir, monkeypatch, fast_path):
+    if not fast_path:
+        monkeypatch.setattr(transfer, "_FAST_PATH_URLLIB3_VERSIONS", ())
+    file_ = File(
+        requests.Session(), 0, "file", "uploaded", "file", 1000, truncated_url, None
+    )
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        file_.download(str(tmpdir), segments=1)
+    assert os.listdir(str(tmpdir)) == []
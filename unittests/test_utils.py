@@ -43,3 +43,40 @@ def test_fix_path_sep_for_current_platform_linux_path():
     assert utils.fix_path_sep_for_current_platform("a/b/c") == os.path.join(
         "a", "b", "c"
     )
+
+
+def test_ttl_cache():
+    now = [0.0]
+    cache = utils.TTLCache(10, clock=lambda: now[0])
+    assert cache.get("JIRA") is None
+    cache.set("JIRA", 1)
+    now[0] = 9
+    assert cache.get("JIRA") == 1
+    now[0] = 10
+    assert cache.get("JIRA") is None
+
+
+def test_run_concurrently_pulls_items_lazily():
+    pulled = []
+
+    def _items():
+        for i in range(1000):
+            pulled.append(i)
+            yield i
+
+    done = []
+    failures = utils.run_concurrently(
+        done.append, _items(), 2, stop=lambda: len(done) >= 3
+    )
+    assert not failures
+    assert 3 <= len(done) == len(pulled) < 10
+
+
+def test_run_concurrently_failures():
+    def _fail_odd(i):
+        if i % 2:
+            raise ValueError(i)
+
+    failures = utils.run_concurrently(_fail_odd, range(10), 3)
+    assert [item for item, _ in failures] == [1, 3, 5, 7, 9]
+    assert all(isinstance(error, ValueError) for _, error in failures)